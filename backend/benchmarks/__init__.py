@@ -0,0 +1,6 @@
+"""
+Benchmarks for the learning platform
+
+Run from the backend directory, e.g. ``python -m benchmarks.index_benchmark``.
+Every benchmark works on a throwaway database and never touches db.sqlite3.
+"""
@@ -0,0 +1,277 @@
+"""
+Concurrent adaptive quiz generations, ASGI (async view) against WSGI threads
+
+Usage (from backend/):
+    python -m benchmarks.async_generation_benchmark --requests 200 --latency 2
+    python -m benchmarks.async_generation_benchmark --interface wsgi --threads 16
+
+Starts a local fake LLM server speaking the chat completions API that
+sleeps --latency seconds before answering with a valid question set, points
+GROQ_BASE_URL at it and sends --requests concurrent
+GET /adaptive-quiz/?topic=... through the full middleware stack:
+
+    asgi  all requests at once with AsyncClient coroutines on one event loop
+    wsgi  Client requests spread over --threads threads
+
+The question bank and prefetching are turned off so every request waits on
+the model. Reports wall time, p50/p95/p99 latency and the peak number of
+completions the fake server had in flight: with the async view it should
+approach --requests, with WSGI it is capped by --threads.
+"""
+import argparse
+import asyncio
+import json
+import threading
+import time
+
+from .common import create_users, setup_django, summarize, temporary_database
+
+TOPIC = 'Probability'
+
+
+class FakeLLMServer:
+    """
+    Minimal HTTP/1.1 chat completions endpoint on its own event loop
+    Every request sleeps latency seconds, so thousands can wait at once.
+    """
+
+    def __init__(self, latency, num_questions=5):
+        self.latency = latency
+        self.requests = 0
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        self._content = json.dumps([
+            {
+                'question': f'Benchmark question {index}',
+                'options': ['A', 'B', 'C', 'D'],
+                'correct_answer': index % 4,
+                'explanation': 'Generated by the benchmark server.',
+            }
+            for index in range(num_questions)
+        ])
+        self._loop = asyncio.new_event_loop()
+        self._server = None
+        self._writers = set()
+        self._thread = threading.Thread(target=self._loop.run_forever, name='fake-llm', daemon=True)
+        self.url = None
+
+    def __enter__(self):
+        self._thread.start()
+        self._server = asyncio.run_coroutine_threadsafe(
+            asyncio.start_server(self._handle, '127.0.0.1', 0, backlog=4096), self._loop,
+        ).result()
+        port = self._server.sockets[0].getsockname()[1]
+        self.url = f'http://127.0.0.1:{port}'
+        return self
+
+    def __exit__(self, *exc_info):
+        asyncio.run_coroutine_threadsafe(self._shutdown(), self._loop).result()
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+        self._loop.close()
+
+    async def _shutdown(self):
+        self._server.close()
+        # Handlers still waiting on idle keep-alive connections see EOF and return
+        for writer in list(self._writers):
+            writer.close()
+        handlers = [task for task in asyncio.all_tasks() if task is not asyncio.current_task()]
+        await asyncio.gather(*handlers, return_exceptions=True)
+
+    async def _handle(self, reader, writer):
+        self._writers.add(writer)
+        try:
+            while True:
+                head = await reader.readuntil(b'\r\n\r\n')
+                length = 0
+                for line in head.split(b'\r\n'):
+                    name, _, value = line.partition(b':')
+                    if name.strip().lower() == b'content-length':
+                        length = int(value)
+                await reader.readexactly(length)
+
+                self.requests += 1
+                self.in_flight += 1
+                self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+                try:
+                    await asyncio.sleep(self.latency)
+                finally:
+                    self.in_flight -= 1
+
+                body = json.dumps({
+                    'id': f'chatcmpl-{self.requests}',
+                    'object': 'chat.completion',
+                    'created': int(time.time()),
+                    'model': 'fake-llm',
+                    'choices': [{
+                        'index': 0,
+                        'finish_reason': 'stop',
+                        'message': {'role': 'assistant', 'content': self._content},
+                    }],
+                }).encode()
+                writer.write(
+                    b'HTTP/1.1 200 OK\r\nContent-Type: application/json\r\n'
+                    + f'Content-Length: {len(body)}\r\n\r\n'.encode() + body
+                )
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            self._writers.discard(writer)
+            writer.close()
+
+
+def _configure(server_url, latency):
+    from django.conf import settings
+
+    settings.ALLOWED_HOSTS = [*settings.ALLOWED_HOSTS, 'testserver']
+    settings.GROQ_API_KEY = 'benchmark-key'
+    settings.GROQ_BASE_URL = server_url
+    settings.GROQ_HEDGED_REQUESTS = False
+    settings.GROQ_REQUEST_TIMEOUT = latency + 30
+    settings.GROQ_MODEL_TIMEOUTS = {}
+    # Every request should wait on the model
+    settings.QUESTION_BANK_ENABLED = False
+    settings.QUESTION_PREFETCH_DEPTH = 0
+
+
+def _check(response, errors):
+    if response.status_code != 200:
+        errors.append(f"HTTP {response.status_code}")
+    elif b'Failed to generate AI questions' in response.content:
+        errors.append("generation failed")
+
+
+def _drive_asgi(users, requests, errors):
+    from django.test import AsyncClient
+
+    async def main():
+        clients = []
+        for index in range(requests):
+            client = AsyncClient()
+            await client.aforce_login(users[index % len(users)])
+            clients.append(client)
+
+        async def one(client):
+            started = time.perf_counter()
+            response = await client.get('/adaptive-quiz/', {'topic': TOPIC})
+            _check(response, errors)
+            return (time.perf_counter() - started) * 1000
+
+        started = time.perf_counter()
+        latencies = await asyncio.gather(*(one(client) for client in clients))
+        return time.perf_counter() - started, list(latencies)
+
+    return asyncio.run(main())
+
+
+def _drive_wsgi(users, requests, threads, errors):
+    from django.db import connections
+    from django.test import Client
+
+    next_request = iter(range(requests))
+    lock = threading.Lock()
+    latencies = []
+    barrier = threading.Barrier(threads + 1)
+
+    def worker():
+        client = Client()
+        client.force_login(users[threading.get_ident() % len(users)])
+        barrier.wait()
+        try:
+            while True:
+                with lock:
+                    number = next(next_request, None)
+                if number is None:
+                    return
+                started = time.perf_counter()
+                response = client.get('/adaptive-quiz/', {'topic': TOPIC})
+                _check(response, errors)
+                with lock:
+                    latencies.append((time.perf_counter() - started) * 1000)
+        finally:
+            connections.close_all()
+
+    workers = [threading.Thread(target=worker) for _ in range(threads)]
+    for thread in workers:
+        thread.start()
+    barrier.wait()
+    started = time.perf_counter()
+    for thread in workers:
+        thread.join()
+    return time.perf_counter() - started, latencies
+
+
+def run(requests, latency, interface, threads):
+    """Drive the requests against a fake LLM and return a JSON-serialisable report"""
+    setup_django()
+    from django.conf import settings
+
+    with FakeLLMServer(latency) as server:
+        _configure(server.url, latency)
+        with temporary_database() as connection:
+            # Logged-in sessions need users; a few are enough
+            users = create_users(min(requests, 50))
+
+            # One unrecorded request loads URLconf, templates and the clients
+            from django.test import Client
+            warm_up = Client()
+            warm_up.force_login(users[0])
+            errors = []
+            _check(warm_up.get('/adaptive-quiz/', {'topic': TOPIC}), errors)
+            if errors:
+                raise SystemExit(f"Warm-up request failed: {errors[0]}")
+            server.requests = server.peak_in_flight = 0
+
+            if interface == 'asgi':
+                elapsed, latencies = _drive_asgi(users, requests, errors)
+            else:
+                elapsed, latencies = _drive_wsgi(users, requests, threads, errors)
+            vendor = connection.vendor
+
+    return {
+        'interface': interface,
+        'vendor': vendor,
+        'requests': requests,
+        'threads': threads if interface == 'wsgi' else None,
+        'latency_seconds': latency,
+        'elapsed_seconds': elapsed,
+        'requests_per_second': requests / elapsed if elapsed else 0.0,
+        'latency_ms': summarize(latencies),
+        'peak_in_flight': server.peak_in_flight,
+        'llm_requests': server.requests,
+        'async_client_max_connections': getattr(settings, 'GROQ_ASYNC_MAX_CONNECTIONS', None),
+        'errors': len(errors),
+        'first_error': errors[0] if errors else '',
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--requests', type=int, default=200, help="Concurrent adaptive quiz requests")
+    parser.add_argument('--latency', type=float, default=2.0, help="Seconds the fake LLM sleeps per completion")
+    parser.add_argument('--interface', choices=('asgi', 'wsgi'), default='asgi')
+    parser.add_argument('--threads', type=int, default=8, help="WSGI worker threads")
+    parser.add_argument('--json', action='store_true', help="Print the report as JSON")
+    args = parser.parse_args(argv)
+
+    report = run(args.requests, args.latency, args.interface, args.threads)
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return
+
+    stats = report['latency_ms']
+    workers = f"{args.threads} threads" if args.interface == 'wsgi' else "one event loop"
+    print(f"{args.requests} adaptive quiz requests over {workers} ({args.interface.upper()}), "
+          f"fake LLM latency {args.latency:.2f}s")
+    print(f"elapsed {report['elapsed_seconds']:.2f}s, {report['requests_per_second']:.1f} requests/s")
+    print(f"latency p50 {stats['p50']:.0f}ms  p95 {stats['p95']:.0f}ms  p99 {stats['p99']:.0f}ms")
+    print(f"peak completions in flight at the LLM: {report['peak_in_flight']} "
+          f"({report['llm_requests']} requests), {report['errors']} errors")
+    if report['first_error']:
+        print(f"first error: {report['first_error']}")
+
+
+if __name__ == '__main__':
+    main()
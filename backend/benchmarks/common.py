@@ -0,0 +1,178 @@
+"""
+Shared helpers for benchmarks: Django setup, throwaway databases, seeding and timing
+"""
+import math
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from contextlib import contextmanager
+from datetime import timedelta
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+
+TOPICS = [
+    'Logical Reasoning',
+    'Quantitative Aptitude',
+    'Data Interpretation',
+    'Verbal Ability',
+    'Pattern Recognition',
+    'Probability',
+    'Number Series',
+    'Puzzles',
+]
+
+
+def setup_django():
+    """Configure Django for a standalone benchmark script"""
+    if str(BACKEND_DIR) not in sys.path:
+        sys.path.insert(0, str(BACKEND_DIR))
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'backend.settings')
+    os.environ.setdefault('DJANGO_SECRET_KEY', 'benchmark-only-secret-key')
+
+    import django
+    django.setup()
+
+
+@contextmanager
+def temporary_database(on_disk=True):
+    """
+    Create a migrated throwaway database (the same way the test runner does)
+    and drop it afterwards. SQLite databases live in a temp file when on_disk.
+    """
+    from django.db import connection
+
+    temp_dir = None
+    if on_disk and connection.vendor == 'sqlite':
+        temp_dir = tempfile.TemporaryDirectory(prefix='bench-db-')
+        connection.settings_dict.setdefault('TEST', {})['NAME'] = str(Path(temp_dir.name) / 'bench.sqlite3')
+
+    old_name = connection.settings_dict['NAME']
+    connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+    try:
+        yield connection
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+        if temp_dir is not None:
+            temp_dir.cleanup()
+
+
+def create_users(count, password=None, prefix='bench_user'):
+    """Create benchmark users; returns list of User objects"""
+    from django.contrib.auth.hashers import make_password
+    from django.contrib.auth.models import User
+
+    # Hash once: per-user hashing would dominate seeding time
+    hashed = make_password(password) if password else '!'
+    User.objects.bulk_create(
+        [User(username=f'{prefix}_{index}', password=hashed) for index in range(count)],
+        batch_size=1000,
+    )
+    return list(User.objects.filter(username__startswith=f'{prefix}_').order_by('id'))
+
+
+def seed_practice(users, attempts_per_user, sessions_per_user=0, batch_size=5000, seed=42):
+    """
+    Insert PracticeActivity (and optionally QuizSession) rows with spread
+    timestamps. Uses raw executemany so auto_now_add does not flatten the times.
+    Returns the number of attempts inserted.
+    """
+    from django.db import connection, transaction
+    from django.utils import timezone
+    from users.models import PracticeActivity, QuizSession
+
+    rng = random.Random(seed)
+    start = timezone.now() - timedelta(days=365)
+
+    activity_table = connection.ops.quote_name(PracticeActivity._meta.db_table)
+    activity_sql = (
+        f"INSERT INTO {activity_table} (user_id, question_id, topic, difficulty, selected_option, "
+        "correct_answer, is_correct, time_taken, attempted_at, recorded_at) "
+        "VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s)"
+    )
+    session_table = connection.ops.quote_name(QuizSession._meta.db_table)
+    session_sql = (
+        f"INSERT INTO {session_table} (user_id, total_questions, correct_answers, accuracy, "
+        "total_time, completed_at) VALUES (%s, %s, %s, %s, %s, %s)"
+    )
+
+    inserted = 0
+    batch = []
+    with transaction.atomic(), connection.cursor() as cursor:
+        for user in users:
+            # Each user has a few favourite topics, like real learners
+            user_topics = rng.sample(TOPICS, k=rng.randint(3, len(TOPICS)))
+            skill = rng.uniform(0.3, 0.9)
+            for index in range(attempts_per_user):
+                is_correct = rng.random() < skill
+                correct_answer = rng.randint(0, 3)
+                row = (
+                    user.pk,
+                    rng.randint(1, 10),
+                    rng.choice(user_topics),
+                    'Easy',
+                    correct_answer if is_correct else (correct_answer + 1) % 4,
+                    correct_answer,
+                    is_correct,
+                    rng.randint(5, 120),
+                    connection.ops.adapt_datetimefield_value(
+                        start + timedelta(minutes=index * 7 + rng.randint(0, 5))
+                    ),
+                )
+                # Seeded history counts as written when it was answered (recorded_at)
+                batch.append((*row, row[-1]))
+                if len(batch) >= batch_size:
+                    cursor.executemany(activity_sql, batch)
+                    inserted += len(batch)
+                    batch = []
+
+            if sessions_per_user:
+                cursor.executemany(session_sql, [
+                    (user.pk, 10, correct, correct * 10.0, rng.randint(100, 900),
+                     connection.ops.adapt_datetimefield_value(start + timedelta(days=index)))
+                    for index, correct in enumerate(rng.randint(0, 10) for _ in range(sessions_per_user))
+                ])
+
+        if batch:
+            cursor.executemany(activity_sql, batch)
+            inserted += len(batch)
+
+    return inserted
+
+
+def analyze(connection):
+    """Refresh planner statistics after bulk loads or index changes"""
+    with connection.cursor() as cursor:
+        cursor.execute('ANALYZE')
+
+
+def time_call(func, repeat=5):
+    """Run func repeat times; returns list of durations in milliseconds"""
+    durations = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        durations.append((time.perf_counter() - started) * 1000)
+    return durations
+
+
+def percentile(values, pct):
+    """Nearest-rank percentile of a list of numbers"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(0, min(len(ordered) - 1, math.ceil(pct / 100 * len(ordered)) - 1))
+    return ordered[rank]
+
+
+def summarize(durations):
+    """p50/p95/p99/mean of a list of durations in milliseconds"""
+    return {
+        'p50': percentile(durations, 50),
+        'p95': percentile(durations, 95),
+        'p99': percentile(durations, 99),
+        'mean': statistics.fmean(durations) if durations else 0.0,
+    }
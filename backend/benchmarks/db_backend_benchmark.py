@@ -0,0 +1,171 @@
+"""
+Concurrent write/read load against each database profile in backend/settings.py
+
+Usage (from backend/):
+    python -m benchmarks.db_backend_benchmark --workers 8 --attempts 200
+    python -m benchmarks.db_backend_benchmark --postgres-url postgres://user:pw@localhost:5432/learn
+
+Each worker thread plays one learner answering questions (record_attempt, the
+quiz write path) and opening the dashboard every few answers. Profiles run in
+separate processes because settings are read once per process:
+
+- sqlite-legacy: the old settings (rollback journal, no pragmas)
+- sqlite-wal: the current SQLite profile (WAL, tuned pragmas, IMMEDIATE transactions)
+- postgres: DATABASE_URL profile, only when --postgres-url (or
+  BENCH_POSTGRES_URL) is given and reachable; the test database is created
+  next to the named one and dropped afterwards
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+
+from .common import BACKEND_DIR, TOPICS, create_users, setup_django, summarize, temporary_database
+
+PROFILES = ('sqlite-legacy', 'sqlite-wal', 'postgres')
+
+
+def _profile_env(profile, postgres_url):
+    env = dict(os.environ)
+    env.pop('DATABASE_URL', None)
+    if profile == 'sqlite-legacy':
+        env['SQLITE_WAL'] = 'False'
+    elif profile == 'postgres':
+        env['DATABASE_URL'] = postgres_url
+    return env
+
+
+def _learner(user, attempts, read_every, barrier, latencies, errors):
+    from django.db import connections
+    from users.analytics import get_topic_summaries
+    from users.rollups import record_attempt
+
+    barrier.wait()
+    try:
+        for index in range(attempts):
+            started = time.perf_counter()
+            try:
+                record_attempt(
+                    user=user,
+                    question_id=index % 10 + 1,
+                    topic=TOPICS[index % len(TOPICS)],
+                    difficulty='Easy',
+                    selected_option=index % 4,
+                    correct_answer=0,
+                    is_correct=index % 4 == 0,
+                    time_taken=10,
+                )
+                latencies['write'].append((time.perf_counter() - started) * 1000)
+            except Exception as exc:
+                errors.append(f"write: {exc}")
+
+            if read_every and index % read_every == 0:
+                started = time.perf_counter()
+                try:
+                    get_topic_summaries(user)
+                    latencies['read'].append((time.perf_counter() - started) * 1000)
+                except Exception as exc:
+                    errors.append(f"read: {exc}")
+    finally:
+        connections.close_all()
+
+
+def run_profile(profile, workers, attempts, read_every):
+    """Run the workload in this process; returns a JSON-serialisable result"""
+    setup_django()
+    from django.db import connection
+
+    if profile == 'sqlite-legacy':
+        # The settings before WAL: default journal, no timeout or pragmas
+        connection.settings_dict['OPTIONS'] = {}
+
+    with temporary_database() as connection:
+        users = create_users(workers)
+        barrier = threading.Barrier(workers + 1)
+        latencies = {'write': [], 'read': []}
+        errors = []
+        threads = [
+            threading.Thread(target=_learner, args=(user, attempts, read_every, barrier, latencies, errors))
+            for user in users
+        ]
+        for thread in threads:
+            thread.start()
+        barrier.wait()
+        started = time.perf_counter()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+
+        if connection.vendor == 'sqlite':
+            with connection.cursor() as cursor:
+                cursor.execute('PRAGMA journal_mode')
+                journal_mode = cursor.fetchone()[0]
+        else:
+            journal_mode = '-'
+
+    return {
+        'profile': profile,
+        'vendor': connection.vendor,
+        'journal_mode': journal_mode,
+        'writes_per_second': len(latencies['write']) / elapsed if elapsed else 0.0,
+        'write': summarize(latencies['write']),
+        'read': summarize(latencies['read']),
+        'errors': len(errors),
+        'first_error': errors[0] if errors else '',
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--workers', type=int, default=8, help="Concurrent learners (threads)")
+    parser.add_argument('--attempts', type=int, default=200, help="Answers per learner")
+    parser.add_argument('--read-every', type=int, default=5, help="Dashboard read every N answers (0 disables)")
+    parser.add_argument('--postgres-url', default=os.getenv('BENCH_POSTGRES_URL', ''))
+    parser.add_argument('--profile', choices=PROFILES, help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.profile:
+        # Child process: run one profile and report on stdout
+        print(json.dumps(run_profile(args.profile, args.workers, args.attempts, args.read_every)))
+        return
+
+    results = []
+    for profile in PROFILES:
+        if profile == 'postgres' and not args.postgres_url:
+            print("postgres: skipped (pass --postgres-url or set BENCH_POSTGRES_URL)")
+            continue
+        print(f"{profile}: {args.workers} workers x {args.attempts} answers...")
+        child = subprocess.run(
+            [sys.executable, '-m', 'benchmarks.db_backend_benchmark', '--profile', profile,
+             '--workers', str(args.workers), '--attempts', str(args.attempts),
+             '--read-every', str(args.read_every)],
+            cwd=BACKEND_DIR,
+            env=_profile_env(profile, args.postgres_url),
+            capture_output=True,
+            text=True,
+        )
+        if child.returncode != 0:
+            print(f"{profile}: failed\n{child.stderr.strip().splitlines()[-1] if child.stderr else ''}")
+            continue
+        results.append(json.loads(child.stdout.strip().splitlines()[-1]))
+
+    print()
+    print(
+        f"{'profile':15} {'journal':>8} {'writes/s':>9} {'write p50':>10} {'write p95':>10} "
+        f"{'read p50':>9} {'read p95':>9} {'errors':>7}"
+    )
+    for result in results:
+        print(
+            f"{result['profile']:15} {result['journal_mode']:>8} {result['writes_per_second']:>9.1f} "
+            f"{result['write']['p50']:>8.2f}ms {result['write']['p95']:>8.2f}ms "
+            f"{result['read']['p50']:>7.2f}ms {result['read']['p95']:>7.2f}ms {result['errors']:>7}"
+        )
+        if result['first_error']:
+            print(f"  first error: {result['first_error']}")
+
+
+if __name__ == '__main__':
+    main()
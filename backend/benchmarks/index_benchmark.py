@@ -0,0 +1,119 @@
+"""
+Query plans and timings with and without the composite indexes from
+users/migrations/0003_practice_and_session_indexes.py
+
+Usage (from backend/):
+    python -m benchmarks.index_benchmark --users 2000 --attempts 1000
+
+Seeds users x attempts PracticeActivity rows (2M by default) into a
+throwaway database, drops the composite indexes, measures the app's hot
+queries, then recreates the indexes and measures again.
+"""
+import argparse
+import random
+
+from .common import analyze, create_users, seed_practice, setup_django, summarize, temporary_database, time_call
+
+
+def _hot_queries(user, topic):
+    """The access patterns used by views, analytics and feature_engineering"""
+    from users.analytics import get_topic_summaries
+    from users.models import PracticeActivity, QuizSession
+
+    return {
+        'topic history (features)': lambda: list(
+            PracticeActivity.objects.filter(user=user, topic=topic).order_by('attempted_at')
+            .values_list('is_correct', 'time_taken')
+        ),
+        'topic summaries (analytics)': lambda: get_topic_summaries(user),
+        'correct count (user)': lambda: PracticeActivity.objects.filter(user=user, is_correct=True).count(),
+        'session trend (dashboard)': lambda: list(
+            QuizSession.objects.filter(user=user).order_by('completed_at')[:10]
+        ),
+    }
+
+
+def _explain_queries(user, topic):
+    from users.models import PracticeActivity, QuizSession
+
+    return {
+        'topic history (features)': PracticeActivity.objects.filter(user=user, topic=topic)
+        .order_by('attempted_at').values_list('is_correct', 'time_taken'),
+        'correct count (user)': PracticeActivity.objects.filter(user=user, is_correct=True).order_by(),
+        'session trend (dashboard)': QuizSession.objects.filter(user=user).order_by('completed_at')[:10],
+    }
+
+
+def _measure(connection, sample_users, repeat):
+    results = {}
+    for user, topic in sample_users:
+        for name, query in _hot_queries(user, topic).items():
+            results.setdefault(name, []).extend(time_call(query, repeat=repeat))
+
+    user, topic = sample_users[0]
+    plans = {name: queryset.explain() for name, queryset in _explain_queries(user, topic).items()}
+    return {name: summarize(durations) for name, durations in results.items()}, plans
+
+
+def _model_indexes():
+    from users.models import PracticeActivity, QuizSession
+
+    return [(model, index) for model in (PracticeActivity, QuizSession) for index in model._meta.indexes]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--users', type=int, default=2000)
+    parser.add_argument('--attempts', type=int, default=1000, help="Attempts per user")
+    parser.add_argument('--sessions', type=int, default=50, help="Quiz sessions per user")
+    parser.add_argument('--sample', type=int, default=20, help="Users sampled for timing")
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args(argv)
+
+    setup_django()
+
+    with temporary_database() as connection:
+        print(f"Seeding {args.users} users x {args.attempts} attempts on {connection.vendor}...")
+        users = create_users(args.users)
+        inserted = seed_practice(users, args.attempts, sessions_per_user=args.sessions)
+        print(f"Inserted {inserted} practice rows")
+
+        from users.models import PracticeActivity
+        rng = random.Random(7)
+        sample_users = []
+        for user in rng.sample(users, k=min(args.sample, len(users))):
+            topic = PracticeActivity.objects.filter(user=user).values_list('topic', flat=True).first()
+            sample_users.append((user, topic))
+
+        with connection.schema_editor() as editor:
+            for model, index in _model_indexes():
+                editor.remove_index(model, index)
+        analyze(connection)
+        before, before_plans = _measure(connection, sample_users, args.repeat)
+
+        with connection.schema_editor() as editor:
+            for model, index in _model_indexes():
+                editor.add_index(model, index)
+        analyze(connection)
+        after, after_plans = _measure(connection, sample_users, args.repeat)
+
+    print()
+    print(f"{'query':32} {'before p50':>11} {'after p50':>11} {'before p95':>11} {'after p95':>11} {'speedup':>8}")
+    for name in before:
+        speedup = before[name]['p50'] / after[name]['p50'] if after[name]['p50'] else float('inf')
+        print(
+            f"{name:32} {before[name]['p50']:>9.2f}ms {after[name]['p50']:>9.2f}ms "
+            f"{before[name]['p95']:>9.2f}ms {after[name]['p95']:>9.2f}ms {speedup:>7.1f}x"
+        )
+
+    for name in before_plans:
+        print()
+        print(f"== {name}")
+        print("-- without composite indexes")
+        print(before_plans[name])
+        print("-- with composite indexes")
+        print(after_plans[name])
+
+
+if __name__ == '__main__':
+    main()
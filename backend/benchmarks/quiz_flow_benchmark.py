@@ -0,0 +1,283 @@
+"""
+End-to-end load test of the quiz flow through the Django request stack
+
+Usage (from backend/):
+    python -m benchmarks.quiz_flow_benchmark --users 200 --attempts 300 --clients 8 --flows 40
+    python -m benchmarks.quiz_flow_benchmark --interface asgi --clients 32
+
+Seeds users x attempts PracticeActivity rows into a throwaway database, then
+concurrent simulated clients each play one learner's visit:
+
+    login (GET + POST) -> quiz (GET + POST per question) -> quiz_summary
+    -> dashboard -> weak_areas
+
+Requests go through the full middleware stack and URLconf with Django's test
+clients: threads with Client for WSGI, coroutines with AsyncClient for ASGI.
+Reports p50/p95/p99 latency per step, queries and database time per request
+(from users.instrumentation) and the database write rate
+(INSERT/UPDATE/DELETE statements per second, sessions included).
+
+Logins use a fast password hasher unless --real-hasher is given, so the
+numbers describe the app rather than PBKDF2.
+"""
+import argparse
+import asyncio
+import json
+import re
+import threading
+import time
+from collections import defaultdict
+
+from .common import create_users, seed_practice, setup_django, summarize, temporary_database
+
+PASSWORD = 'bench-pass-123'
+
+_QUESTION_ID = re.compile(r'name="question_id" value="([^"]+)"')
+
+
+def _configure(real_hasher):
+    from django.conf import settings
+
+    if 'users.instrumentation.RequestTimingMiddleware' not in settings.MIDDLEWARE:
+        raise SystemExit("users.instrumentation.RequestTimingMiddleware must be in MIDDLEWARE")
+    # The test clients send Host: testserver
+    settings.ALLOWED_HOSTS = [*settings.ALLOWED_HOSTS, 'testserver']
+    if not real_hasher:
+        settings.PASSWORD_HASHERS = ['django.contrib.auth.hashers.MD5PasswordHasher']
+
+
+class Recorder:
+    """Thread-safe collection of per-step latencies and query counts"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.latencies = defaultdict(list)
+        self.queries = defaultdict(list)
+        self.db_ms = defaultdict(list)
+        self.writes = 0
+        self.errors = []
+
+    def record(self, step, started, response, expected=(200, 302)):
+        elapsed = (time.perf_counter() - started) * 1000
+        # Timings the middleware left on the request the test client sent
+        request = getattr(response, 'wsgi_request', None) or response.asgi_request
+        timings = request.timings
+        with self._lock:
+            self.latencies[step].append(elapsed)
+            self.queries[step].append(timings.queries)
+            self.db_ms[step].append(timings.db_seconds * 1000)
+            self.writes += timings.writes
+            if response.status_code not in expected:
+                self.errors.append(f"{step}: HTTP {response.status_code}")
+
+
+def _question_id(response):
+    match = _QUESTION_ID.search(response.content.decode())
+    return match.group(1) if match else '0'
+
+
+def _answer(flow_number, question_number):
+    # Deterministic spread of options and answer times
+    return str((flow_number + question_number) % 4), str(5 + (flow_number * 7 + question_number * 13) % 90)
+
+
+def _run_flow(client, username, flow_number, recorder):
+    """One learner's visit with a synchronous (WSGI) client"""
+    from django.urls import reverse
+
+    started = time.perf_counter()
+    recorder.record('login GET', started, client.get(reverse('login')))
+    started = time.perf_counter()
+    recorder.record('login POST', started, client.post(reverse('login'), {'username': username, 'password': PASSWORD}))
+
+    url = reverse('quiz')
+    started = time.perf_counter()
+    response = client.get(url, {'new': 1})
+    recorder.record('quiz GET', started, response)
+    question_number = 0
+    while response.status_code == 200:
+        option, time_taken = _answer(flow_number, question_number)
+        started = time.perf_counter()
+        recorder.record('quiz POST', started, client.post(url, {
+            'question_id': _question_id(response), 'selected_option': option, 'time_taken': time_taken,
+        }))
+        question_number += 1
+        started = time.perf_counter()
+        response = client.get(url)
+        # The GET after the last answer redirects to the summary
+        recorder.record('quiz GET', started, response)
+
+    for step in ('quiz_summary', 'dashboard', 'weak_areas'):
+        started = time.perf_counter()
+        recorder.record(step, started, client.get(reverse(step)))
+
+
+async def _run_flow_async(client, username, flow_number, recorder):
+    """One learner's visit with an AsyncClient (ASGI)"""
+    from django.urls import reverse
+
+    started = time.perf_counter()
+    recorder.record('login GET', started, await client.get(reverse('login')))
+    started = time.perf_counter()
+    recorder.record(
+        'login POST', started, await client.post(reverse('login'), {'username': username, 'password': PASSWORD})
+    )
+
+    url = reverse('quiz')
+    started = time.perf_counter()
+    response = await client.get(url, {'new': 1})
+    recorder.record('quiz GET', started, response)
+    question_number = 0
+    while response.status_code == 200:
+        option, time_taken = _answer(flow_number, question_number)
+        started = time.perf_counter()
+        recorder.record('quiz POST', started, await client.post(url, {
+            'question_id': _question_id(response), 'selected_option': option, 'time_taken': time_taken,
+        }))
+        question_number += 1
+        started = time.perf_counter()
+        response = await client.get(url)
+        recorder.record('quiz GET', started, response)
+
+    for step in ('quiz_summary', 'dashboard', 'weak_areas'):
+        started = time.perf_counter()
+        recorder.record(step, started, await client.get(reverse(step)))
+
+
+def _drive_wsgi(usernames, clients, flows, recorder):
+    from django.db import connections
+    from django.test import Client
+
+    next_flow = iter(range(flows))
+    lock = threading.Lock()
+    barrier = threading.Barrier(clients + 1)
+
+    def worker():
+        barrier.wait()
+        try:
+            while True:
+                with lock:
+                    flow_number = next(next_flow, None)
+                if flow_number is None:
+                    return
+                try:
+                    _run_flow(Client(), usernames[flow_number % len(usernames)], flow_number, recorder)
+                except Exception as exc:
+                    recorder.errors.append(f"flow {flow_number}: {exc!r}")
+        finally:
+            connections.close_all()
+
+    threads = [threading.Thread(target=worker) for _ in range(clients)]
+    for thread in threads:
+        thread.start()
+    barrier.wait()
+    started = time.perf_counter()
+    for thread in threads:
+        thread.join()
+    return time.perf_counter() - started
+
+
+def _drive_asgi(usernames, clients, flows, recorder):
+    from django.test import AsyncClient
+
+    async def main():
+        semaphore = asyncio.Semaphore(clients)
+
+        async def flow(flow_number):
+            async with semaphore:
+                try:
+                    await _run_flow_async(AsyncClient(), usernames[flow_number % len(usernames)], flow_number, recorder)
+                except Exception as exc:
+                    recorder.errors.append(f"flow {flow_number}: {exc!r}")
+
+        started = time.perf_counter()
+        await asyncio.gather(*(flow(number) for number in range(flows)))
+        return time.perf_counter() - started
+
+    return asyncio.run(main())
+
+
+def run(users, attempts, sessions, clients, flows, interface, real_hasher):
+    """Seed, drive the flows and return a JSON-serialisable report"""
+    setup_django()
+    _configure(real_hasher)
+
+    with temporary_database() as connection:
+        seeded = create_users(users, password=PASSWORD)
+        inserted = seed_practice(seeded, attempts, sessions_per_user=sessions)
+        usernames = [user.username for user in seeded]
+
+        # One unrecorded visit loads URLconf, templates and the question set
+        from django.db import connections
+        from django.test import Client
+        _run_flow(Client(), usernames[0], 0, Recorder())
+        connections.close_all()
+
+        recorder = Recorder()
+        drive = _drive_asgi if interface == 'asgi' else _drive_wsgi
+        elapsed = drive(usernames, clients, flows, recorder)
+        vendor = connection.vendor
+
+    requests = sum(len(durations) for durations in recorder.latencies.values())
+    return {
+        'interface': interface,
+        'vendor': vendor,
+        'seeded_attempts': inserted,
+        'clients': clients,
+        'flows': flows,
+        'elapsed_seconds': elapsed,
+        'requests_per_second': requests / elapsed if elapsed else 0.0,
+        'writes_per_second': recorder.writes / elapsed if elapsed else 0.0,
+        'steps': {
+            step: {
+                **summarize(durations),
+                'requests': len(durations),
+                'queries_per_request': sum(recorder.queries[step]) / len(durations),
+                'db_ms_per_request': sum(recorder.db_ms[step]) / len(durations),
+            }
+            for step, durations in recorder.latencies.items()
+        },
+        'errors': len(recorder.errors),
+        'first_error': recorder.errors[0] if recorder.errors else '',
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--users', type=int, default=200, help="Seeded learners")
+    parser.add_argument('--attempts', type=int, default=300, help="Seeded attempts per learner")
+    parser.add_argument('--sessions', type=int, default=20, help="Seeded quiz sessions per learner")
+    parser.add_argument('--clients', type=int, default=8, help="Concurrent simulated clients")
+    parser.add_argument('--flows', type=int, default=40, help="Learner visits to play in total")
+    parser.add_argument('--interface', choices=('wsgi', 'asgi'), default='wsgi')
+    parser.add_argument('--real-hasher', action='store_true', help="Log in with the configured password hashers")
+    parser.add_argument('--json', action='store_true', help="Print the report as JSON")
+    args = parser.parse_args(argv)
+
+    if not args.json:
+        print(f"Seeding {args.users} users x {args.attempts} attempts, then {args.flows} flows "
+              f"over {args.clients} {args.interface.upper()} clients...")
+    report = run(args.users, args.attempts, args.sessions, args.clients, args.flows, args.interface, args.real_hasher)
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return
+
+    print()
+    print(f"{'step':14} {'requests':>8} {'p50':>9} {'p95':>9} {'p99':>9} {'queries':>8} {'db time':>9}")
+    for step, stats in report['steps'].items():
+        print(
+            f"{step:14} {stats['requests']:>8} {stats['p50']:>7.2f}ms {stats['p95']:>7.2f}ms "
+            f"{stats['p99']:>7.2f}ms {stats['queries_per_request']:>8.1f} {stats['db_ms_per_request']:>7.2f}ms"
+        )
+    print()
+    print(
+        f"{report['requests_per_second']:.1f} requests/s, {report['writes_per_second']:.1f} DB writes/s "
+        f"on {report['vendor']} over {report['elapsed_seconds']:.1f}s, {report['errors']} errors"
+    )
+    if report['first_error']:
+        print(f"first error: {report['first_error']}")
+
+
+if __name__ == '__main__':
+    main()
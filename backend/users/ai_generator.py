@@ -1,20 +1,40 @@
 """
 AI Question Generator using Groq (FREE alternative to Gemini)
 """
+import asyncio
 import logging
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from asgiref.sync import sync_to_async
 from django.conf import settings
 import json
 import re
 from json import JSONDecoder
-from .questions import get_all_questions
-
-try:
-    from groq import Groq
-except Exception:
-    Groq = None
+from .groq_client import get_client_manager
+from .instrumentation import track_external
+from .metrics import AI_GENERATION_SECONDS, AI_PARSE_FAILURES, QUESTION_REQUESTS
+from .questions import get_all_questions, get_questions_by_topic
+from .question_bank import bank_generated_questions, content_hash, draw_from_bank
 
 logger = logging.getLogger(__name__)
 
+SYSTEM_PROMPT = (
+    "You are an expert question generator for analytical aptitude tests. "
+    "Respond with valid JSON array only. No markdown, no commentary, "
+    "no trailing commas, and keep all strings properly escaped."
+)
+
+QUOTE_MAP = {
+    '“': '"',
+    '”': '"',
+    '‘': "'",
+    '’': "'",
+}
+
+_hedge_executor = None
+_hedge_executor_lock = threading.Lock()
+
 
 def _get_groq_models():
     configured = (getattr(settings, 'GROQ_MODEL', '') or '').strip()
@@ -28,25 +48,40 @@ def _get_groq_models():
 
 
 def _get_groq_client():
-    if Groq is None:
-        return None
-    api_key = getattr(settings, 'GROQ_API_KEY', '')
-    if not api_key:
-        return None
-    try:
-        return Groq(api_key=api_key)
-    except Exception:
-        logger.exception("Failed to initialize Groq client")
-        return None
+    # Shared across calls so keep-alive connections and TLS sessions are reused
+    return get_client_manager().get_client()
+
+
+def _get_async_groq_client():
+    return get_client_manager().get_async_client()
+
+
+def _run_async_groq(coroutine):
+    # The async client's connection pool belongs to the manager's event loop
+    return get_client_manager().run(coroutine)
+
+
+def _get_model_timeout(model_name):
+    """Latency budget in seconds for one request to model_name"""
+    budgets = getattr(settings, 'GROQ_MODEL_TIMEOUTS', {}) or {}
+    return budgets.get(model_name, getattr(settings, 'GROQ_REQUEST_TIMEOUT', 30.0))
+
+
+def _get_hedge_executor():
+    """Shared pool for hedged requests; callers never block on its shutdown"""
+    global _hedge_executor
+    with _hedge_executor_lock:
+        if _hedge_executor is None:
+            _hedge_executor = ThreadPoolExecutor(
+                max_workers=getattr(settings, 'GROQ_HEDGE_WORKERS', 4),
+                thread_name_prefix='groq-hedge',
+            )
+        return _hedge_executor
 
 
 def _get_static_fallback_questions(topic, difficulty='Easy', num_questions=5):
-    questions = [
-        q for q in get_all_questions()
-        if q.get('topic', '').lower() == topic.lower()
-    ]
-    if not questions:
-        questions = get_all_questions()
+    QUESTION_REQUESTS.inc(source='fallback')
+    questions = get_questions_by_topic(topic) or get_all_questions()
 
     formatted = []
     for index, q in enumerate(questions[:num_questions], start=1):
@@ -55,7 +90,8 @@ def _get_static_fallback_questions(topic, difficulty='Easy', num_questions=5):
             'topic': q.get('topic', topic),
             'difficulty': q.get('difficulty', difficulty),
             'question': q.get('question', ''),
-            'options': q.get('options', []),
+            # Stored inline in the session, so a plain list
+            'options': list(q.get('options', [])),
             'correct_answer': q.get('correct_answer', 0),
             'explanation': q.get('explanation', ''),
             'source': 'Static Fallback',
@@ -69,13 +105,7 @@ def _clean_response_text(response_text):
     cleaned = re.sub(r'```\s*', '', cleaned)
     cleaned = cleaned.strip()
 
-    quote_map = {
-        '“': '"',
-        '”': '"',
-        '‘': "'",
-        '’': "'",
-    }
-    for bad, good in quote_map.items():
+    for bad, good in QUOTE_MAP.items():
         cleaned = cleaned.replace(bad, good)
 
     return cleaned
@@ -110,37 +140,20 @@ def _parse_questions_response(response_text):
     if first_bracket != -1 and last_bracket > first_bracket:
         candidate = cleaned[first_bracket:last_bracket + 1]
         candidate = re.sub(r',\s*([}\]])', r'\1', candidate)
-        parsed = json.loads(candidate)
-        if isinstance(parsed, list):
-            return parsed
+        try:
+            parsed = json.loads(candidate)
+            if isinstance(parsed, list):
+                return parsed
+        except json.JSONDecodeError:
+            pass
 
+    # Every failure ends here, so each one is counted
+    AI_PARSE_FAILURES.inc(mode='batch')
     raise json.JSONDecodeError('Unable to parse AI response as JSON array', cleaned, 0)
 
 
-def generate_questions(topic, difficulty='Easy', num_questions=5, allow_fallback=True):
-    """
-    Generate quiz questions using Groq AI
-    
-    Args:
-        topic: Topic name (e.g., "Logical Reasoning")
-        difficulty: Easy, Medium, or Hard
-        num_questions: Number of questions to generate
-    
-    Returns:
-        List of question dictionaries
-    """
-    
-    client = _get_groq_client()
-    if client is None:
-        message = (
-            "Groq client unavailable. Ensure GROQ_API_KEY is set and groq package is installed."
-        )
-        if allow_fallback:
-            logger.warning("%s Falling back to static questions.", message)
-            return _get_static_fallback_questions(topic, difficulty, num_questions)
-        raise RuntimeError(message)
-
-    prompt = f"""Generate {num_questions} multiple-choice questions for a CSE analytics test.
+def _build_prompt(topic, difficulty, num_questions):
+    return f"""Generate {num_questions} multiple-choice questions for a CSE analytics test.
 
 Topic: {topic}
 Difficulty: {difficulty}
@@ -160,109 +173,586 @@ Return ONLY a valid JSON array in this exact format (no markdown, no extra text)
     "explanation": "Brief explanation here"
   }}
 ]"""
-    
-    last_error = None
-    last_response_text = ""
 
-    model_candidates = _get_groq_models()
+def _format_question(q, index, topic, difficulty, model_name):
+    """Shape one question object for the quiz views, or None if it is malformed"""
+    if not isinstance(q, dict) or not all(key in q for key in ['question', 'options', 'correct_answer', 'explanation']):
+        logger.warning("Skipping invalid question payload")
+        return None
+
+    options = q.get('options', [])
+    correct_answer = q.get('correct_answer')
 
-    for model_name in model_candidates:
-        for attempt in range(1, 3):
-            try:
-                if attempt > 1:
-                    logger.info(
-                        "Retrying AI generation with model %s (attempt %s/2)",
-                        model_name,
-                        attempt,
-                    )
-
-                response = client.chat.completions.create(
-                    model=model_name,
-                    messages=[
-                        {
-                            "role": "system",
-                            "content": (
-                                "You are an expert question generator for analytical aptitude tests. "
-                                "Respond with valid JSON array only. No markdown, no commentary, "
-                                "no trailing commas, and keep all strings properly escaped."
-                            )
-                        },
-                        {
-                            "role": "user",
-                            "content": prompt
-                        }
-                    ],
-                    temperature=0.7 if attempt == 1 else 0.2,
-                    max_tokens=2600,
-                )
+    if not isinstance(options, list) or len(options) != 4:
+        logger.warning("Skipping question with invalid options")
+        return None
+
+    if not isinstance(correct_answer, int) or correct_answer not in [0, 1, 2, 3]:
+        logger.warning("Skipping question with invalid correct_answer")
+        return None
 
-                response_text = (response.choices[0].message.content or "").strip()
-                last_response_text = response_text
+    return {
+        'id': f'ai_{topic}_{index}',
+        'topic': topic,
+        'difficulty': difficulty,
+        'question': q['question'],
+        'options': options,
+        'correct_answer': correct_answer,
+        'explanation': q['explanation'],
+        'source': f'Groq AI ({model_name})'
+    }
 
-                questions = _parse_questions_response(response_text)
 
-                formatted_questions = []
-                for i, q in enumerate(questions[:num_questions]):
-                    if not all(key in q for key in ['question', 'options', 'correct_answer', 'explanation']):
-                        logger.warning("Skipping invalid question payload")
-                        continue
+def _format_questions(questions, topic, difficulty, num_questions, model_name):
+    """Keep well-formed question objects and shape them for the quiz views"""
+    formatted_questions = []
+    for i, q in enumerate(questions[:num_questions]):
+        formatted = _format_question(q, i + 1, topic, difficulty, model_name)
+        if formatted is not None:
+            formatted_questions.append(formatted)
+    return formatted_questions
+
+
+def _completion_kwargs(model_name, prompt, attempt):
+    """Arguments of one chat completion request for questions"""
+    return {
+        'model': model_name,
+        'messages': [
+            {
+                "role": "system",
+                "content": SYSTEM_PROMPT
+            },
+            {
+                "role": "user",
+                "content": prompt
+            }
+        ],
+        'temperature': 0.7 if attempt == 1 else 0.2,
+        'max_tokens': 2600,
+        'timeout': _get_model_timeout(model_name),
+    }
 
-                    options = q.get('options', [])
-                    correct_answer = q.get('correct_answer')
 
-                    if not isinstance(options, list) or len(options) != 4:
-                        logger.warning("Skipping question with invalid options")
-                        continue
+def _log_retry(model_name, attempt):
+    if attempt > 1:
+        logger.info(
+            "Retrying AI generation with model %s (attempt %s/2)",
+            model_name,
+            attempt,
+        )
 
-                    if not isinstance(correct_answer, int) or correct_answer not in [0, 1, 2, 3]:
-                        logger.warning("Skipping question with invalid correct_answer")
-                        continue
 
-                    formatted_questions.append({
-                        'id': f'ai_{topic}_{i+1}',
-                        'topic': topic,
-                        'difficulty': difficulty,
-                        'question': q['question'],
-                        'options': options,
-                        'correct_answer': correct_answer,
-                        'explanation': q['explanation'],
-                        'source': f'Groq AI ({model_name})'
-                    })
+def _response_questions(response_text, model_name, topic, difficulty, num_questions, started):
+    """Parse completion text into questions; raises json.JSONDecodeError"""
+    questions = _parse_questions_response(response_text)
+    formatted_questions = _format_questions(questions, topic, difficulty, num_questions, model_name)
+    if formatted_questions:
+        AI_GENERATION_SECONDS.observe(time.monotonic() - started, model=model_name, outcome='success')
+        return formatted_questions, None, response_text
+
+    AI_GENERATION_SECONDS.observe(time.monotonic() - started, model=model_name, outcome='invalid')
+    return [], ValueError(f"AI returned no valid question objects for model {model_name}"), response_text
+
+
+def _request_failed(error, model_name, attempt, started, response_text):
+    """Record a failed request and return its (formatted_questions, error, response_text)"""
+    if isinstance(error, json.JSONDecodeError):
+        AI_GENERATION_SECONDS.observe(time.monotonic() - started, model=model_name, outcome='parse_error')
+        logger.warning("JSON parse error during AI generation (model=%s attempt=%s/2): %s", model_name, attempt, error)
+    else:
+        AI_GENERATION_SECONDS.observe(time.monotonic() - started, model=model_name, outcome='error')
+        logger.warning("Groq API error during generation (model=%s attempt=%s/2): %s", model_name, attempt, error)
+    return [], error, response_text
+
+
+def _request_model(client, model_name, prompt, topic, difficulty, num_questions, attempt):
+    """
+    Ask one model for questions
+
+    Returns (formatted_questions, error, response_text); formatted_questions
+    is empty whenever error is set. Does not touch the database, so it is
+    safe to run on the hedge pool.
+    """
+    response_text = ""
+    started = time.monotonic()
+    try:
+        _log_retry(model_name, attempt)
+        response = client.chat.completions.create(**_completion_kwargs(model_name, prompt, attempt))
+        response_text = (response.choices[0].message.content or "").strip()
+        return _response_questions(response_text, model_name, topic, difficulty, num_questions, started)
+    except Exception as e:
+        return _request_failed(e, model_name, attempt, started, response_text)
+
+
+async def _arequest_model(client, model_name, prompt, topic, difficulty, num_questions, attempt):
+    """_request_model with an AsyncGroq client"""
+    response_text = ""
+    started = time.monotonic()
+    try:
+        _log_retry(model_name, attempt)
+        response = await client.chat.completions.create(**_completion_kwargs(model_name, prompt, attempt))
+        response_text = (response.choices[0].message.content or "").strip()
+        return _response_questions(response_text, model_name, topic, difficulty, num_questions, started)
+    except Exception as e:
+        return _request_failed(e, model_name, attempt, started, response_text)
 
+
+def _request_hedged(client, model_candidates, prompt, topic, difficulty, num_questions, attempt):
+    """
+    Ask every candidate model at once and keep the first valid answer
+
+    Waits at most the largest per-model budget. Requests that have not
+    started are cancelled once a winner is found; running ones are left to
+    hit their own client timeout and their results are dropped.
+
+    Returns (model_name, formatted_questions, error, response_text).
+    """
+    executor = _get_hedge_executor()
+    futures = {
+        executor.submit(
+            _request_model, client, model_name, prompt, topic, difficulty, num_questions, attempt,
+        ): model_name
+        for model_name in model_candidates
+    }
+    deadline = time.monotonic() + max(_get_model_timeout(m) for m in model_candidates)
+
+    last_error = None
+    last_response_text = ""
+    pending = set(futures)
+    try:
+        while pending:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            done, pending = wait(pending, timeout=remaining, return_when=FIRST_COMPLETED)
+            for future in done:
+                formatted_questions, error, response_text = future.result()
+                if formatted_questions:
+                    return futures[future], formatted_questions, None, response_text
+                last_error = error or last_error
+                last_response_text = response_text or last_response_text
+    finally:
+        for future in pending:
+            future.cancel()
+
+    if pending:
+        last_error = last_error or TimeoutError(
+            "No model answered within its latency budget: " + ", ".join(futures[f] for f in pending)
+        )
+    return None, [], last_error, last_response_text
+
+
+async def _arequest_hedged(client, model_candidates, prompt, topic, difficulty, num_questions, attempt):
+    """
+    _request_hedged with an AsyncGroq client
+    Losing requests are cancelled outright instead of left to time out.
+    """
+    tasks = {
+        asyncio.ensure_future(
+            _arequest_model(client, model_name, prompt, topic, difficulty, num_questions, attempt)
+        ): model_name
+        for model_name in model_candidates
+    }
+    deadline = time.monotonic() + max(_get_model_timeout(m) for m in model_candidates)
+
+    last_error = None
+    last_response_text = ""
+    pending = set(tasks)
+    try:
+        while pending:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            done, pending = await asyncio.wait(pending, timeout=remaining, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                formatted_questions, error, response_text = task.result()
                 if formatted_questions:
-                    logger.info("Successfully generated %s questions using Groq model %s", len(formatted_questions), model_name)
-                    return formatted_questions
+                    return tasks[task], formatted_questions, None, response_text
+                last_error = error or last_error
+                last_response_text = response_text or last_response_text
+    finally:
+        for task in pending:
+            task.cancel()
+
+    if pending:
+        last_error = last_error or TimeoutError(
+            "No model answered within its latency budget: " + ", ".join(tasks[t] for t in pending)
+        )
+    return None, [], last_error, last_response_text
 
-                last_error = ValueError(f"AI returned no valid question objects for model {model_name}")
 
-            except json.JSONDecodeError as e:
-                last_error = e
-                logger.warning("JSON parse error during AI generation (model=%s attempt=%s/2): %s", model_name, attempt, e)
-            except Exception as e:
-                last_error = e
-                logger.warning("Groq API error during generation (model=%s attempt=%s/2): %s", model_name, attempt, e)
+def _generation_rounds(model_candidates, hedged):
+    """(models, attempt) pairs to try in order; several models are raced at once"""
+    if hedged:
+        # One round per attempt, every candidate model in flight at once
+        return [(model_candidates, attempt) for attempt in range(1, 3)]
+    return [([model_name], attempt) for model_name in model_candidates for attempt in range(1, 3)]
 
+
+def _log_generation_failure(last_error, last_response_text):
     if isinstance(last_error, json.JSONDecodeError):
         logger.warning("AI response sample after parse failure: %s", (last_response_text or '')[:250])
     else:
         logger.error("Final AI generation failure: %s", last_error)
 
+
+class QuestionStreamParser:
+    """
+    Incremental parser for a streamed JSON array of question objects
+
+    feed() takes raw completion text as it arrives and returns every object
+    whose closing brace has been seen. Applies the same cleaning as
+    _parse_questions_response: text before the first '[' (markdown fences,
+    commentary) is ignored, curly quotes are normalized and trailing commas
+    inside an object are dropped.
+    """
+
+    def __init__(self):
+        self._buffer = ''
+        self._started = False
+        self.finished = False
+        self._object_start = None
+        self._depth = 0
+        self._in_string = False
+        self._escaped = False
+
+    def feed(self, text):
+        objects = []
+        if self.finished or not text:
+            return objects
+
+        for bad, good in QUOTE_MAP.items():
+            text = text.replace(bad, good)
+
+        for char in text:
+            if not self._started:
+                self._started = char == '['
+                continue
+
+            if self._object_start is None:
+                if char == '{':
+                    self._object_start = len(self._buffer)
+                    self._depth = 1
+                    self._buffer += char
+                elif char == ']':
+                    self.finished = True
+                    break
+                continue
+
+            self._buffer += char
+            if self._in_string:
+                if self._escaped:
+                    self._escaped = False
+                elif char == '\\':
+                    self._escaped = True
+                elif char == '"':
+                    self._in_string = False
+            elif char == '"':
+                self._in_string = True
+            elif char == '{':
+                self._depth += 1
+            elif char == '}':
+                self._depth -= 1
+                if self._depth == 0:
+                    objects.append(self._decode(self._buffer[self._object_start:]))
+                    self._buffer = ''
+                    self._object_start = None
+
+        return [obj for obj in objects if obj is not None]
+
+    @staticmethod
+    def _decode(candidate):
+        try:
+            return json.loads(candidate)
+        except json.JSONDecodeError:
+            pass
+        try:
+            return json.loads(re.sub(r',\s*([}\]])', r'\1', candidate))
+        except json.JSONDecodeError as e:
+            AI_PARSE_FAILURES.inc(mode='stream')
+            logger.warning("Skipping unparseable streamed question: %s", e)
+            return None
+
+    def close(self):
+        """Raise if the stream never contained a JSON array"""
+        if not self._started:
+            raise json.JSONDecodeError('No JSON array in streamed AI response', self._buffer, 0)
+
+
+def _stream_model(client, model_name, prompt, topic, difficulty, num_questions, attempt):
+    """Yield validated questions from one streamed completion as each object closes"""
+    stream = client.chat.completions.create(**_completion_kwargs(model_name, prompt, attempt), stream=True)
+    parser = QuestionStreamParser()
+    index = 0
+    try:
+        for chunk in stream:
+            if not chunk.choices:
+                continue
+            for q in parser.feed(chunk.choices[0].delta.content or ''):
+                index += 1
+                formatted = _format_question(q, index, topic, difficulty, model_name)
+                if formatted is not None:
+                    yield formatted
+                if index >= num_questions:
+                    return
+            if parser.finished:
+                return
+        parser.close()
+    finally:
+        # Stop the server side generating text nobody will read
+        close = getattr(stream, 'close', None)
+        if close is not None:
+            close()
+
+
+def _bank(questions, model_name, use_bank):
+    return bank_generated_questions(questions, model_name) if use_bank else questions
+
+
+def _batch_round(client, models, prompt, topic, difficulty, num_questions, attempt, use_bank):
+    """
+    One generation round answered in one piece (hedged when several models)
+    Yields the question list once if the round succeeded.
+    Returns (model_name or None, questions_yielded, error, response_text)
+    """
+    if len(models) > 1:
+        model_name, formatted_questions, error, response_text = _request_hedged(
+            client, models, prompt, topic, difficulty, num_questions, attempt,
+        )
+    else:
+        model_name = models[0]
+        formatted_questions, error, response_text = _request_model(
+            client, model_name, prompt, topic, difficulty, num_questions, attempt,
+        )
+    if not formatted_questions:
+        return None, 0, error, response_text
+    yield _bank(formatted_questions, model_name, use_bank)
+    return model_name, len(formatted_questions), None, response_text
+
+
+def _stream_round(client, models, prompt, topic, difficulty, num_questions, attempt, use_bank):
+    """
+    One generation round read from a streamed completion of models[0]
+    Yields each question as a one-element list as soon as it closes;
+    questions already yielded are never retracted, so an error after the
+    first one still ends the search. Same return value as _batch_round.
+    """
+    model_name = models[0]
+    started = time.monotonic()
+    seen = set()
+    error = None
+    try:
+        _log_retry(model_name, attempt)
+        for question in _stream_model(client, model_name, prompt, topic, difficulty, num_questions, attempt):
+            digest = content_hash(question['topic'], question['difficulty'], question['question'], question['options'])
+            if digest in seen:
+                continue
+            seen.add(digest)
+            yield _bank([question], model_name, use_bank)
+    except Exception as e:
+        if isinstance(e, json.JSONDecodeError):
+            AI_PARSE_FAILURES.inc(mode='stream')
+        _, error, _ = _request_failed(e, model_name, attempt, started, "")
+
+    if seen:
+        if error is None:
+            AI_GENERATION_SECONDS.observe(time.monotonic() - started, model=model_name, outcome='success')
+        return model_name, len(seen), None, ""
+    if error is None:
+        AI_GENERATION_SECONDS.observe(time.monotonic() - started, model=model_name, outcome='invalid')
+        error = ValueError(f"AI returned no valid question objects for model {model_name}")
+    return None, 0, error, ""
+
+
+def _generation_steps(topic, difficulty, num_questions, allow_fallback, use_bank, hedged, stream):
+    """
+    Questions from the bank, Groq or the static fallback, in that order
+    The one procedure behind every generation path, independent of how the
+    bank and Groq are reached. Yields steps for a driver to carry out and
+    is sent each step's result:
+        ('bank',)           -> questions drawn from the bank, maybe none
+        ('client',)         -> a Groq client, or None
+        ('round', client, models, prompt, attempt)
+                            -> (model_name or None, questions_produced, error, response_text)
+        ('questions', list) -> None; hand the list to the caller
+    A round hands its own questions to the caller. Raises RuntimeError when
+    everything failed and allow_fallback is off.
+    """
+    if use_bank:
+        # Cheap indexed query; only call Groq when the bank is running low
+        banked = yield ('bank',)
+        if banked:
+            logger.info("Served %s %s questions for %s from the question bank", len(banked), difficulty, topic)
+            QUESTION_REQUESTS.inc(source='bank')
+            yield ('questions', banked)
+            return
+
+    client = yield ('client',)
+    if client is None:
+        message = (
+            "Groq client unavailable. Ensure GROQ_API_KEY is set and groq package is installed."
+        )
+        if allow_fallback:
+            logger.warning("%s Falling back to static questions.", message)
+            yield ('questions', _get_static_fallback_questions(topic, difficulty, num_questions))
+            return
+        raise RuntimeError(message)
+
+    prompt = _build_prompt(topic, difficulty, num_questions)
+
+    if hedged is None:
+        hedged = getattr(settings, 'GROQ_HEDGED_REQUESTS', False)
+
+    last_error = None
+    last_response_text = ""
+
+    # Hedging races complete answers; a stream is read from one model at a time
+    for models, attempt in _generation_rounds(_get_groq_models(), hedged and not stream):
+        model_name, produced, error, response_text = yield ('round', client, models, prompt, attempt)
+        if produced:
+            logger.info("Successfully generated %s questions using Groq model %s", produced, model_name)
+            QUESTION_REQUESTS.inc(source='ai')
+            return
+        last_error = error or last_error
+        last_response_text = response_text or last_response_text
+
+    _log_generation_failure(last_error, last_response_text)
+
     if allow_fallback:
-        return _get_static_fallback_questions(topic, difficulty, num_questions)
+        yield ('questions', _get_static_fallback_questions(topic, difficulty, num_questions))
+        return
 
     raise RuntimeError(f"AI generation failed: {last_error or 'unknown error'}")
 
 
-def generate_adaptive_questions(user, num_questions=5, allow_fallback=True):
+def _use_bank(use_bank):
+    if use_bank is None:
+        return getattr(settings, 'QUESTION_BANK_ENABLED', True)
+    return use_bank
+
+
+def _generated_batches(topic, difficulty, num_questions, allow_fallback, use_bank, hedged, stream):
     """
-    Generate questions based on user's weak areas
+    _generation_steps driven with the sync Groq client
+    Yields lists of questions: a whole set at once, or one question per
+    list from a streamed Groq completion.
+    """
+    use_bank = _use_bank(use_bank)
+    steps = _generation_steps(topic, difficulty, num_questions, allow_fallback, use_bank, hedged, stream)
+    run_round = _stream_round if stream else _batch_round
+
+    result = None
+    while True:
+        try:
+            step = steps.send(result)
+        except StopIteration:
+            return
+        kind, *args = step
+        result = None
+        if kind == 'bank':
+            result = draw_from_bank(topic, difficulty, num_questions)
+        elif kind == 'client':
+            result = _get_groq_client()
+        elif kind == 'round':
+            client, models, prompt, attempt = args
+            result = yield from run_round(
+                client, models, prompt, topic, difficulty, num_questions, attempt, use_bank,
+            )
+        else:
+            yield args[0]
+
+
+@track_external('groq')
+def generate_questions(topic, difficulty='Easy', num_questions=5, allow_fallback=True, use_bank=None, hedged=None):
+    """
+    Generate quiz questions using Groq AI
     
     Args:
-        user: Django User object
-        num_questions: Total questions to generate
+        topic: Topic name (e.g., "Logical Reasoning")
+        difficulty: Easy, Medium, or Hard
+        num_questions: Number of questions to generate
+        use_bank: Serve from / save to the question bank (default: QUESTION_BANK_ENABLED)
+        hedged: Query all candidate models concurrently and keep the first
+            valid answer (default: GROQ_HEDGED_REQUESTS)
     
     Returns:
-        List of questions targeting weak areas
+        List of question dictionaries
+    """
+    batches = _generated_batches(topic, difficulty, num_questions, allow_fallback, use_bank, hedged, stream=False)
+    return [question for batch in batches for question in batch]
+
+
+def stream_questions(topic, difficulty='Easy', num_questions=5, allow_fallback=True, use_bank=None):
+    """
+    Yield quiz questions one by one as soon as each is generated
+
+    Same sources, retries, validation and metrics as generate_questions,
+    but the Groq completion is streamed and every question object is
+    yielded once its JSON closes. A model is only abandoned for the next
+    one if it produced nothing; questions already yielded are never
+    retracted.
+    """
+    for batch in _generated_batches(topic, difficulty, num_questions, allow_fallback, use_bank, False, stream=True):
+        yield from batch
+
+
+async def _abatch_round(client, models, prompt, topic, difficulty, num_questions, attempt, use_bank):
+    """
+    _batch_round with an AsyncGroq client on the client manager's event loop
+    Returns (questions, round_result), round_result as _batch_round returns it
+    """
+    if len(models) > 1:
+        model_name, formatted_questions, error, response_text = await _run_async_groq(
+            _arequest_hedged(client, models, prompt, topic, difficulty, num_questions, attempt)
+        )
+    else:
+        model_name = models[0]
+        formatted_questions, error, response_text = await _run_async_groq(
+            _arequest_model(client, model_name, prompt, topic, difficulty, num_questions, attempt)
+        )
+    if not formatted_questions:
+        return [], (None, 0, error, response_text)
+    questions = await sync_to_async(_bank)(formatted_questions, model_name, use_bank)
+    return questions, (model_name, len(formatted_questions), None, response_text)
+
+
+async def agenerate_questions(topic, difficulty='Easy', num_questions=5, allow_fallback=True, use_bank=None, hedged=None):
+    """
+    generate_questions for async views
+    Drives the same _generation_steps, but Groq is called with the shared
+    AsyncGroq client, so waiting on the model holds no thread; the question
+    bank queries still run through sync_to_async.
+    """
+    with track_external('groq'):
+        use_bank = _use_bank(use_bank)
+        steps = _generation_steps(topic, difficulty, num_questions, allow_fallback, use_bank, hedged, stream=False)
+
+        questions = []
+        result = None
+        while True:
+            try:
+                step = steps.send(result)
+            except StopIteration:
+                return questions
+            kind, *args = step
+            result = None
+            if kind == 'bank':
+                result = await sync_to_async(draw_from_bank)(topic, difficulty, num_questions)
+            elif kind == 'client':
+                result = _get_async_groq_client()
+            elif kind == 'round':
+                client, models, prompt, attempt = args
+                produced, result = await _abatch_round(
+                    client, models, prompt, topic, difficulty, num_questions, attempt, use_bank,
+                )
+                questions.extend(produced)
+            else:
+                questions.extend(args[0])
+
+
+def choose_adaptive_target(user):
+    """
+    Pick the (topic, difficulty) an adaptive quiz should target for a user
     """
     from .analytics import get_topic_statistics
     
@@ -271,19 +761,17 @@ def generate_adaptive_questions(user, num_questions=5, allow_fallback=True):
     
     if not topic_stats:
         # Default topics if no data
-        return generate_questions('Logical Reasoning', 'Easy', num_questions, allow_fallback=allow_fallback)
+        return 'Logical Reasoning', 'Easy'
     
     # Sort by weakness score (highest first)
     weak_topics = [t for t in topic_stats if t['status'] in ['Weak', 'Moderate']]
     
     if not weak_topics:
         # User is strong in all areas, give medium difficulty
-        topic = topic_stats[0]['topic']
-        return generate_questions(topic, 'Medium', num_questions, allow_fallback=allow_fallback)
+        return topic_stats[0]['topic'], 'Medium'
     
     # Focus on weakest topic
     weakest_topic = weak_topics[0]
-    topic_name = weakest_topic['topic']
     
     # Determine difficulty based on current accuracy
     accuracy = weakest_topic['accuracy']
@@ -294,6 +782,22 @@ def generate_adaptive_questions(user, num_questions=5, allow_fallback=True):
     else:
         difficulty = 'Hard'
     
+    return weakest_topic['topic'], difficulty
+
+
+def generate_adaptive_questions(user, num_questions=5, allow_fallback=True):
+    """
+    Generate questions based on user's weak areas
+    
+    Args:
+        user: Django User object
+        num_questions: Total questions to generate
+    
+    Returns:
+        List of questions targeting weak areas
+    """
+    topic_name, difficulty = choose_adaptive_target(user)
+    
     logger.info("Generating %s %s questions for %s", num_questions, difficulty, topic_name)
     
-    return generate_questions(topic_name, difficulty, num_questions, allow_fallback=allow_fallback)
\ No newline at end of file
+    return generate_questions(topic_name, difficulty, num_questions, allow_fallback=allow_fallback)
@@ -1,114 +1,244 @@
 """
 Analytics module for detecting weak areas and generating recommendations
 """
-from django.db.models import Count, Q, Avg
-from .models import PracticeActivity
-import statistics
+from collections import defaultdict
+from itertools import chain
+from django.db.models import Count, F, Q, Sum, Window
+from django.db.models.functions import RowNumber
+from .models import PracticeActivity, TopicPerformance
+import numpy as np
 
 
-def calculate_weakness_score(accuracy, avg_time, consistency):
+# Weakness score bands: below 0.3 Strong, below 0.6 Moderate, otherwise Weak
+WEAKNESS_BANDS = [0.3, 0.6]
+BAND_STATUSES = np.array(['Strong', 'Moderate', 'Weak'])
+BAND_PRIORITIES = np.array(['Low', 'Medium', 'High'])
+
+
+def score_weakness(accuracy, avg_time, consistency):
     """
-    Calculate weakness score (0-1)
-    0 = Strong, 1 = Very Weak
+    Vectorized weakness scoring for any number of topics (and users)
+    Takes equal-length array-likes and returns NumPy arrays
+    (scores, statuses, priorities)
     
-    Factors:
+    Score is 0-1 (0 = Strong, 1 = Very Weak):
     - Low accuracy = higher weakness
     - High time = higher weakness (struggling)
-    - Low consistency = higher weakness (not improving)  
+    - Low consistency = higher weakness (not improving)
     """
+    accuracy = np.asarray(accuracy, dtype=float)
+    avg_time = np.asarray(avg_time, dtype=float)
+    consistency = np.asarray(consistency, dtype=float)
     
     # Normalize accuracy (invert: low accuracy = high weakness)
     accuracy_weakness = (100 - accuracy) / 100
     
     # Normalize time (if avg_time > 60s, that's weak)
-    time_weakness = min(avg_time / 120, 1.0)  # Cap at 120s
+    time_weakness = np.minimum(avg_time / 120, 1.0)  # Cap at 120s
     
     # Consistency weakness (if consistency < 50%, that's weak)
     consistency_weakness = (100 - consistency) / 100
     
     # Weighted average
-    weakness_score = (
+    raw_scores = (
         accuracy_weakness * 0.5 +      # Accuracy is most important
         time_weakness * 0.3 +           # Time matters
         consistency_weakness * 0.2      # Consistency matters less
     )
+    # Python's round() is correctly rounded; np.round disagrees on ties such as
+    # 0.065 and would move scores like 0.295 or 0.595 across a band boundary
+    scores = np.array([round(score, 2) for score in raw_scores.tolist()], dtype=float)
     
-    return round(weakness_score, 2)
+    bands = np.digitize(scores, WEAKNESS_BANDS)
+    return scores, BAND_STATUSES[bands], BAND_PRIORITIES[bands]
 
 
-def get_topic_statistics(user):
+def calculate_weakness_score(accuracy, avg_time, consistency):
     """
-    Get detailed statistics for each topic
-    Returns list of topics with their weakness scores
+    Calculate weakness score (0-1) for a single topic
+    0 = Strong, 1 = Very Weak
     """
+    scores, _, _ = score_weakness([accuracy], [avg_time], [consistency])
+    return float(scores[0])
+
+
+def consistency_scores(recent_outcomes):
+    """
+    Consistency (0-100) for many topics from their recent 1/0 outcome lists
+    100 minus the sample standard deviation in percent; 50 when fewer than
+    two outcomes are known
+    """
+    counts = np.fromiter(map(len, recent_outcomes), dtype=int, count=len(recent_outcomes))
+    width = max(int(counts.max(initial=0)), 1)
     
-    practice_data = PracticeActivity.objects.filter(user=user)
+    # One zero-padded matrix; the mask marks each row's real outcomes, which
+    # fill the True cells in row-major order
+    mask = np.arange(width) < counts[:, None]
+    matrix = np.zeros(mask.shape)
+    matrix[mask] = np.fromiter(chain.from_iterable(recent_outcomes), dtype=float, count=int(counts.sum()))
     
-    if not practice_data.exists():
-        return []
+    means = matrix.sum(axis=1) / np.maximum(counts, 1)
+    squared = np.where(mask, (matrix - means[:, None]) ** 2, 0.0)
+    std_dev = np.sqrt(squared.sum(axis=1) / np.maximum(counts - 1, 1))
     
+    return np.where(counts > 1, np.maximum(0, 100 - std_dev * 100), 50.0)
+
+
+def get_topic_summaries(user, include_recent=True):
+    """
+    Get per-topic totals for a user
+    Reads TopicPerformance rollups, falling back to the raw history
+    for users whose rollups have not been backfilled yet (a user's first
+    recorded attempt builds rollups for all of their topics at once)
+
+    Returns list of {'topic', 'total', 'correct', 'time_sum', 'recent'}
+    where recent holds the last 5 outcomes as 1/0, oldest first
+    """
+
+    rollups = TopicPerformance.objects.filter(user=user)
+    summaries = [
+        {
+            'topic': rollup.topic,
+            'total': rollup.attempt_count,
+            'correct': rollup.correct_count,
+            'time_sum': rollup.time_sum,
+            'recent': rollup.recent_outcomes,
+        }
+        for rollup in rollups
+    ]
+    if summaries:
+        return summaries
+
+    practice_data = PracticeActivity.objects.filter(user=user)
+
     # Group by topic
     topic_stats_raw = practice_data.values('topic').annotate(
         total=Count('id'),
         correct=Count('id', filter=Q(is_correct=True)),
-        avg_time=Avg('time_taken')
+        time_sum=Sum('time_taken')
     )
-    
-    topic_analysis = []
-    
+
+    # Last 5 outcomes of every topic in one query (ROW_NUMBER per topic)
+    recent_by_topic = defaultdict(list)
+    if include_recent:
+        recent_attempts = practice_data.annotate(
+            recent_rank=Window(
+                expression=RowNumber(),
+                partition_by=[F('topic')],
+                order_by=[F('attempted_at').desc(), F('id').desc()]
+            )
+        ).filter(recent_rank__lte=TopicPerformance.RECENT_WINDOW).values_list('topic', 'is_correct')
+
+        for topic_name, is_correct in recent_attempts:
+            recent_by_topic[topic_name].append(1 if is_correct else 0)
+
     for topic in topic_stats_raw:
-        topic_name = topic['topic']
-        total = topic['total']
-        correct = topic['correct']
-        avg_time = topic['avg_time']
-        
-        # Calculate accuracy
-        accuracy = (correct / total * 100) if total > 0 else 0
-        
-        # Calculate consistency (how stable is performance over time)
-        # Get last 5 attempts for this topic
-        recent_attempts = practice_data.filter(topic=topic_name).order_by('-attempted_at')[:5]
-        recent_accuracies = [1 if attempt.is_correct else 0 for attempt in recent_attempts]
-        
-        if len(recent_accuracies) > 1:
-            # Calculate standard deviation (lower = more consistent)
-            std_dev = statistics.stdev(recent_accuracies) if len(recent_accuracies) > 1 else 0
-            consistency = max(0, 100 - (std_dev * 100))
-        else:
-            consistency = 50  # Default for insufficient data
-        
-        # Calculate weakness score
-        weakness_score = calculate_weakness_score(accuracy, avg_time, consistency)
-        
-        # Determine status
-        if weakness_score < 0.3:
-            status = 'Strong'
-            priority = 'Low'
-        elif weakness_score < 0.6:
-            status = 'Moderate'
-            priority = 'Medium'
-        else:
-            status = 'Weak'
-            priority = 'High'
-        
-        topic_analysis.append({
-            'topic': topic_name,
-            'total_attempts': total,
-            'correct_answers': correct,
-            'accuracy': round(accuracy, 1),
-            'avg_time': round(avg_time, 1),
-            'consistency': round(consistency, 1),
-            'weakness_score': weakness_score,
-            'status': status,
-            'priority': priority
+        # Window rows arrive newest first; summaries keep oldest first
+        recent = recent_by_topic.get(topic['topic'], [])[::-1]
+
+        summaries.append({
+            'topic': topic['topic'],
+            'total': topic['total'],
+            'correct': topic['correct'],
+            'time_sum': topic['time_sum'],
+            'recent': recent,
         })
+
+    return summaries
+
+
+def score_topic_summaries(summaries):
+    """
+    Turn topic summaries (see get_topic_summaries) into topic statistics
+    Scores every summary in one vectorized pass; summaries may come from
+    many users. Returns dicts in input order, with 'user_id' kept when present.
+    """
+    if not summaries:
+        return []
+    
+    totals = np.array([topic['total'] for topic in summaries], dtype=float)
+    correct = np.array([topic['correct'] for topic in summaries], dtype=float)
+    time_sums = np.array([topic['time_sum'] or 0 for topic in summaries], dtype=float)
     
+    attempted = totals > 0
+    safe_totals = np.where(attempted, totals, 1)
+    avg_time = np.where(attempted, time_sums / safe_totals, 0)
+    accuracy = np.where(attempted, correct / safe_totals * 100, 0)
+    
+    # How stable is performance over time (lower std dev = more consistent)
+    consistency = consistency_scores([topic['recent'] for topic in summaries])
+    
+    scores, statuses, priorities = score_weakness(accuracy, avg_time, consistency)
+    
+    topic_analysis = []
+    for index, topic in enumerate(summaries):
+        stats = {
+            'topic': topic['topic'],
+            'total_attempts': topic['total'],
+            'correct_answers': topic['correct'],
+            'accuracy': round(float(accuracy[index]), 1),
+            'avg_time': round(float(avg_time[index]), 1),
+            'consistency': round(float(consistency[index]), 1),
+            'weakness_score': float(scores[index]),
+            'status': str(statuses[index]),
+            'priority': str(priorities[index]),
+        }
+        if 'user_id' in topic:
+            stats['user_id'] = topic['user_id']
+        topic_analysis.append(stats)
+    
+    return topic_analysis
+
+
+def get_topic_statistics(user):
+    """
+    Get detailed statistics for each topic
+    Returns list of topics with their weakness scores
+    """
+
+    topic_analysis = score_topic_summaries(get_topic_summaries(user))
+
     # Sort by weakness score (highest first)
     topic_analysis.sort(key=lambda x: x['weakness_score'], reverse=True)
-    
+
     return topic_analysis
 
 
+def get_cohort_topic_statistics(user_ids=None):
+    """
+    Topic statistics for many users from their TopicPerformance rollups
+    Every topic of every user is scored in one pass, so cohort reports do
+    not loop over get_topic_statistics. Users without rollups (run
+    backfill_topic_performance first) are absent.
+
+    Returns {user_id: topic statistics sorted weakest first}
+    """
+    rollups = TopicPerformance.objects.all()
+    if user_ids is not None:
+        rollups = rollups.filter(user_id__in=user_ids)
+
+    summaries = [
+        {
+            'user_id': user_id,
+            'topic': topic,
+            'total': attempt_count,
+            'correct': correct_count,
+            'time_sum': time_sum,
+            'recent': [int(result) for result in recent_results],
+        }
+        for user_id, topic, attempt_count, correct_count, time_sum, recent_results in rollups.values_list(
+            'user_id', 'topic', 'attempt_count', 'correct_count', 'time_sum', 'recent_results'
+        ).iterator(chunk_size=2000)
+    ]
+
+    by_user = defaultdict(list)
+    for stats in score_topic_summaries(summaries):
+        by_user[stats.pop('user_id')].append(stats)
+    for topic_analysis in by_user.values():
+        topic_analysis.sort(key=lambda x: x['weakness_score'], reverse=True)
+    return dict(by_user)
+
+
 def generate_recommendations(topic_analysis):
     """
     Generate personalized practice recommendations
@@ -0,0 +1,86 @@
+"""
+Write-behind buffer for practice attempts
+With PRACTICE_WRITE_BUFFER_SIZE > 1, answers are appended to the user's
+session and written with one bulk insert (plus one rollup update per topic)
+once the buffer is full, its oldest entry is older than
+PRACTICE_WRITE_BUFFER_SECONDS, or a page that reads practice data is shown.
+The session is saved on every answer anyway, so buffering replaces a
+PracticeActivity insert and rollup transaction per answer with one per batch.
+
+Durability: a buffered attempt lives only in the session until it is flushed.
+- A crashed or restarted worker loses nothing: the buffer is in the session
+  store and is flushed on the user's next request that reads practice data.
+- Logging out flushes first. Attempts in a session that expires or is
+  deleted before the user comes back are lost.
+- Every buffered attempt carries a client_attempt_id (unique in the
+  database), and record_attempts skips ids that are already saved. A batch
+  replayed after a crash between the insert and clearing the buffer, or
+  flushed by two concurrent requests of the same session, is written once.
+Leave the size at 0 or 1 to write every attempt immediately.
+"""
+import uuid
+
+from django.conf import settings
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .rollups import record_attempt, record_attempts
+
+SESSION_KEY = 'pending_attempts'
+
+
+def _buffer_size():
+    return getattr(settings, 'PRACTICE_WRITE_BUFFER_SIZE', 0)
+
+
+def _is_stale(pending):
+    max_age = getattr(settings, 'PRACTICE_WRITE_BUFFER_SECONDS', 30)
+    oldest = parse_datetime(pending[0]['attempted_at'])
+    return (timezone.now() - oldest).total_seconds() >= max_age
+
+
+def save_attempt(request, **fields):
+    """
+    Record an attempt for request.user, buffered in the session when enabled
+    fields are the PracticeActivity values record_attempt takes
+    """
+    size = _buffer_size()
+    if size <= 1:
+        record_attempt(user=request.user, **fields)
+        return
+
+    pending = request.session.get(SESSION_KEY, [])
+    pending.append({
+        **fields,
+        'attempted_at': timezone.now().isoformat(),
+        'client_attempt_id': str(uuid.uuid4()),
+    })
+    request.session[SESSION_KEY] = pending
+
+    if len(pending) >= size or _is_stale(pending):
+        flush_attempts(request)
+
+
+def pending_count(request):
+    """Attempts buffered in this session and not yet in the database"""
+    return len(request.session.get(SESSION_KEY, []))
+
+
+def flush_attempts(request):
+    """
+    Write every buffered attempt in request's session
+    Returns how many attempts were written
+    """
+    pending = request.session.get(SESSION_KEY)
+    if not pending:
+        return 0
+
+    record_attempts(request.user, [
+        {**attempt, 'attempted_at': parse_datetime(attempt['attempted_at'])}
+        for attempt in pending
+    ])
+
+    del request.session[SESSION_KEY]
+    # Persist the emptied buffer now rather than at the end of the response
+    request.session.save()
+    return len(pending)
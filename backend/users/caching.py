@@ -0,0 +1,49 @@
+"""
+Per-user caching of computed page data
+Cached entries are keyed by a per-user data version that is bumped whenever
+the user's PracticeActivity or QuizSession rows change (see signals.py),
+so a stale entry is never read back - it simply stops being addressed.
+"""
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+
+
+def _version_key(user_id):
+    return f'users:data-version:{user_id}'
+
+
+def get_data_version(user_id):
+    """Current data version for a user (created on first use)"""
+    key = _version_key(user_id)
+    version = cache.get(key)
+    if version is None:
+        # Seed with a timestamp so a version lost to eviction can never
+        # collide with one that is still addressing old entries
+        cache.add(key, time.time_ns(), timeout=None)
+        version = cache.get(key)
+    return version
+
+
+def bump_data_version(user_id):
+    """Invalidate every cached entry for a user"""
+    key = _version_key(user_id)
+    try:
+        cache.incr(key)
+    except ValueError:
+        # Key missing (never read or evicted): start a fresh version
+        cache.set(key, time.time_ns(), timeout=None)
+
+
+def get_cached_dashboard_context(user, build_context):
+    """
+    Return the dashboard context for a user, building it with
+    build_context(user) only when the user's data has changed
+    """
+    key = f'users:dashboard:{user.pk}:{get_data_version(user.pk)}'
+    context = cache.get(key)
+    if context is None:
+        context = build_context(user)
+        cache.set(key, context, timeout=getattr(settings, 'DASHBOARD_CACHE_TIMEOUT', 300))
+    return context
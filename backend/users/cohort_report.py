@@ -0,0 +1,131 @@
+"""
+Cohort-wide topic statistics for reporting
+Streams the PracticeActivity history once in (user, topic, time) order,
+scores it in fixed-size batches and writes columnar files, so memory stays
+bounded by the batch size whatever the size of the table.
+"""
+import shutil
+import tempfile
+import zipfile
+
+import numpy as np
+from django.contrib.auth.models import User
+
+from .analytics import score_topic_summaries
+from .models import PracticeActivity
+from .rollups import iter_rollups, ordered_rollup_rows
+
+try:
+    import pyarrow
+    import pyarrow.parquet
+except Exception:
+    pyarrow = None
+
+
+# Output columns and their NumPy dtypes (string widths follow the model fields)
+COLUMNS = (
+    ('user_id', np.dtype('int64')),
+    ('username', np.dtype('<U150')),
+    ('topic', np.dtype('<U100')),
+    ('total_attempts', np.dtype('int64')),
+    ('correct_answers', np.dtype('int64')),
+    ('accuracy', np.dtype('float64')),
+    ('avg_time', np.dtype('float64')),
+    ('consistency', np.dtype('float64')),
+    ('weakness_score', np.dtype('float64')),
+    ('status', np.dtype('<U8')),
+    ('priority', np.dtype('<U6')),
+)
+
+
+def iter_cohort_batches(user_ids=None, chunk_size=2000, batch_size=5000):
+    """
+    Yield dicts of column arrays, each holding up to batch_size
+    (user, topic) statistics rows
+
+    chunk_size is the number of PracticeActivity rows fetched per database
+    round trip.
+    """
+    activities = PracticeActivity.objects.all()
+    if user_ids is not None:
+        activities = activities.filter(user_id__in=user_ids)
+    rows = ordered_rollup_rows(activities).iterator(chunk_size=chunk_size)
+
+    summaries = []
+    for rollup in iter_rollups(rows):
+        summaries.append({
+            'user_id': rollup.user_id,
+            'topic': rollup.topic,
+            'total': rollup.attempt_count,
+            'correct': rollup.correct_count,
+            'time_sum': rollup.time_sum,
+            'recent': rollup.recent_outcomes,
+        })
+        if len(summaries) >= batch_size:
+            yield _batch_columns(summaries)
+            summaries = []
+
+    if summaries:
+        yield _batch_columns(summaries)
+
+
+def _batch_columns(summaries):
+    statistics = score_topic_summaries(summaries)
+    usernames = dict(
+        User.objects.filter(pk__in={stats['user_id'] for stats in statistics}).values_list('pk', 'username')
+    )
+    for stats in statistics:
+        stats['username'] = usernames.get(stats['user_id'], '')
+
+    columns = {}
+    for name, dtype in COLUMNS:
+        columns[name] = np.array([stats[name] for stats in statistics], dtype=dtype)
+    return columns
+
+
+def write_npz(path, batches):
+    """
+    Write batches to a NumPy .npz archive with one array per column
+    Columns are spooled to temporary files and copied into the archive at
+    the end, so only one batch is held in memory. Returns the row count.
+    """
+    rows = 0
+    with tempfile.TemporaryDirectory(prefix='cohort-') as spool_dir:
+        spools = {name: open(f'{spool_dir}/{name}.bin', 'w+b') for name, _ in COLUMNS}
+        try:
+            for batch in batches:
+                for name, _ in COLUMNS:
+                    spools[name].write(batch[name].tobytes())
+                rows += len(batch['user_id'])
+
+            with zipfile.ZipFile(path, 'w', compression=zipfile.ZIP_DEFLATED, allowZip64=True) as archive:
+                for name, dtype in COLUMNS:
+                    with archive.open(f'{name}.npy', 'w', force_zip64=True) as member:
+                        np.lib.format.write_array_header_1_0(member, {
+                            'descr': np.lib.format.dtype_to_descr(dtype),
+                            'fortran_order': False,
+                            'shape': (rows,),
+                        })
+                        spools[name].seek(0)
+                        shutil.copyfileobj(spools[name], member)
+        finally:
+            for spool in spools.values():
+                spool.close()
+    return rows
+
+
+def write_parquet(path, batches):
+    """Write batches to a Parquet file, one row group per batch. Returns the row count"""
+    if pyarrow is None:
+        raise RuntimeError("Parquet export needs the pyarrow package")
+
+    schema = pyarrow.schema([
+        (name, pyarrow.string() if dtype.kind == 'U' else pyarrow.from_numpy_dtype(dtype))
+        for name, dtype in COLUMNS
+    ])
+    rows = 0
+    with pyarrow.parquet.ParquetWriter(path, schema) as writer:
+        for batch in batches:
+            writer.write_table(pyarrow.table({name: batch[name] for name, _ in COLUMNS}, schema=schema))
+            rows += len(batch['user_id'])
+    return rows
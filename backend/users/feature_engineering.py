@@ -2,57 +2,59 @@
 Feature Engineering for ML Models
 Extracts features from practice data for machine learning
 """
+from collections import defaultdict
+
 import numpy as np
-from .models import PracticeActivity
-from django.db.models import Count, Q, Avg
+from .models import PracticeActivity, TopicPerformance
 
 
-def extract_topic_features(user, topic_name):
+# Columns needed to compute topic features, in scan order
+FEATURE_SOURCE_FIELDS = ('user_id', 'topic', 'is_correct', 'time_taken')
+
+# Number of most recent attempts used for the trend feature
+RECENT_WINDOW = 5
+
+
+def compute_topic_features(topic_name, results, times):
     """
-    Extract features for a specific topic
-    Returns feature vector for ML models
+    Build the feature dict for one topic from its attempts
+    results/times must be in chronological order (oldest first)
     """
-    
-    practice_data = PracticeActivity.objects.filter(
-        user=user, 
-        topic=topic_name
-    ).order_by('attempted_at')
-    
-    if not practice_data.exists():
+    total_attempts = len(results)
+    if total_attempts == 0:
         return None
-    
-    # Feature 1: Total attempts
-    total_attempts = practice_data.count()
-    
+
+    # Feature 1: Total attempts (already known)
+
     # Feature 2: Accuracy
-    correct = practice_data.filter(is_correct=True).count()
-    accuracy = (correct / total_attempts * 100) if total_attempts > 0 else 0
-    
+    correct = sum(results)
+    accuracy = correct / total_attempts * 100
+
     # Feature 3: Average time taken
-    avg_time = practice_data.aggregate(Avg('time_taken'))['time_taken__avg'] or 0
-    
+    avg_time = sum(times) / total_attempts
+
     # Feature 4: Recent trend (last 5 attempts)
-    recent = list(practice_data.order_by('-attempted_at')[:5])
+    recent = results[-RECENT_WINDOW:]
     if len(recent) >= 2:
-        recent_accuracy = sum(1 for q in recent if q.is_correct) / len(recent) * 100
+        recent_accuracy = sum(recent) / len(recent) * 100
         # Trend: positive if recent > overall
         trend = recent_accuracy - accuracy
     else:
         trend = 0
-    
+
     # Feature 5: Time improvement (are they getting faster?)
     if total_attempts >= 3:
-        first_half_avg = practice_data[:total_attempts//2].aggregate(Avg('time_taken'))['time_taken__avg'] or 0
-        second_half_avg = practice_data[total_attempts//2:].aggregate(Avg('time_taken'))['time_taken__avg'] or 0
+        half = total_attempts // 2
+        first_half_avg = sum(times[:half]) / half
+        second_half_avg = sum(times[half:]) / (total_attempts - half)
         time_improvement = first_half_avg - second_half_avg
     else:
         time_improvement = 0
-    
+
     # Feature 6: Consistency (standard deviation of results)
-    results = [1 if q.is_correct else 0 for q in practice_data]
-    consistency = np.std(results) if len(results) > 1 else 0
-    
-    features = {
+    consistency = np.std(results) if total_attempts > 1 else 0
+
+    return {
         'total_attempts': total_attempts,
         'accuracy': accuracy,
         'avg_time': avg_time,
@@ -61,21 +63,121 @@ def extract_topic_features(user, topic_name):
         'consistency': consistency,
         'topic': topic_name
     }
-    
-    return features
+
+
+def iter_topic_attempts(rows):
+    """
+    Group an ordered stream of (user_id, topic, is_correct, time_taken) rows
+    into (user_id, topic, results, times), one per topic
+
+    Rows must be sorted by user, topic and then attempt time, so each
+    topic's attempts arrive contiguously and oldest first. results holds
+    1/0 outcomes.
+    """
+    current_key = None
+    results = []
+    times = []
+
+    for user_id, topic, is_correct, time_taken in rows:
+        key = (user_id, topic)
+        if key != current_key:
+            if current_key is not None:
+                yield current_key[0], current_key[1], results, times
+            current_key = key
+            results = []
+            times = []
+        results.append(1 if is_correct else 0)
+        times.append(time_taken)
+
+    if current_key is not None:
+        yield current_key[0], current_key[1], results, times
+
+
+def iter_topic_features(rows):
+    """
+    Turn an ordered stream of (user_id, topic, is_correct, time_taken) rows
+    into (user_id, features) pairs, one per topic (see iter_topic_attempts)
+    """
+    for user_id, topic, results, times in iter_topic_attempts(rows):
+        yield user_id, compute_topic_features(topic, results, times)
+
+
+def ordered_feature_rows(queryset):
+    return queryset.order_by('user_id', 'topic', 'attempted_at', 'id').values_list(*FEATURE_SOURCE_FIELDS)
+
+
+def get_topic_features_for_users(users):
+    """
+    Get features for every topic of every given user with one query
+    Returns dict: user_id -> list of feature dicts
+    """
+    user_ids = [getattr(user, 'pk', user) for user in users]
+
+    features_by_user = defaultdict(list)
+    rows = ordered_feature_rows(PracticeActivity.objects.filter(user_id__in=user_ids))
+    for user_id, features in iter_topic_features(rows):
+        features_by_user[user_id].append(features)
+
+    return {user_id: features_by_user.get(user_id, []) for user_id in user_ids}
+
+
+def extract_topic_features(user, topic_name):
+    """
+    Extract features for a specific topic
+    Returns feature vector for ML models
+    """
+
+    rows = ordered_feature_rows(PracticeActivity.objects.filter(user=user, topic=topic_name))
+    for _, features in iter_topic_features(rows):
+        return features
+
+    return None
 
 
 def get_all_topic_features(user):
     """
     Get features for all topics user has practiced
     """
-    
-    topics = PracticeActivity.objects.filter(user=user).values_list('topic', flat=True).distinct()
-    
-    all_features = []
-    for topic in topics:
-        features = extract_topic_features(user, topic)
-        if features:
-            all_features.append(features)
-    
-    return all_features
\ No newline at end of file
+
+    return get_topic_features_for_users([user])[user.pk]
+
+
+def rollup_topic_features(rollup):
+    """
+    Feature dict for one TopicPerformance rollup, without reading its attempts
+    Same values as compute_topic_features for accuracy, avg_time, trend and
+    consistency (the std dev of 0/1 outcomes follows from the accuracy).
+    time_improvement needs the attempt order and is always 0.
+    """
+    total_attempts = rollup.attempt_count
+    if total_attempts == 0:
+        return None
+
+    share_correct = rollup.correct_count / total_attempts
+    accuracy = share_correct * 100
+
+    recent = rollup.recent_outcomes
+    if len(recent) >= 2:
+        trend = sum(recent) / len(recent) * 100 - accuracy
+    else:
+        trend = 0
+
+    return {
+        'total_attempts': total_attempts,
+        'accuracy': accuracy,
+        'avg_time': rollup.avg_time,
+        'trend': trend,
+        'time_improvement': 0,
+        'consistency': float(np.sqrt(share_correct * (1 - share_correct))),
+        'topic': rollup.topic
+    }
+
+
+def get_rollup_topic_features(user):
+    """
+    Features for all topics of a user from their TopicPerformance rollups
+    One row per topic, for request paths that cannot scan the history
+    """
+
+    rollups = TopicPerformance.objects.filter(user=user, attempt_count__gt=0).order_by('topic')
+    return [rollup_topic_features(rollup) for rollup in rollups]
@@ -0,0 +1,208 @@
+"""
+Process-wide Groq client with a persistent HTTP connection pool
+Building a Groq client per call threw away its keep-alive connections and
+TLS sessions; the manager builds one and hands it to every caller. Async
+views get an AsyncGroq client from the same manager, which runs it on an
+event loop of its own.
+"""
+import asyncio
+import logging
+import os
+import threading
+
+from django.conf import settings
+
+try:
+    import httpx
+    from groq import AsyncGroq, Groq
+except Exception:
+    httpx = None
+    AsyncGroq = None
+    Groq = None
+
+logger = logging.getLogger(__name__)
+
+
+class GroqClientManager:
+    """
+    Shares one Groq client (and its httpx connection pool) across threads
+
+    The client is rebuilt when GROQ_API_KEY or GROQ_BASE_URL change (key
+    rotation) and after a fork, since pooled sockets must not be shared
+    between worker processes. httpx clients are thread-safe, so the hedge
+    pool, prefetch threads and ASGI's sync-view threads all use the same one.
+    Replaced clients are not closed: requests still running on them finish
+    and their connections are released when the client is collected.
+
+    The AsyncGroq client lives on one long-lived event loop thread, and
+    async callers hand it coroutines through run(). Its pool would otherwise
+    be tied to the caller's loop, and under WSGI every async view call runs
+    on a new one.
+    """
+
+    def __init__(self, max_connections=10, max_keepalive_connections=5, keepalive_expiry=30.0,
+                 async_max_connections=200):
+        self.max_connections = max_connections
+        self.max_keepalive_connections = max_keepalive_connections
+        self.keepalive_expiry = keepalive_expiry
+        self.async_max_connections = async_max_connections
+        self._lock = threading.Lock()
+        self._client = None
+        self._http_client = None
+        self._config = None
+        self._clients_built = 0
+        self._requests = 0
+        self._async_client = None
+        self._async_config = None
+        self._async_clients_built = 0
+        self._loop = None
+        self._loop_pid = None
+
+    def _current_config(self):
+        api_key = getattr(settings, 'GROQ_API_KEY', '')
+        base_url = getattr(settings, 'GROQ_BASE_URL', '') or None
+        return (api_key, base_url, os.getpid())
+
+    def _count_request(self, request):
+        with self._lock:
+            self._requests += 1
+
+    async def _count_async_request(self, request):
+        self._count_request(request)
+
+    def _build(self, api_key, base_url):
+        http_client = httpx.Client(
+            limits=httpx.Limits(
+                max_connections=self.max_connections,
+                max_keepalive_connections=self.max_keepalive_connections,
+                keepalive_expiry=self.keepalive_expiry,
+            ),
+            event_hooks={'request': [self._count_request]},
+        )
+        client = Groq(api_key=api_key, base_url=base_url, http_client=http_client)
+        return client, http_client
+
+    def get_client(self):
+        """The shared client, or None when Groq is not installed or no key is set"""
+        if Groq is None or httpx is None:
+            return None
+        config = self._current_config()
+        api_key, base_url, _ = config
+        if not api_key:
+            return None
+
+        with self._lock:
+            if self._client is None or self._config != config:
+                try:
+                    self._client, self._http_client = self._build(api_key, base_url)
+                except Exception:
+                    logger.exception("Failed to initialize Groq client")
+                    return None
+                if self._config is not None:
+                    logger.info("Rebuilt Groq client after configuration change")
+                self._config = config
+                self._clients_built += 1
+            return self._client
+
+    def _get_loop(self):
+        # Caller holds self._lock
+        if self._loop is None or self._loop_pid != os.getpid():
+            loop = asyncio.new_event_loop()
+            threading.Thread(target=loop.run_forever, name='groq-async', daemon=True).start()
+            self._loop = loop
+            self._loop_pid = os.getpid()
+        return self._loop
+
+    def get_async_client(self):
+        """
+        The shared AsyncGroq client, or None like get_client()
+        Only use it inside coroutines passed to run().
+        """
+        if AsyncGroq is None or httpx is None:
+            return None
+        config = self._current_config()
+        api_key, base_url, _ = config
+        if not api_key:
+            return None
+
+        with self._lock:
+            if self._async_client is None or self._async_config != config:
+                try:
+                    http_client = httpx.AsyncClient(
+                        limits=httpx.Limits(
+                            max_connections=self.async_max_connections,
+                            max_keepalive_connections=self.async_max_connections,
+                            keepalive_expiry=self.keepalive_expiry,
+                        ),
+                        event_hooks={'request': [self._count_async_request]},
+                    )
+                    self._async_client = AsyncGroq(api_key=api_key, base_url=base_url, http_client=http_client)
+                except Exception:
+                    logger.exception("Failed to initialize async Groq client")
+                    return None
+                self._async_config = config
+                self._async_clients_built += 1
+            return self._async_client
+
+    def run(self, coroutine):
+        """
+        Schedule coroutine on the async client's event loop
+        Returns a future to await on the caller's loop; cancelling it
+        cancels the coroutine.
+        """
+        with self._lock:
+            loop = self._get_loop()
+        return asyncio.wrap_future(asyncio.run_coroutine_threadsafe(coroutine, loop))
+
+    def stats(self):
+        """Counters for the shared client and its connection pool"""
+        with self._lock:
+            stats = {
+                'clients_built': self._clients_built,
+                'async_clients_built': self._async_clients_built,
+                'requests': self._requests,
+                'open_connections': None,
+                'idle_connections': None,
+            }
+            http_client = self._http_client
+
+        # httpx does not expose its pool publicly; report what the transport has
+        pool = getattr(getattr(http_client, '_transport', None), '_pool', None)
+        connections = getattr(pool, 'connections', None)
+        if connections is not None:
+            stats['open_connections'] = len(connections)
+            stats['idle_connections'] = sum(1 for conn in connections if conn.is_idle())
+        return stats
+
+    def reset(self):
+        """Close the shared clients; the next get_client() builds a new one"""
+        with self._lock:
+            http_client = self._http_client
+            async_client = self._async_client
+            loop = self._loop
+            self._client = None
+            self._http_client = None
+            self._config = None
+            self._async_client = None
+            self._async_config = None
+        if http_client is not None:
+            http_client.close()
+        if async_client is not None and loop is not None and self._loop_pid == os.getpid():
+            asyncio.run_coroutine_threadsafe(async_client.close(), loop)
+
+
+_manager = None
+_manager_lock = threading.Lock()
+
+
+def get_client_manager():
+    """Process-wide GroqClientManager configured from settings"""
+    global _manager
+    with _manager_lock:
+        if _manager is None:
+            _manager = GroqClientManager(
+                max_connections=getattr(settings, 'GROQ_MAX_CONNECTIONS', 10),
+                max_keepalive_connections=getattr(settings, 'GROQ_MAX_KEEPALIVE_CONNECTIONS', 5),
+                async_max_connections=getattr(settings, 'GROQ_ASYNC_MAX_CONNECTIONS', 200),
+            )
+        return _manager
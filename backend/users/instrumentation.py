@@ -0,0 +1,189 @@
+"""
+Per-request timing: query count, database time, external-call time, total
+RequestTimingMiddleware opens a request_timings() scope for every request.
+Inside it, every SQL statement on any connection (wrapped when the
+connection is created) and every track_external() block are added up, then
+reported in a Server-Timing header and one log line per request.
+
+The same scope works outside requests, e.g. in a management command:
+
+    with request_timings() as timings:
+        ...
+    print(timings.as_dict())
+"""
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+
+from .metrics import VIEW_LATENCY_SECONDS
+
+logger = logging.getLogger(__name__)
+
+WRITE_STATEMENTS = ('INSERT', 'UPDATE', 'DELETE', 'REPLACE')
+
+_current = ContextVar('request_timings', default=None)
+
+
+class RequestTimings:
+    """Counters for one request; safe to update from several threads"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.queries = 0
+        self.writes = 0
+        self.db_seconds = 0.0
+        self.external_seconds = {}
+        self.total_seconds = 0.0
+
+    def add_query(self, sql, seconds):
+        with self._lock:
+            self.queries += 1
+            self.db_seconds += seconds
+            if sql.lstrip().upper().startswith(WRITE_STATEMENTS):
+                self.writes += 1
+
+    def add_external(self, name, seconds):
+        with self._lock:
+            self.external_seconds[name] = self.external_seconds.get(name, 0.0) + seconds
+
+    @property
+    def app_seconds(self):
+        """Time not spent in the database or external calls"""
+        return max(self.total_seconds - self.db_seconds - sum(self.external_seconds.values()), 0.0)
+
+    def as_dict(self):
+        return {
+            'queries': self.queries,
+            'writes': self.writes,
+            'db_ms': round(self.db_seconds * 1000, 2),
+            'external_ms': {name: round(seconds * 1000, 2) for name, seconds in self.external_seconds.items()},
+            'app_ms': round(self.app_seconds * 1000, 2),
+            'total_ms': round(self.total_seconds * 1000, 2),
+        }
+
+    def server_timing(self):
+        """Value for the Server-Timing response header"""
+        metrics = [f'db;dur={self.db_seconds * 1000:.1f};desc="{self.queries} queries"']
+        metrics += [f'{name};dur={seconds * 1000:.1f}' for name, seconds in self.external_seconds.items()]
+        metrics.append(f'app;dur={self.app_seconds * 1000:.1f}')
+        metrics.append(f'total;dur={self.total_seconds * 1000:.1f}')
+        return ', '.join(metrics)
+
+
+def current_timings():
+    """RequestTimings of the enclosing request_timings() scope, or None"""
+    return _current.get()
+
+
+@contextmanager
+def request_timings():
+    """Collect timings for everything run inside the block"""
+    timings = RequestTimings()
+    token = _current.set(timings)
+    started = time.perf_counter()
+    try:
+        yield timings
+    finally:
+        timings.total_seconds = time.perf_counter() - started
+        _current.reset(token)
+
+
+@contextmanager
+def track_external(name):
+    """
+    Count the block's wall time as an external call named name
+    Also usable as a decorator: @track_external('groq')
+    """
+    timings = _current.get()
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        if timings is not None:
+            timings.add_external(name, time.perf_counter() - started)
+
+
+def _time_query(execute, sql, params, many, context):
+    timings = _current.get()
+    if timings is None:
+        return execute(sql, params, many, context)
+
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        timings.add_query(sql, time.perf_counter() - started)
+
+
+@receiver(connection_created)
+def install_query_timer(sender, connection, **kwargs):
+    # The wrapper list outlives reconnects, so only add it once
+    if _time_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_time_query)
+
+
+class RequestTimingMiddleware:
+    """
+    Time each request; adds a Server-Timing header (REQUEST_TIMING_HEADER),
+    logs one line, at WARNING once a request runs
+    REQUEST_TIMING_QUERY_WARNING queries or more, and records the latency
+    per URL name for /metrics
+    The timings are also left on request.timings.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        with request_timings() as timings:
+            request.timings = timings
+            response = self.get_response(request)
+        return self._report(request, response, timings)
+
+    async def __acall__(self, request):
+        with request_timings() as timings:
+            request.timings = timings
+            response = await self.get_response(request)
+        return self._report(request, response, timings)
+
+    def _report(self, request, response, timings):
+        resolver_match = getattr(request, 'resolver_match', None)
+        VIEW_LATENCY_SECONDS.observe(
+            timings.total_seconds, view=resolver_match.view_name if resolver_match else 'unmatched'
+        )
+        if getattr(settings, 'REQUEST_TIMING_HEADER', True):
+            response['Server-Timing'] = timings.server_timing()
+
+        level = logging.INFO
+        if timings.queries >= getattr(settings, 'REQUEST_TIMING_QUERY_WARNING', 50):
+            level = logging.WARNING
+        if logger.isEnabledFor(level):
+            fields = {
+                'method': request.method,
+                'path': request.path,
+                'view': resolver_match.view_name if resolver_match else '',
+                'status': response.status_code,
+                **timings.as_dict(),
+            }
+            logger.log(
+                level,
+                "request %s %s view=%s status=%s queries=%s db_ms=%s external_ms=%s total_ms=%s",
+                fields['method'], fields['path'], fields['view'], fields['status'],
+                fields['queries'], fields['db_ms'], fields['external_ms'], fields['total_ms'],
+                extra={'timing': fields},
+            )
+        return response
@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand
+
+from users.rollups import rebuild_topic_performance
+
+
+class Command(BaseCommand):
+    help = "Rebuild TopicPerformance rollups from the PracticeActivity history"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--user-id',
+            type=int,
+            action='append',
+            dest='user_ids',
+            help="Only rebuild rollups for this user (repeatable)",
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help="Rows fetched and rollups inserted per batch",
+        )
+
+    def handle(self, *args, **options):
+        written = rebuild_topic_performance(
+            user_ids=options['user_ids'],
+            batch_size=options['batch_size'],
+        )
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {written} topic performance rows"))
@@ -0,0 +1,55 @@
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+
+from users.cohort_report import iter_cohort_batches, write_npz, write_parquet
+
+
+class Command(BaseCommand):
+    help = "Export per-user per-topic statistics for every learner to a columnar file (.npz or .parquet)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('output', help="Destination file; the format follows the extension")
+        parser.add_argument(
+            '--format',
+            choices=['npz', 'parquet'],
+            help="Override the format implied by the output extension",
+        )
+        parser.add_argument(
+            '--user-id',
+            type=int,
+            action='append',
+            dest='user_ids',
+            help="Only export this user (repeatable)",
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=2000,
+            help="Practice rows fetched per database round trip",
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=5000,
+            help="Statistics rows scored and written per batch",
+        )
+
+    def handle(self, *args, **options):
+        output = Path(options['output'])
+        export_format = options['format'] or output.suffix.lstrip('.').lower()
+        writers = {'npz': write_npz, 'parquet': write_parquet}
+        if export_format not in writers:
+            raise CommandError("Output must end in .npz or .parquet (or pass --format)")
+
+        batches = iter_cohort_batches(
+            user_ids=options['user_ids'],
+            chunk_size=options['chunk_size'],
+            batch_size=options['batch_size'],
+        )
+        try:
+            rows = writers[export_format](output, batches)
+        except RuntimeError as exc:
+            raise CommandError(str(exc))
+
+        self.stdout.write(self.style.SUCCESS(f"Wrote {rows} topic statistics rows to {output}"))
@@ -0,0 +1,47 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from users.training import train_weak_area_classifier
+
+
+class Command(BaseCommand):
+    help = "Train the global WeakAreaClassifier on all users' topic features and register it"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--test-size',
+            type=float,
+            default=0.2,
+            help="Share of users held out for evaluation (0 disables)",
+        )
+        parser.add_argument(
+            '--min-attempts',
+            type=int,
+            default=3,
+            help="Skip topics with fewer attempts than this before the label window",
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help="Train and report metrics without saving the model",
+        )
+
+    def handle(self, *args, **options):
+        try:
+            result = train_weak_area_classifier(
+                test_size=options['test_size'],
+                min_attempts=options['min_attempts'],
+                save=not options['dry_run'],
+            )
+        except ValueError as exc:
+            raise CommandError(str(exc))
+
+        metadata = result['metadata']
+        self.stdout.write(json.dumps(metadata['metrics'] if metadata else result['metrics'], indent=2, default=float))
+        if metadata:
+            self.stdout.write(self.style.SUCCESS(
+                f"Saved {metadata['name']} version {metadata['version']}"
+            ))
+        else:
+            self.stdout.write("Dry run: model not saved")
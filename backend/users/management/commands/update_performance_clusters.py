@@ -0,0 +1,37 @@
+from django.core.management.base import BaseCommand
+
+from users.training import update_performance_clusterer
+
+
+class Command(BaseCommand):
+    help = "Update the incremental PerformanceClusterer with topics practised since its last update"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--reset',
+            action='store_true',
+            help="Start new clusters from the full history instead of updating the registered ones",
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1024,
+            help="Topics per partial_fit batch",
+        )
+
+    def handle(self, *args, **options):
+        result = update_performance_clusterer(reset=options['reset'], batch_size=options['batch_size'])
+
+        metadata = result['metadata']
+        if metadata is None:
+            self.stdout.write("No new practice to cluster")
+            return
+        for cluster, center in enumerate(metadata['metrics']['centers']):
+            label = metadata['metrics']['cluster_labels'][str(cluster)]
+            self.stdout.write(
+                f"cluster {cluster} ({label}): accuracy {center[0]:.1f}%, "
+                f"avg time {center[1]:.1f}s, attempts {center[2]:.1f}"
+            )
+        self.stdout.write(self.style.SUCCESS(
+            f"Saved {metadata['name']} version {metadata['version']} ({result['topics']} topics updated)"
+        ))
@@ -0,0 +1,165 @@
+"""
+In-process metrics in the Prometheus text exposition format
+Counters and histograms live in this process's memory and are served by
+the /metrics view; with several worker processes each reports its own
+values, so scrape every worker (or run a single one per scrape target).
+"""
+import math
+import threading
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+def _format_value(value):
+    if value == math.inf:
+        return '+Inf'
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def _escape(value):
+    return str(value).replace('\\', r'\\').replace('\n', r'\n').replace('"', r'\"')
+
+
+def _format_labels(names, values, extra=()):
+    pairs = [*zip(names, values), *extra]
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in pairs) + '}'
+
+
+class _Metric:
+    kind = ''
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._series = {}
+
+    def _key(self, labels):
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} takes labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def clear(self):
+        with self._lock:
+            self._series.clear()
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} {self.kind}']
+        with self._lock:
+            series = sorted(self._series.items())
+            lines += [line for key, value in series for line in self._sample_lines(key, value)]
+        return lines
+
+
+class Counter(_Metric):
+    """Monotonic count, one series per label combination"""
+
+    kind = 'counter'
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._series[key] = self._series.get(key, 0) + amount
+
+    def value(self, **labels):
+        with self._lock:
+            return self._series.get(self._key(labels), 0)
+
+    def _sample_lines(self, key, value):
+        return [f'{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}']
+
+
+class Histogram(_Metric):
+    """Distribution of observations over fixed upper bounds"""
+
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=(0.1, 0.5, 1, 5, 10)):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = {'counts': [0] * len(self.buckets), 'sum': 0.0}
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series['counts'][index] += 1
+                    break
+            series['sum'] += value
+
+    def count(self, **labels):
+        with self._lock:
+            series = self._series.get(self._key(labels))
+            return sum(series['counts']) if series else 0
+
+    def _sample_lines(self, key, series):
+        lines = []
+        cumulative = 0
+        for bound, count in zip(self.buckets, series['counts']):
+            cumulative += count
+            le = (('le', _format_value(bound)),)
+            lines.append(f'{self.name}_bucket{_format_labels(self.labelnames, key, le)} {cumulative}')
+        labels = _format_labels(self.labelnames, key)
+        lines.append(f'{self.name}_sum{labels} {_format_value(series["sum"])}')
+        lines.append(f'{self.name}_count{labels} {cumulative}')
+        return lines
+
+
+ATTEMPTS_RECORDED = Counter(
+    'learning_attempts_recorded_total',
+    "Practice attempts written to the database",
+)
+QUIZ_SESSIONS_COMPLETED = Counter(
+    'learning_quiz_sessions_completed_total',
+    "Quiz sessions completed and saved",
+)
+QUESTION_REQUESTS = Counter(
+    'learning_question_requests_total',
+    "Question generation requests by where the questions came from (bank, ai, fallback)",
+    ['source'],
+)
+AI_GENERATION_SECONDS = Histogram(
+    'learning_ai_generation_seconds',
+    "Latency of one Groq generation request by model and outcome",
+    ['model', 'outcome'],
+    buckets=(0.25, 0.5, 1, 2, 5, 10, 20, 30, 60),
+)
+AI_PARSE_FAILURES = Counter(
+    'learning_ai_json_parse_failures_total',
+    "AI responses that could not be parsed as a JSON array of questions",
+    ['mode'],
+)
+VIEW_LATENCY_SECONDS = Histogram(
+    'learning_view_latency_seconds',
+    "Request latency by URL name",
+    ['view'],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10),
+)
+
+REGISTRY = (
+    ATTEMPTS_RECORDED,
+    QUIZ_SESSIONS_COMPLETED,
+    QUESTION_REQUESTS,
+    AI_GENERATION_SECONDS,
+    AI_PARSE_FAILURES,
+    VIEW_LATENCY_SECONDS,
+)
+
+
+def render_metrics():
+    """Every registered metric in the text exposition format"""
+    return '\n'.join(line for metric in REGISTRY for line in metric.render()) + '\n'
+
+
+def reset_metrics():
+    """Drop every recorded value (tests)"""
+    for metric in REGISTRY:
+        metric.clear()
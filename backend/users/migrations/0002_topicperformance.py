@@ -0,0 +1,36 @@
+# Generated by Django 6.0.2 on 2026-10-17 15:54
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TopicPerformance',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('topic', models.CharField(max_length=100)),
+                ('attempt_count', models.IntegerField(default=0)),
+                ('correct_count', models.IntegerField(default=0)),
+                ('time_sum', models.BigIntegerField(default=0, help_text='Sum of time taken in seconds')),
+                ('time_sq_sum', models.BigIntegerField(default=0, help_text='Sum of squared time taken')),
+                ('recent_results', models.CharField(blank=True, default='', max_length=20)),
+                ('first_attempt_at', models.DateTimeField(blank=True, null=True)),
+                ('last_attempt_at', models.DateTimeField(blank=True, null=True)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Topic Performance',
+                'verbose_name_plural': 'Topic Performance',
+                'constraints': [models.UniqueConstraint(fields=('user', 'topic'), name='unique_user_topic_performance')],
+            },
+        ),
+    ]
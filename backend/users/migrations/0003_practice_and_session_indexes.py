@@ -0,0 +1,27 @@
+# Generated by Django 6.0.2 on 2026-10-17 16:10
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0002_topicperformance'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='practiceactivity',
+            index=models.Index(fields=['user', 'topic', 'attempted_at'], name='practice_user_topic_time_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='practiceactivity',
+            index=models.Index(fields=['user', 'is_correct'], name='practice_user_correct_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='quizsession',
+            index=models.Index(fields=['user', 'completed_at'], name='quizsession_user_time_idx'),
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 6.0.2 on 2026-10-17 16:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0003_practice_and_session_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='GeneratedQuestion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('topic', models.CharField(max_length=100)),
+                ('difficulty', models.CharField(default='Easy', max_length=20)),
+                ('question', models.TextField()),
+                ('options', models.JSONField()),
+                ('correct_answer', models.IntegerField()),
+                ('explanation', models.TextField(blank=True)),
+                ('model_name', models.CharField(blank=True, max_length=100)),
+                ('content_hash', models.CharField(max_length=64, unique=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'verbose_name': 'Generated Question',
+                'verbose_name_plural': 'Generated Questions',
+                'indexes': [models.Index(fields=['topic', 'difficulty'], name='generated_topic_diff_idx')],
+            },
+        ),
+    ]
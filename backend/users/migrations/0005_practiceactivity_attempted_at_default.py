@@ -0,0 +1,19 @@
+# Generated by Django 6.0.2 on 2026-10-17 17:12
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0004_generatedquestion'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='practiceactivity',
+            name='attempted_at',
+            field=models.DateTimeField(default=django.utils.timezone.now, editable=False),
+        ),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 5.2.18 on 2026-10-17 18:00
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0005_practiceactivity_attempted_at_default'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProgressTrend',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('session_count', models.IntegerField(default=0)),
+                ('decay', models.FloatField(default=1.0)),
+                ('n', models.FloatField(default=0)),
+                ('sum_x', models.FloatField(default=0)),
+                ('sum_y', models.FloatField(default=0)),
+                ('sum_xy', models.FloatField(default=0)),
+                ('sum_xx', models.FloatField(default=0)),
+                ('sum_yy', models.FloatField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='progress_trend', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Progress Trend',
+                'verbose_name_plural': 'Progress Trends',
+            },
+        ),
+    ]
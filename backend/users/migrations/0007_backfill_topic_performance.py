@@ -0,0 +1,55 @@
+from django.db import migrations
+
+RECENT_WINDOW = 5
+
+
+def backfill_topic_performance(apps, schema_editor):
+    """
+    Build rollups for users that have practice history but no rollups
+    Uses the historical models, so the folding of TopicPerformance.add_attempt
+    is repeated here.
+    """
+    PracticeActivity = apps.get_model('users', 'PracticeActivity')
+    TopicPerformance = apps.get_model('users', 'TopicPerformance')
+
+    seeded = TopicPerformance.objects.values('user_id')
+    rows = (
+        PracticeActivity.objects.exclude(user_id__in=seeded)
+        .order_by('user_id', 'topic', 'attempted_at', 'id')
+        .values_list('user_id', 'topic', 'is_correct', 'time_taken', 'attempted_at')
+        .iterator(chunk_size=2000)
+    )
+
+    batch = []
+    rollup = None
+    for user_id, topic, is_correct, time_taken, attempted_at in rows:
+        if rollup is None or (rollup.user_id, rollup.topic) != (user_id, topic):
+            if rollup is not None:
+                batch.append(rollup)
+            rollup = TopicPerformance(user_id=user_id, topic=topic, first_attempt_at=attempted_at)
+        rollup.attempt_count += 1
+        rollup.correct_count += 1 if is_correct else 0
+        rollup.time_sum += time_taken
+        rollup.time_sq_sum += time_taken * time_taken
+        rollup.recent_results = (rollup.recent_results + ('1' if is_correct else '0'))[-RECENT_WINDOW:]
+        # Rows are in time order
+        rollup.last_attempt_at = attempted_at
+
+        if len(batch) >= 1000:
+            TopicPerformance.objects.bulk_create(batch)
+            batch = []
+
+    if rollup is not None:
+        batch.append(rollup)
+    TopicPerformance.objects.bulk_create(batch)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0006_progresstrend'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_topic_performance, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-17 18:11
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0007_backfill_topic_performance'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='practiceactivity',
+            name='client_attempt_id',
+            field=models.UUIDField(blank=True, editable=False, null=True, unique=True),
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 5.2.18 on 2026-10-17 18:14
+
+import django.utils.timezone
+from django.db import migrations, models
+from django.db.models import F
+
+
+def copy_attempted_at(apps, schema_editor):
+    """Existing rows were written close enough to when they were answered"""
+    PracticeActivity = apps.get_model('users', 'PracticeActivity')
+    PracticeActivity.objects.update(recorded_at=F('attempted_at'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0008_practiceactivity_client_attempt_id'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='practiceactivity',
+            name='recorded_at',
+            field=models.DateTimeField(db_index=True, default=django.utils.timezone.now, editable=False),
+        ),
+        migrations.RunPython(copy_attempted_at, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,48 @@
+import hashlib
+import re
+
+from django.db import migrations
+
+
+def _normalize(text):
+    text = re.sub(r'[^a-z0-9]+', ' ', str(text).lower())
+    return ' '.join(text.split())
+
+
+def rehash_generated_questions(apps, schema_editor):
+    """
+    content_hash now covers the difficulty, so the same question banked as
+    Easy and as Hard is stored twice; recompute it for stored rows
+    Uses the historical model, so question_bank.content_hash is repeated here.
+    """
+    GeneratedQuestion = apps.get_model('users', 'GeneratedQuestion')
+
+    batch = []
+    for entry in GeneratedQuestion.objects.only(
+        'topic', 'difficulty', 'question', 'options', 'content_hash',
+    ).iterator(chunk_size=2000):
+        parts = [
+            _normalize(entry.topic),
+            _normalize(entry.difficulty),
+            _normalize(entry.question),
+            *sorted(_normalize(option) for option in entry.options),
+        ]
+        entry.content_hash = hashlib.sha256('\x1f'.join(parts).encode('utf-8')).hexdigest()
+        batch.append(entry)
+
+        if len(batch) >= 1000:
+            GeneratedQuestion.objects.bulk_update(batch, ['content_hash'])
+            batch = []
+
+    GeneratedQuestion.objects.bulk_update(batch, ['content_hash'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0009_practiceactivity_recorded_at'),
+    ]
+
+    operations = [
+        migrations.RunPython(rehash_generated_questions, migrations.RunPython.noop),
+    ]
@@ -1,9 +1,11 @@
 """
 Machine Learning Models for Weak Area Detection and Prediction
-Using: K-Means Clustering, Logistic Regression, Linear Regression
+Using: K-Means Clustering (full or mini-batch), Logistic Regression, Linear Regression (batch or online)
 """
+from collections.abc import Mapping
+
 import numpy as np
-from sklearn.cluster import KMeans
+from sklearn.cluster import KMeans, MiniBatchKMeans
 from sklearn.linear_model import LogisticRegression, LinearRegression
 from sklearn.preprocessing import StandardScaler
 from sklearn.metrics import accuracy_score, confusion_matrix, mean_squared_error, r2_score
@@ -11,37 +13,63 @@ import warnings
 warnings.filterwarnings('ignore')
 
 
+def feature_matrix(features, schema):
+    """
+    Build a float matrix with one column per schema name
+    features may be a list of feature dicts, a dict of columns
+    ({name: sequence}) or an already built matrix, which is passed through.
+    Dict rows are read one column at a time, never converted row by row.
+    """
+    if isinstance(features, Mapping):
+        columns = [np.asarray(features[name], dtype=float) for name in schema]
+        return np.column_stack(columns) if columns[0].size else np.empty((0, len(schema)))
+    
+    if isinstance(features, np.ndarray) or (len(features) and not isinstance(features[0], Mapping)):
+        X = np.asarray(features, dtype=float)
+        return X.reshape(-1, len(schema))
+    
+    X = np.empty((len(features), len(schema)))
+    for column, name in enumerate(schema):
+        X[:, column] = np.fromiter((row[name] for row in features), dtype=float, count=len(features))
+    return X
+
+
 class WeakAreaClassifier:
     """
     Logistic Regression model to classify topics as Weak/Strong
     """
     
+    # Feature vector layout; stored with saved models (see model_registry)
+    FEATURE_SCHEMA = ('accuracy', 'avg_time', 'trend', 'consistency')
+    REGISTRY_NAME = 'weak_area_classifier'
+    
+    # A topic is Weak when accuracy over its next LABEL_WINDOW attempts is below WEAK_BELOW
+    LABEL_WINDOW = 5
+    WEAK_BELOW = 60
+    
     def __init__(self):
         self.model = LogisticRegression(random_state=42)
         self.scaler = StandardScaler()
     
+    @classmethod
+    def label(cls, later_results):
+        """
+        1 = Weak, 0 = Strong, from the 1/0 outcomes of attempts made after
+        the ones the features describe. Labelling from the features' own
+        accuracy would let the model just learn that threshold.
+        """
+        return int(sum(later_results) / len(later_results) * 100 < cls.WEAK_BELOW)
+    
     def prepare_data(self, features_list):
         """
         Convert features to numpy arrays for sklearn
+        Each feature dict carries its label under 'weak' (see label())
         """
-        X = []
-        y = []
-        
-        for features in features_list:
-            # Feature vector: [accuracy, avg_time, trend, consistency]
-            feature_vector = [
-                features['accuracy'],
-                features['avg_time'],
-                features['trend'],
-                features['consistency']
-            ]
-            X.append(feature_vector)
-            
-            # Label: 1 = Weak (accuracy < 60%), 0 = Strong
-            label = 1 if features['accuracy'] < 60 else 0
-            y.append(label)
-        
-        return np.array(X), np.array(y)
+        # Feature vector: [accuracy, avg_time, trend, consistency]
+        X = feature_matrix(features_list, self.FEATURE_SCHEMA)
+        y = np.fromiter((features['weak'] for features in features_list), dtype=int, count=len(features_list))
+        
+        return X, y
     
     def train(self, features_list):
         """
@@ -51,7 +79,12 @@ class WeakAreaClassifier:
             return None
         
         X, y = self.prepare_data(features_list)
-        
+        return self.train_matrix(X, y)
+    
+    def train_matrix(self, X, y):
+        """
+        Train on a prepared feature matrix (columns in FEATURE_SCHEMA order)
+        """
         # Normalize features
         X_scaled = self.scaler.fit_transform(X)
         
@@ -72,19 +105,24 @@ class WeakAreaClassifier:
         Predict if a topic is weak (1) or strong (0)
         Returns: probability of being weak
         """
-        feature_vector = np.array([[
-            features['accuracy'],
-            features['avg_time'],
-            features['trend'],
-            features['consistency']
-        ]])
-        
-        feature_scaled = self.scaler.transform(feature_vector)
-        
-        # Get probability of being weak
-        prob_weak = self.model.predict_proba(feature_scaled)[0][1]
-        
-        return prob_weak
+        return self.predict_many([features])[0]
+    
+    def predict_many(self, features):
+        """
+        Probability of being weak for each topic
+        features: list of feature dicts, dict of columns or feature matrix
+        """
+        return self.predict_proba(feature_matrix(features, self.FEATURE_SCHEMA))
+    
+    def predict_proba(self, X):
+        """
+        Probability of being weak for every row of a feature matrix
+        (columns in FEATURE_SCHEMA order), in one sklearn call
+        """
+        X = np.asarray(X, dtype=float)
+        if len(X) == 0:
+            return np.empty(0)
+        return self.model.predict_proba(self.scaler.transform(X))[:, 1]
 
 
 class PerformanceClusterer:
@@ -92,13 +130,30 @@ class PerformanceClusterer:
     K-Means Clustering to find performance patterns
     """
     
-    def __init__(self, n_clusters=3):
+    FEATURE_SCHEMA = ('accuracy', 'avg_time', 'total_attempts')
+    REGISTRY_NAME = 'performance_clusterer'
+    LABELS = ('Weak', 'Moderate', 'Strong')
+    
+    def __init__(self, n_clusters=3, incremental=False):
         """
         3 clusters: Weak, Moderate, Strong
+        incremental=True uses MiniBatchKMeans, updated batch by batch
+        with partial_fit instead of refitting everything
         """
         self.n_clusters = n_clusters
-        self.model = KMeans(n_clusters=n_clusters, random_state=42, n_init=10)
+        self.incremental = incremental
+        if incremental:
+            self.model = MiniBatchKMeans(n_clusters=n_clusters, random_state=42, n_init=1)
+        else:
+            self.model = KMeans(n_clusters=n_clusters, random_state=42, n_init=10)
         self.scaler = StandardScaler()
+        self.cluster_labels = {}
+        # Incremental bookkeeping, persisted with the model: practice recorded
+        # up to recorded_until has been fed, and overlap_ids lists the rows
+        # just before it that were (see training.update_performance_clusterer)
+        self.samples_seen = 0
+        self.recorded_until = None
+        self.overlap_ids = set()
     
     def fit_predict(self, features_list):
         """
@@ -107,19 +162,9 @@ class PerformanceClusterer:
         if len(features_list) < 3:
             return None
         
-        X = []
-        topics = []
-        
-        for features in features_list:
-            feature_vector = [
-                features['accuracy'],
-                features['avg_time'],
-                features['total_attempts']
-            ]
-            X.append(feature_vector)
-            topics.append(features['topic'])
+        X = feature_matrix(features_list, self.FEATURE_SCHEMA)
+        topics = [features['topic'] for features in features_list]
         
-        X = np.array(X)
         X_scaled = self.scaler.fit_transform(X)
         
         # Perform clustering
@@ -138,6 +183,7 @@ class PerformanceClusterer:
                 cluster_labels[i] = 'Moderate'
             else:
                 cluster_labels[i] = 'Strong'
+        self.cluster_labels = cluster_labels
         
         # Create results
         results = []
@@ -153,6 +199,62 @@ class PerformanceClusterer:
             'centers': centers.tolist(),
             'inertia': self.model.inertia_  # Sum of squared distances
         }
+    
+    def partial_fit(self, features):
+        """
+        Update the clusters with one batch of topics (incremental mode)
+        The first batch fixes the feature scaling, so centroids learned from
+        earlier batches keep their meaning. Cluster indices persist between
+        batches, and labels follow the centroids' accuracy order, so they
+        only change when one centroid overtakes another.
+        Returns the cluster labels, or None until a first batch of at least
+        n_clusters topics has been seen
+        """
+        if not self.incremental:
+            raise ValueError("partial_fit needs PerformanceClusterer(incremental=True)")
+        
+        X = feature_matrix(features, self.FEATURE_SCHEMA)
+        if self.samples_seen == 0:
+            if len(X) < self.n_clusters:
+                return None
+            self.scaler.fit(X)
+        if len(X):
+            self.model.partial_fit(self.scaler.transform(X))
+            self.samples_seen += len(X)
+        
+        self.cluster_labels = self._ranked_labels()
+        return self.cluster_labels
+    
+    def _ranked_labels(self):
+        """Label clusters by centroid accuracy rank: lowest Weak, highest Strong"""
+        centers = self.scaler.inverse_transform(self.model.cluster_centers_)
+        order = np.argsort(centers[:, 0], kind='stable')
+        labels = {}
+        for rank, cluster in enumerate(order):
+            labels[int(cluster)] = self.LABELS[rank * len(self.LABELS) // self.n_clusters]
+        return labels
+    
+    def centers(self):
+        """Cluster centroids in feature units, one row per cluster"""
+        return self.scaler.inverse_transform(self.model.cluster_centers_)
+    
+    def predict(self, features):
+        """
+        Assign a topic to one of the fitted clusters without refitting
+        Returns {'cluster', 'label'}
+        """
+        cluster = int(self.predict_many([features])[0])
+        return {'cluster': cluster, 'label': self.cluster_labels[cluster]}
+    
+    def predict_many(self, features):
+        """
+        Cluster index of each topic, in one sklearn call
+        features: list of feature dicts, dict of columns or feature matrix
+        """
+        X = feature_matrix(features, self.FEATURE_SCHEMA)
+        if len(X) == 0:
+            return np.empty(0, dtype=int)
+        return self.model.predict(self.scaler.transform(X))
 
 
 class ProgressPredictor:
@@ -160,6 +262,8 @@ class ProgressPredictor:
     Linear Regression to predict future performance
     """
     
+    FEATURE_SCHEMA = ('session_number',)
+    
     def __init__(self):
         self.model = LinearRegression()
     
@@ -171,8 +275,8 @@ class ProgressPredictor:
         if len(session_data) < 2:
             return None
         
-        X = np.array([[s['session_number']] for s in session_data])
-        y = np.array([s['accuracy'] for s in session_data])
+        X = feature_matrix(session_data, self.FEATURE_SCHEMA)
+        y = feature_matrix(session_data, ('accuracy',))[:, 0]
         
         self.model.fit(X, y)
         
@@ -194,10 +298,99 @@ class ProgressPredictor:
         """
         Predict accuracy for a future session
         """
-        X_future = np.array([[future_session_number]])
-        prediction = self.model.predict(X_future)[0]
+        return self.predict_many([future_session_number])[0]
+    
+    def predict_many(self, future_session_numbers):
+        """
+        Predicted accuracy for each of several future sessions
+        """
+        X_future = np.asarray(future_session_numbers, dtype=float).reshape(-1, 1)
+        if len(X_future) == 0:
+            return np.empty(0)
         
-        # Cap prediction between 0-100
-        prediction = max(0, min(100, prediction))
+        # Cap predictions between 0-100
+        return np.clip(self.model.predict(X_future), 0, 100)
+
+
+class OnlineProgressPredictor:
+    """
+    Linear Regression of accuracy on session number from running sums
+    Gives the same fit as ProgressPredictor, but each session is folded in
+    with update() in O(1) instead of refitting on the whole history.
+    With decay < 1, a session k sessions old carries weight decay**k.
+    """
+    
+    FEATURE_SCHEMA = ('session_number',)
+    SUMS = ('n', 'sum_x', 'sum_y', 'sum_xy', 'sum_xx', 'sum_yy')
+    
+    def __init__(self, decay=1.0, **sums):
+        if not 0 < decay <= 1:
+            raise ValueError("decay must be in (0, 1]")
+        self.decay = decay
+        for name in self.SUMS:
+            setattr(self, name, float(sums.get(name, 0.0)))
+    
+    def sums(self):
+        return {name: getattr(self, name) for name in self.SUMS}
+    
+    def update(self, session_number, accuracy):
+        """
+        Fold in one session
+        """
+        if self.decay < 1:
+            for name in self.SUMS:
+                setattr(self, name, getattr(self, name) * self.decay)
         
-        return prediction
\ No newline at end of file
+        x, y = float(session_number), float(accuracy)
+        self.n += 1
+        self.sum_x += x
+        self.sum_y += y
+        self.sum_xy += x * y
+        self.sum_xx += x * x
+        self.sum_yy += y * y
+    
+    def _centered(self):
+        # Weighted (co)variances times n: Sxx, Sxy, Syy
+        return (
+            self.sum_xx - self.sum_x * self.sum_x / self.n,
+            self.sum_xy - self.sum_x * self.sum_y / self.n,
+            self.sum_yy - self.sum_y * self.sum_y / self.n,
+        )
+    
+    def stats(self):
+        """
+        Fit metrics in the shape ProgressPredictor.train returns
+        None until two distinct session numbers have been seen
+        """
+        if self.n <= 0:
+            return None
+        s_xx, s_xy, s_yy = self._centered()
+        if s_xx <= 1e-9 * max(self.sum_xx, 1.0):
+            return None
+        
+        slope = s_xy / s_xx
+        intercept = (self.sum_y - slope * self.sum_x) / self.n
+        # Residual sum of squares, clamped against rounding
+        sse = max(s_yy - slope * s_xy, 0.0)
+        mse = sse / self.n
+        r2 = 1 - sse / s_yy if s_yy > 1e-9 * max(self.sum_yy, 1.0) else 1.0
+        
+        return {
+            'mse': mse,
+            'rmse': np.sqrt(mse),
+            'r2_score': r2,
+            'slope': slope,  # Rate of improvement
+            'intercept': intercept
+        }
+    
+    def predict(self, future_session_number):
+        """
+        Predict accuracy for a future session, or None before the fit exists
+        """
+        stats = self.stats()
+        if stats is None:
+            return None
+        prediction = stats['intercept'] + stats['slope'] * future_session_number
+        
+        # Cap prediction between 0-100
+        return max(0, min(100, prediction))
@@ -0,0 +1,184 @@
+"""
+On-disk registry of fitted ml_models
+Each save writes <ML_MODEL_DIR>/<name>/v<version>.joblib with a JSON sidecar
+holding the version, feature schema and training metrics. Views read models
+through get_registry().get(name), which keeps the newest version loaded
+and only re-reads the disk when another process saved a newer one, so
+predictions never refit.
+"""
+import json
+import logging
+import re
+import threading
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+import joblib
+import numpy as np
+import sklearn
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+_VERSION_FILE = re.compile(r'^v(\d+)\.joblib$')
+
+
+def _json_safe(value):
+    """Metrics often hold NumPy scalars and arrays; make them JSON serialisable"""
+    if isinstance(value, dict):
+        return {str(key): _json_safe(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_json_safe(item) for item in value]
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    if isinstance(value, np.generic):
+        return value.item()
+    return value
+
+
+class ModelRegistry:
+    """
+    Versioned store of fitted model objects
+
+    A stored model is only handed out while its saved feature schema still
+    matches the class's FEATURE_SCHEMA, so a model trained on old features
+    is never fed new ones.
+    """
+
+    # Seconds a missing or unusable model is remembered, and a loaded one is
+    # served before checking the disk for a newer version, so requests don't
+    # hit the disk each time; save() in this process forgets both at once
+    MISS_TTL = 60
+
+    def __init__(self, root):
+        self.root = Path(root)
+        self._lock = threading.Lock()
+        # name -> (model, version, monotonic time the disk was last checked)
+        self._loaded = {}
+        self._misses = {}
+
+    def _model_dir(self, name):
+        return self.root / name
+
+    def versions(self, name):
+        """Saved versions of a model, oldest first"""
+        model_dir = self._model_dir(name)
+        if not model_dir.is_dir():
+            return []
+        found = (_VERSION_FILE.match(path.name) for path in model_dir.iterdir())
+        return sorted(int(match.group(1)) for match in found if match)
+
+    def save(self, name, model, metrics=None):
+        """
+        Store a fitted model as the next version of name
+        Returns the metadata dict written next to it
+        """
+        with self._lock:
+            model_dir = self._model_dir(name)
+            model_dir.mkdir(parents=True, exist_ok=True)
+            version = (self.versions(name) or [0])[-1] + 1
+
+            metadata = {
+                'name': name,
+                'version': version,
+                'model_class': type(model).__name__,
+                'feature_schema': list(getattr(model, 'FEATURE_SCHEMA', ())),
+                'metrics': _json_safe(metrics or {}),
+                'sklearn_version': sklearn.__version__,
+                'trained_at': datetime.now(timezone.utc).isoformat(),
+            }
+            joblib.dump(model, model_dir / f'v{version}.joblib')
+            (model_dir / f'v{version}.json').write_text(json.dumps(metadata, indent=2), encoding='utf-8')
+
+            # The next get() in this process serves the new version
+            self._loaded.pop(name, None)
+            self._misses.pop(name, None)
+        logger.info("Saved %s version %s", name, version)
+        return metadata
+
+    def metadata(self, name, version=None):
+        """Metadata of a saved version (latest by default), or None"""
+        version = version or (self.versions(name) or [None])[-1]
+        if version is None:
+            return None
+        path = self._model_dir(name) / f'v{version}.json'
+        if not path.exists():
+            return None
+        return json.loads(path.read_text(encoding='utf-8'))
+
+    def load(self, name, version=None):
+        """Read a saved version (latest by default) from disk; None if unusable"""
+        metadata = self.metadata(name, version)
+        if metadata is None:
+            return None
+
+        try:
+            model = joblib.load(self._model_dir(name) / f"v{metadata['version']}.joblib")
+        except Exception:
+            logger.exception("Failed to load %s version %s", name, metadata['version'])
+            return None
+
+        expected = list(getattr(type(model), 'FEATURE_SCHEMA', ()))
+        if metadata['feature_schema'] != expected:
+            logger.warning(
+                "Ignoring %s version %s: trained on features %s, code expects %s",
+                name, metadata['version'], metadata['feature_schema'], expected,
+            )
+            return None
+        return model
+
+    def get(self, name):
+        """
+        Latest usable version of name, loaded once per version per process
+        Both a miss and the loaded version are trusted for MISS_TTL seconds,
+        so a model trained by another process (e.g.
+        train_weak_area_classifier) is picked up after that.
+        """
+        with self._lock:
+            now = time.monotonic()
+            entry = self._loaded.get(name)
+            if entry is not None:
+                model, version, checked_at = entry
+                if now - checked_at < self.MISS_TTL:
+                    return model
+                latest = (self.versions(name) or [None])[-1]
+                if latest is not None and latest > version:
+                    newer = self.load(name, latest)
+                    if newer is not None:
+                        logger.info("Reloaded %s version %s", name, latest)
+                        model, version = newer, latest
+                # An unusable newer version keeps the loaded one in service
+                self._loaded[name] = (model, version, now)
+                return model
+
+            missed_at = self._misses.get(name)
+            if missed_at is not None and now - missed_at < self.MISS_TTL:
+                return None
+            version = (self.versions(name) or [None])[-1]
+            model = self.load(name, version)
+            if model is not None:
+                self._loaded[name] = (model, version, now)
+                self._misses.pop(name, None)
+            else:
+                self._misses[name] = now
+            return model
+
+    def clear(self):
+        """Forget loaded models and misses so the next get() reads the disk again"""
+        with self._lock:
+            self._loaded.clear()
+            self._misses.clear()
+
+
+_registry = None
+_registry_lock = threading.Lock()
+
+
+def get_registry():
+    """Process-wide ModelRegistry rooted at ML_MODEL_DIR"""
+    global _registry
+    with _registry_lock:
+        if _registry is None:
+            _registry = ModelRegistry(getattr(settings, 'ML_MODEL_DIR', settings.BASE_DIR / 'trained_models'))
+        return _registry
@@ -3,6 +3,7 @@ from django.db import models
 # Create your models here.
 from django.db import models
 from django.contrib.auth.models import User
+from django.utils import timezone
 
 class PracticeActivity(models.Model):
     """
@@ -25,12 +26,23 @@ class PracticeActivity(models.Model):
     
     # Time tracking
     time_taken = models.IntegerField(help_text="Time taken in seconds")
-    attempted_at = models.DateTimeField(auto_now_add=True)
+    # Not auto_now_add: buffered attempts are saved later with their answer time
+    attempted_at = models.DateTimeField(default=timezone.now, editable=False)
+    # When the row was written; buffered attempts are written after attempted_at
+    recorded_at = models.DateTimeField(default=timezone.now, editable=False, db_index=True)
+    # Set by the session write buffer so a replayed batch is not saved twice
+    client_attempt_id = models.UUIDField(null=True, blank=True, unique=True, editable=False)
     
     class Meta:
         verbose_name = "Practice Activity"
         verbose_name_plural = "Practice Activities"
         ordering = ['-attempted_at']  # Most recent first
+        indexes = [
+            # Per-topic history, always read for one user in time order
+            models.Index(fields=['user', 'topic', 'attempted_at'], name='practice_user_topic_time_idx'),
+            # Correct-answer counts per user
+            models.Index(fields=['user', 'is_correct'], name='practice_user_correct_idx'),
+        ]
     
     def __str__(self):
         result = 'Correct' if self.is_correct else 'Wrong'
@@ -57,6 +69,157 @@ class QuizSession(models.Model):
         verbose_name = "Quiz Session"
         verbose_name_plural = "Quiz Sessions"
         ordering = ['-completed_at']
+        indexes = [
+            models.Index(fields=['user', 'completed_at'], name='quizsession_user_time_idx'),
+        ]
     
     def __str__(self):
-        return f"{self.user.username} - {self.accuracy}% - {self.completed_at.strftime('%Y-%m-%d')}"
\ No newline at end of file
+        return f"{self.user.username} - {self.accuracy}% - {self.completed_at.strftime('%Y-%m-%d')}"
+
+class TopicPerformance(models.Model):
+    """
+    Running per-user per-topic totals, kept in step with PracticeActivity
+    Lets analytics read one row per topic instead of every attempt
+    """
+
+    # Number of most recent outcomes kept for consistency
+    RECENT_WINDOW = 5
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE)
+    topic = models.CharField(max_length=100)
+
+    # Running totals
+    attempt_count = models.IntegerField(default=0)
+    correct_count = models.IntegerField(default=0)
+    time_sum = models.BigIntegerField(default=0, help_text="Sum of time taken in seconds")
+    time_sq_sum = models.BigIntegerField(default=0, help_text="Sum of squared time taken")
+
+    # Last RECENT_WINDOW outcomes, oldest first ('1' = correct, '0' = wrong)
+    recent_results = models.CharField(max_length=20, blank=True, default='')
+
+    first_attempt_at = models.DateTimeField(null=True, blank=True)
+    last_attempt_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        verbose_name = "Topic Performance"
+        verbose_name_plural = "Topic Performance"
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'topic'], name='unique_user_topic_performance'),
+        ]
+
+    def __str__(self):
+        return f"{self.user.username} - {self.topic} - {self.correct_count}/{self.attempt_count}"
+
+    def add_attempt(self, is_correct, time_taken, attempted_at):
+        """Fold one attempt into the running totals (does not save)"""
+        self.attempt_count += 1
+        self.correct_count += 1 if is_correct else 0
+        self.time_sum += time_taken
+        self.time_sq_sum += time_taken * time_taken
+        self.recent_results = (self.recent_results + ('1' if is_correct else '0'))[-self.RECENT_WINDOW:]
+
+        if self.first_attempt_at is None or attempted_at < self.first_attempt_at:
+            self.first_attempt_at = attempted_at
+        if self.last_attempt_at is None or attempted_at > self.last_attempt_at:
+            self.last_attempt_at = attempted_at
+
+    @property
+    def recent_outcomes(self):
+        """Last outcomes as 1/0 ints, oldest first"""
+        return [int(result) for result in self.recent_results]
+
+    @property
+    def avg_time(self):
+        return self.time_sum / self.attempt_count if self.attempt_count else 0
+
+
+class ProgressTrend(models.Model):
+    """
+    Running least-squares sums of quiz accuracy against session number
+    Updated as each QuizSession is saved, so the progress forecast never
+    refits on the session history (see ml_models.OnlineProgressPredictor)
+    """
+
+    user = models.OneToOneField(User, on_delete=models.CASCADE, related_name='progress_trend')
+
+    session_count = models.IntegerField(default=0)
+    # Decay factor the sums were accumulated with (1 = every session counts equally)
+    decay = models.FloatField(default=1.0)
+
+    # Weighted sums; x = session number, y = accuracy
+    n = models.FloatField(default=0)
+    sum_x = models.FloatField(default=0)
+    sum_y = models.FloatField(default=0)
+    sum_xy = models.FloatField(default=0)
+    sum_xx = models.FloatField(default=0)
+    sum_yy = models.FloatField(default=0)
+
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = "Progress Trend"
+        verbose_name_plural = "Progress Trends"
+
+    def __str__(self):
+        return f"{self.user.username} - {self.session_count} sessions"
+
+    def predictor(self):
+        """OnlineProgressPredictor holding these sums"""
+        from .ml_models import OnlineProgressPredictor
+
+        return OnlineProgressPredictor(
+            decay=self.decay, **{name: getattr(self, name) for name in OnlineProgressPredictor.SUMS}
+        )
+
+    def add_session(self, accuracy):
+        """Fold the next session into the sums (does not save)"""
+        predictor = self.predictor()
+        self.session_count += 1
+        predictor.update(self.session_count, accuracy)
+        for name, value in predictor.sums().items():
+            setattr(self, name, value)
+
+
+class GeneratedQuestion(models.Model):
+    """
+    Validated AI-generated question kept for reuse across quizzes
+    content_hash identifies near-identical questions so each is stored once
+    """
+
+    topic = models.CharField(max_length=100)
+    difficulty = models.CharField(max_length=20, default='Easy')
+
+    question = models.TextField()
+    options = models.JSONField()
+    correct_answer = models.IntegerField()
+    explanation = models.TextField(blank=True)
+
+    # Which Groq model produced it
+    model_name = models.CharField(max_length=100, blank=True)
+    content_hash = models.CharField(max_length=64, unique=True)
+
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        verbose_name = "Generated Question"
+        verbose_name_plural = "Generated Questions"
+        indexes = [
+            models.Index(fields=['topic', 'difficulty'], name='generated_topic_diff_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.topic} ({self.difficulty}) - {self.question[:50]}"
+
+    def as_question(self):
+        """Question dict in the same shape ai_generator returns"""
+        return {
+            'id': f'bank_{self.pk}',
+            'bank_id': self.pk,
+            'topic': self.topic,
+            'difficulty': self.difficulty,
+            'question': self.question,
+            'options': self.options,
+            'correct_answer': self.correct_answer,
+            'explanation': self.explanation,
+            'source': f'Question Bank ({self.model_name})' if self.model_name else 'Question Bank',
+        }
@@ -0,0 +1,118 @@
+"""
+Persistent bank of AI-generated questions
+Validated questions are stored once (deduplicated by a normalized content
+hash) and served back for later quizzes on the same topic and difficulty.
+A QUESTION_BANK_REFRESH_RATE share of requests skips the bank even when it
+is stocked, so Groq keeps adding fresh questions to it.
+"""
+import hashlib
+import logging
+import random
+import re
+
+from django.conf import settings
+
+from .models import GeneratedQuestion
+
+logger = logging.getLogger(__name__)
+
+
+def _normalize(text):
+    """Lowercase, drop punctuation and collapse whitespace"""
+    text = re.sub(r'[^a-z0-9]+', ' ', str(text).lower())
+    return ' '.join(text.split())
+
+
+def content_hash(topic, difficulty, question, options):
+    """
+    Hash identifying near-identical questions of one difficulty
+    Ignores case, punctuation, spacing and option order
+    """
+    parts = [
+        _normalize(topic),
+        _normalize(difficulty),
+        _normalize(question),
+        *sorted(_normalize(option) for option in options),
+    ]
+    return hashlib.sha256('\x1f'.join(parts).encode('utf-8')).hexdigest()
+
+
+def store_questions(questions, model_name=''):
+    """
+    Save formatted questions to the bank, skipping ones already stored
+    Returns the banked GeneratedQuestion for every input, in input order
+    """
+    hashes = [content_hash(q['topic'], q['difficulty'], q['question'], q['options']) for q in questions]
+
+    new_entries = {}
+    for q, digest in zip(questions, hashes):
+        new_entries.setdefault(digest, GeneratedQuestion(
+            topic=q['topic'],
+            difficulty=q['difficulty'],
+            question=q['question'],
+            options=q['options'],
+            correct_answer=q['correct_answer'],
+            explanation=q.get('explanation', ''),
+            model_name=model_name,
+            content_hash=digest,
+        ))
+
+    GeneratedQuestion.objects.bulk_create(new_entries.values(), ignore_conflicts=True)
+
+    banked = GeneratedQuestion.objects.in_bulk(hashes, field_name='content_hash')
+    return [banked[digest] for digest in hashes if digest in banked]
+
+
+def draw_from_bank(topic, difficulty, num_questions, min_available=None, refresh_rate=None):
+    """
+    Random set of banked questions for (topic, difficulty)
+    Returns None when fewer than min_available are banked, or for a
+    refresh_rate share of calls, so the caller generates (and banks) fresh
+    ones instead
+    """
+    if min_available is None:
+        min_available = getattr(settings, 'QUESTION_BANK_MIN_SIZE', 20)
+    min_available = max(min_available, num_questions)
+    if refresh_rate is None:
+        refresh_rate = getattr(settings, 'QUESTION_BANK_REFRESH_RATE', 0.1)
+
+    if random.random() < refresh_rate:
+        return None
+
+    # The database shuffles; only min_available ids are read back
+    ids = list(GeneratedQuestion.objects.filter(
+        topic=topic,
+        difficulty=difficulty
+    ).order_by('?').values_list('id', flat=True)[:min_available])
+
+    if len(ids) < min_available:
+        return None
+
+    chosen = ids[:num_questions]
+    banked = GeneratedQuestion.objects.in_bulk(chosen)
+    return [banked[pk].as_question() for pk in chosen if pk in banked]
+
+
+def bank_generated_questions(questions, model_name=''):
+    """
+    Store freshly generated questions and return them with bank ids attached
+    The bank is best effort: on database errors the questions pass through unchanged
+    """
+    try:
+        banked = store_questions(questions, model_name)
+    except Exception:
+        logger.exception("Failed to store generated questions in the bank")
+        return questions
+
+    by_hash = {entry.content_hash: entry for entry in banked}
+    result = []
+    seen = set()
+    for q in questions:
+        digest = content_hash(q['topic'], q['difficulty'], q['question'], q['options'])
+        if digest in seen:
+            # Near-identical to an earlier question in the same set
+            continue
+        seen.add(digest)
+        entry = by_hash.get(digest)
+        result.append({**q, 'bank_id': entry.pk} if entry else q)
+    return result
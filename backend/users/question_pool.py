@@ -0,0 +1,381 @@
+"""
+Background pre-generation of AI question sets
+Keeps a few ready sets per (topic, difficulty) so adaptive_quiz can pop one
+instead of waiting on the Groq round-trip inside the request. When none is
+ready the set is streamed instead, so the quiz starts with the first question.
+"""
+import asyncio
+import logging
+import threading
+import time
+import uuid
+from collections import defaultdict, deque
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import connections
+
+logger = logging.getLogger(__name__)
+
+
+class InlineExecutor:
+    """
+    Executor that runs tasks immediately in the caller's thread
+    Used when no worker threads are configured, and in tests
+    """
+
+    def submit(self, fn, *args, **kwargs):
+        future = Future()
+        try:
+            future.set_result(fn(*args, **kwargs))
+        except BaseException as exc:
+            future.set_exception(exc)
+        return future
+
+    def shutdown(self, wait=True):
+        pass
+
+
+def _resolve_waiter(future):
+    if not future.done():
+        future.set_result(None)
+
+
+class QuestionStream:
+    """
+    Questions of one set, appended by a worker thread as they are generated
+    Async views wait on it with wait_for(); every method is thread-safe.
+    """
+
+    def __init__(self, topic, difficulty, num_questions):
+        self.id = uuid.uuid4().hex
+        self.topic = topic
+        self.difficulty = difficulty
+        self.num_questions = num_questions
+        self.error = None
+        self.updated_at = time.monotonic()
+        self._questions = []
+        self._done = False
+        self._lock = threading.Lock()
+        self._waiters = []
+
+    def push(self, question):
+        with self._lock:
+            self._questions.append(question)
+            self._wake()
+
+    def finish(self, error=None):
+        with self._lock:
+            self.error = error
+            self._done = True
+            self._wake()
+
+    def _wake(self):
+        # Called with the lock held
+        self.updated_at = time.monotonic()
+        for loop, future in self._waiters:
+            try:
+                loop.call_soon_threadsafe(_resolve_waiter, future)
+            except RuntimeError:
+                # The waiting request's loop has closed
+                pass
+        self._waiters = []
+
+    def snapshot(self):
+        """(questions so far, whether the stream has ended)"""
+        with self._lock:
+            self.updated_at = time.monotonic()
+            return list(self._questions), self._done
+
+    async def wait_for(self, count, timeout=None):
+        """Wait until more than count questions exist or the stream ended, then snapshot()"""
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            if len(self._questions) > count or self._done:
+                waiter = None
+            else:
+                waiter = loop.create_future()
+                self._waiters.append((loop, waiter))
+        if waiter is not None:
+            try:
+                await asyncio.wait_for(waiter, timeout)
+            except asyncio.TimeoutError:
+                pass
+        return self.snapshot()
+
+
+class QuestionPrefetcher:
+    """
+    Pool of pre-generated question sets keyed by (topic, difficulty, count)
+
+    generator is called as generator(topic, difficulty, num_questions,
+    allow_fallback=False) and defaults to ai_generator.generate_questions;
+    atake() uses ai_generator.agenerate_questions unless a generator was given.
+    executor can be any object with submit() (a thread pool by default, or
+    a task-queue adapter); tasks push their result into the pool themselves.
+
+    streamer is called like generator but yields questions one at a time
+    (ai_generator.stream_questions by default); astream() runs it on
+    stream_executor, or on stream_workers threads of its own.
+    """
+
+    # Streams nobody has read or written for this long are dropped
+    STREAM_TTL = 15 * 60
+
+    def __init__(self, generator=None, depth=1, max_workers=2, executor=None,
+                 streamer=None, stream_workers=8, stream_executor=None):
+        self.depth = depth
+        self._generator = generator
+        self._executor = executor
+        self._max_workers = max_workers
+        self._streamer = streamer
+        self._stream_executor = stream_executor
+        self._stream_workers = stream_workers
+        self._lock = threading.Lock()
+        self._ready = defaultdict(deque)
+        self._inflight = defaultdict(set)
+        self._streams = {}
+
+    @staticmethod
+    def _key(topic, difficulty, num_questions):
+        return (topic, difficulty, num_questions)
+
+    def _get_generator(self):
+        if self._generator is None:
+            from .ai_generator import generate_questions
+            return generate_questions
+        return self._generator
+
+    def _get_executor(self):
+        if self._executor is None:
+            if self._max_workers > 0:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self._max_workers,
+                    thread_name_prefix='question-prefetch',
+                )
+            else:
+                self._executor = InlineExecutor()
+        return self._executor
+
+    def _get_streamer(self):
+        if self._streamer is None:
+            from .ai_generator import stream_questions
+            return stream_questions
+        return self._streamer
+
+    def _get_stream_executor(self):
+        if self._stream_executor is None:
+            if self._stream_workers > 0:
+                self._stream_executor = ThreadPoolExecutor(
+                    max_workers=self._stream_workers,
+                    thread_name_prefix='question-stream',
+                )
+            else:
+                self._stream_executor = InlineExecutor()
+        return self._stream_executor
+
+    def _generate(self, topic, difficulty, num_questions):
+        return self._get_generator()(topic, difficulty, num_questions, allow_fallback=False)
+
+    def _prefetch_task(self, key):
+        topic, difficulty, num_questions = key
+        try:
+            questions = self._generate(topic, difficulty, num_questions)
+            if questions:
+                with self._lock:
+                    self._ready[key].append(questions)
+        except Exception as exc:
+            logger.warning("Background question generation failed for %s/%s: %s", topic, difficulty, exc)
+        finally:
+            # Worker threads must not keep their own DB connections open
+            if not isinstance(self._executor, InlineExecutor):
+                connections.close_all()
+
+    def warm(self, topic, difficulty='Easy', num_questions=5):
+        """Schedule background generation until depth sets are ready or in flight"""
+        if self.depth <= 0:
+            return
+        key = self._key(topic, difficulty, num_questions)
+
+        # Slots are reserved before the lock is released, so concurrent
+        # calls never schedule more than depth sets between them
+        with self._lock:
+            missing = self.depth - len(self._ready[key]) - len(self._inflight[key])
+            slots = [Future() for _ in range(max(0, missing))]
+            self._inflight[key].update(slots)
+        for slot in slots:
+            try:
+                future = self._get_executor().submit(self._prefetch_task, key)
+            except Exception:
+                self._release_slot(key, slot)
+                raise
+            future.add_done_callback(lambda done, key=key, slot=slot: self._release_slot(key, slot))
+
+    def _release_slot(self, key, slot):
+        """Free an in-flight slot and wake whoever waits on it"""
+        with self._lock:
+            self._inflight[key].discard(slot)
+        _resolve_waiter(slot)
+
+    def _pop_ready(self, key):
+        with self._lock:
+            if self._ready[key]:
+                return self._ready[key].popleft()
+        return None
+
+    def take(self, topic, difficulty='Easy', num_questions=5, timeout=None):
+        """
+        Return a question set for (topic, difficulty)
+        Uses a ready set if one exists, waits for an in-flight one, and
+        otherwise generates synchronously (errors propagate to the caller).
+        A refill is scheduled either way.
+        """
+        key = self._key(topic, difficulty, num_questions)
+
+        questions = self._pop_ready(key)
+        if questions is None:
+            with self._lock:
+                inflight = list(self._inflight[key])
+            if inflight:
+                wait(inflight, timeout=timeout, return_when=FIRST_COMPLETED)
+                questions = self._pop_ready(key)
+
+        if questions is None:
+            questions = self._generate(topic, difficulty, num_questions)
+
+        self.warm(topic, difficulty, num_questions)
+        return questions
+
+    async def _await_ready(self, key, timeout):
+        questions = self._pop_ready(key)
+        if questions is None:
+            with self._lock:
+                inflight = list(self._inflight[key])
+            if inflight:
+                await asyncio.wait(
+                    [asyncio.wrap_future(future) for future in inflight],
+                    timeout=timeout,
+                    return_when=asyncio.FIRST_COMPLETED,
+                )
+                questions = self._pop_ready(key)
+        return questions
+
+    async def _awarm(self, topic, difficulty, num_questions):
+        if isinstance(self._get_executor(), InlineExecutor):
+            # Inline refills would generate on the event loop
+            await sync_to_async(self.warm)(topic, difficulty, num_questions)
+        else:
+            self.warm(topic, difficulty, num_questions)
+
+    async def atake(self, topic, difficulty='Easy', num_questions=5, timeout=None):
+        """take() for async views; never blocks the event loop"""
+        key = self._key(topic, difficulty, num_questions)
+
+        questions = await self._await_ready(key, timeout)
+        if questions is None:
+            if self._generator is None:
+                from .ai_generator import agenerate_questions
+                questions = await agenerate_questions(topic, difficulty, num_questions, allow_fallback=False)
+            else:
+                questions = await sync_to_async(self._generate_closing, thread_sensitive=False)(
+                    topic, difficulty, num_questions,
+                )
+
+        await self._awarm(topic, difficulty, num_questions)
+        return questions
+
+    async def astream(self, topic, difficulty='Easy', num_questions=5, timeout=None):
+        """
+        Start a question set for an async view as soon as its first question exists
+        Returns (questions, stream). A ready or in-flight set comes back whole
+        with stream None. Otherwise the set is streamed: questions holds what
+        arrived by the time the first one did, and stream (also reachable by
+        get_stream(stream.id)) keeps collecting the rest. An empty list means
+        generation failed; stream.error says why.
+        """
+        key = self._key(topic, difficulty, num_questions)
+
+        stream = None
+        questions = await self._await_ready(key, timeout)
+        if questions is None:
+            stream = await self.aopen_stream(topic, difficulty, num_questions)
+            questions, _ = await stream.wait_for(0, timeout)
+
+        await self._awarm(topic, difficulty, num_questions)
+        return questions, stream
+
+    def open_stream(self, topic, difficulty='Easy', num_questions=5):
+        """Start streaming a new question set in the background and return its QuestionStream"""
+        stream = QuestionStream(topic, difficulty, num_questions)
+        expired = time.monotonic() - self.STREAM_TTL
+        with self._lock:
+            for stream_id, old in list(self._streams.items()):
+                if old.updated_at < expired:
+                    del self._streams[stream_id]
+            self._streams[stream.id] = stream
+        self._get_stream_executor().submit(self._stream_task, stream)
+        return stream
+
+    async def aopen_stream(self, topic, difficulty='Easy', num_questions=5):
+        """open_stream() for async views"""
+        if isinstance(self._get_stream_executor(), InlineExecutor):
+            # An inline stream would generate on the event loop
+            return await sync_to_async(self.open_stream)(topic, difficulty, num_questions)
+        return self.open_stream(topic, difficulty, num_questions)
+
+    def get_stream(self, stream_id):
+        """The QuestionStream with this id, or None if it expired or lives in another process"""
+        with self._lock:
+            return self._streams.get(stream_id)
+
+    def _stream_task(self, stream):
+        try:
+            for question in self._get_streamer()(
+                stream.topic, stream.difficulty, stream.num_questions, allow_fallback=False,
+            ):
+                stream.push(question)
+        except Exception as exc:
+            logger.warning("Question stream failed for %s/%s: %s", stream.topic, stream.difficulty, exc)
+            stream.finish(exc)
+        else:
+            stream.finish()
+        finally:
+            if not isinstance(self._stream_executor, InlineExecutor):
+                connections.close_all()
+
+    def _generate_closing(self, topic, difficulty, num_questions):
+        # Runs on a one-off executor thread; don't leave its DB connection open
+        try:
+            return self._generate(topic, difficulty, num_questions)
+        finally:
+            connections.close_all()
+
+    def ready_count(self, topic, difficulty='Easy', num_questions=5):
+        """Number of ready sets for (topic, difficulty)"""
+        with self._lock:
+            return len(self._ready[self._key(topic, difficulty, num_questions)])
+
+    def clear(self):
+        """Drop every ready set (in-flight tasks still complete)"""
+        with self._lock:
+            self._ready.clear()
+
+
+_prefetcher = None
+_prefetcher_lock = threading.Lock()
+
+
+def get_prefetcher():
+    """Process-wide QuestionPrefetcher configured from settings"""
+    global _prefetcher
+    with _prefetcher_lock:
+        if _prefetcher is None:
+            max_workers = getattr(settings, 'QUESTION_PREFETCH_WORKERS', 2)
+            _prefetcher = QuestionPrefetcher(
+                # Without workers there is no background, so nothing to prefetch
+                depth=getattr(settings, 'QUESTION_PREFETCH_DEPTH', 1) if max_workers > 0 else 0,
+                max_workers=max_workers,
+                stream_workers=getattr(settings, 'QUESTION_STREAM_WORKERS', 8),
+            )
+        return _prefetcher
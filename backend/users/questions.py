@@ -1,5 +1,6 @@
 # Static quiz questions for analytics practice
 # These are easy-level questions for beginners
+from types import MappingProxyType
 
 QUIZ_QUESTIONS = [
     {
@@ -145,14 +146,47 @@ QUIZ_QUESTIONS = [
 ]
 
 
+# Read-only index over QUIZ_QUESTIONS, built once at import. Questions are
+# handed out as immutable mappings (options as tuples), so callers can share
+# them without copying; edits to QUIZ_QUESTIONS after import are not seen.
+
+def _freeze(question):
+    return MappingProxyType({**question, 'options': tuple(question['options'])})
+
+
+def _group(questions, key):
+    groups = {}
+    for question in questions:
+        groups.setdefault(key(question), []).append(question)
+    return MappingProxyType({name: tuple(members) for name, members in groups.items()})
+
+
+_QUESTIONS = tuple(_freeze(question) for question in QUIZ_QUESTIONS)
+_IDS = tuple(question['id'] for question in _QUESTIONS)
+_BY_ID = MappingProxyType({question['id']: question for question in _QUESTIONS})
+if len(_BY_ID) != len(_QUESTIONS):
+    raise ValueError("QUIZ_QUESTIONS has duplicate ids")
+_BY_TOPIC = _group(_QUESTIONS, lambda q: q['topic'].lower())
+_BY_TOPIC_DIFFICULTY = _group(_QUESTIONS, lambda q: (q['topic'].lower(), q['difficulty'].lower()))
+
+
 def get_all_questions():
-    """Return all quiz questions"""
-    return QUIZ_QUESTIONS
+    """Return all quiz questions (a tuple of read-only questions)"""
+    return _QUESTIONS
+
+
+def get_question_ids():
+    """Ids of every question, in QUIZ_QUESTIONS order"""
+    return _IDS
 
 
 def get_question_by_id(question_id):
     """Get a specific question by ID"""
-    for question in QUIZ_QUESTIONS:
-        if question['id'] == question_id:
-            return question
-    return None
\ No newline at end of file
+    return _BY_ID.get(question_id)
+
+
+def get_questions_by_topic(topic, difficulty=None):
+    """Questions of a topic, optionally of one difficulty (case-insensitive); empty if none"""
+    if difficulty is None:
+        return _BY_TOPIC.get(topic.lower(), ())
+    return _BY_TOPIC_DIFFICULTY.get((topic.lower(), difficulty.lower()), ())
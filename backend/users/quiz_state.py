@@ -0,0 +1,48 @@
+"""
+Compact quiz progress records for the session
+The session keeps question references and a cursor instead of full question
+dicts, so each answer rewrites a few bytes rather than the whole question set.
+Questions are resolved from the static list or the question bank per request.
+"""
+import random
+
+from .models import GeneratedQuestion
+from .questions import get_question_by_id, get_question_ids
+
+
+def new_shuffle_seed():
+    """Seed that fixes one quiz's question order"""
+    return random.randrange(2 ** 31)
+
+
+def static_question_order(seed=None):
+    """Static question ids in the order a quiz with this seed presents them"""
+    ids = list(get_question_ids())
+    if seed is not None:
+        random.Random(seed).shuffle(ids)
+    return ids
+
+
+def static_question_at(seed, position):
+    """Question at a 0-based position of a seeded static quiz, or None past the end"""
+    order = static_question_order(seed)
+    if position >= len(order):
+        return None
+    return get_question_by_id(order[position])
+
+
+def question_refs(questions):
+    """
+    Session references for a generated question set
+    Banked questions are referenced by bank id; anything else (static
+    fallback, or banking disabled) has nothing to resolve from, so it stays inline.
+    """
+    return [question['bank_id'] if question.get('bank_id') else question for question in questions]
+
+
+def resolve_question_ref(ref):
+    """Question dict for a reference from question_refs, or None if it is gone"""
+    if isinstance(ref, dict):
+        return ref
+    banked = GeneratedQuestion.objects.filter(pk=ref).first()
+    return banked.as_question() if banked else None
@@ -0,0 +1,243 @@
+"""
+Write path for practice attempts and quiz sessions, and their rollups
+Every attempt recorded here updates the per-topic totals, and every quiz
+session the user's ProgressTrend sums, in the same transaction
+"""
+from collections import defaultdict
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import transaction
+
+from .caching import bump_data_version
+from .metrics import ATTEMPTS_RECORDED, QUIZ_SESSIONS_COMPLETED
+from .models import PracticeActivity, ProgressTrend, QuizSession, TopicPerformance
+
+
+# Columns needed to rebuild a rollup, in scan order
+ROLLUP_SOURCE_FIELDS = ('user_id', 'topic', 'is_correct', 'time_taken', 'attempted_at')
+
+
+def record_attempt(user, question_id, topic, difficulty, selected_option, correct_answer, is_correct, time_taken):
+    """
+    Save one question attempt and update the user's topic rollup
+    Returns the created PracticeActivity
+    """
+    with transaction.atomic():
+        activity = PracticeActivity.objects.create(
+            user=user,
+            question_id=question_id,
+            topic=topic,
+            difficulty=difficulty,
+            selected_option=selected_option,
+            correct_answer=correct_answer,
+            is_correct=is_correct,
+            time_taken=time_taken
+        )
+        apply_attempts(user, [activity])
+        transaction.on_commit(ATTEMPTS_RECORDED.inc)
+
+    return activity
+
+
+def record_attempts(user, attempts):
+    """
+    Save several attempts with one bulk insert and update the user's rollups
+    attempts are dicts of PracticeActivity field values (attempted_at
+    included, so buffered attempts keep the time they were answered).
+    Attempts whose client_attempt_id is already saved are skipped, so
+    replaying a batch neither duplicates rows nor counts them twice.
+    Returns the created PracticeActivity objects
+    """
+    with transaction.atomic():
+        keys = [str(attempt['client_attempt_id']) for attempt in attempts if attempt.get('client_attempt_id')]
+        if keys:
+            # Serialise flushes for the same user so a concurrent replay sees this one's rows
+            list(get_user_model().objects.select_for_update().filter(pk=user.pk).values_list('pk', flat=True))
+            saved = {
+                str(key) for key in
+                PracticeActivity.objects.filter(client_attempt_id__in=keys).values_list('client_attempt_id', flat=True)
+            }
+            attempts = [attempt for attempt in attempts if str(attempt.get('client_attempt_id')) not in saved]
+        if not attempts:
+            return []
+
+        activities = PracticeActivity.objects.bulk_create(
+            [PracticeActivity(user=user, **attempt) for attempt in attempts],
+            # The unique client_attempt_id backs up the check above
+            ignore_conflicts=bool(keys),
+        )
+        apply_attempts(user, activities)
+        # bulk_create sends no post_save, so invalidate caches here
+        transaction.on_commit(lambda: bump_data_version(user.pk))
+        transaction.on_commit(lambda: ATTEMPTS_RECORDED.inc(len(activities)))
+
+    return activities
+
+
+def apply_attempts(user, activities):
+    """
+    Fold already-saved attempts into the user's rollups
+    Must run inside the transaction that saved the attempts
+    """
+    if _seed_user_rollups(user):
+        return
+
+    by_topic = defaultdict(list)
+    for activity in activities:
+        by_topic[activity.topic].append(activity)
+
+    for topic, topic_activities in by_topic.items():
+        rollup = TopicPerformance.objects.select_for_update().filter(user=user, topic=topic).first()
+
+        if rollup is None:
+            # New topic for a user with rollups: seed it from the full
+            # history, which already includes the attempts being applied
+            _seed_rollup(user, topic)
+            continue
+
+        topic_activities.sort(key=lambda activity: (activity.attempted_at, activity.pk or 0))
+        for activity in topic_activities:
+            rollup.add_attempt(activity.is_correct, activity.time_taken, activity.attempted_at)
+        rollup.save()
+
+
+def _seed_user_rollups(user):
+    """
+    Build every topic rollup of a user who has none yet, from the full
+    history (which already includes the attempts being applied)
+
+    Analytics trusts a user's rollups as soon as any exist, so seeding only
+    the topic being answered would hide the user's other topics until a
+    backfill. Returns True if the user was seeded.
+    """
+    if TopicPerformance.objects.filter(user=user).exists():
+        return False
+    # Serialise concurrent first writes for the same user
+    list(get_user_model().objects.select_for_update().filter(pk=user.pk).values_list('pk', flat=True))
+    if TopicPerformance.objects.filter(user=user).exists():
+        return False
+    rebuild_topic_performance(user_ids=[user.pk])
+    return True
+
+
+def _seed_rollup(user, topic):
+    rows = ordered_rollup_rows(PracticeActivity.objects.filter(user=user, topic=topic))
+    rollups = list(iter_rollups(rows))
+    defaults = {
+        field: getattr(rollups[0], field)
+        for field in ('attempt_count', 'correct_count', 'time_sum', 'time_sq_sum',
+                      'recent_results', 'first_attempt_at', 'last_attempt_at')
+    }
+    TopicPerformance.objects.update_or_create(user=user, topic=topic, defaults=defaults)
+
+
+def ordered_rollup_rows(queryset):
+    return queryset.order_by('user_id', 'topic', 'attempted_at', 'id').values_list(*ROLLUP_SOURCE_FIELDS)
+
+
+def iter_rollups(rows):
+    """
+    Build unsaved TopicPerformance objects from rows ordered by user, topic, time
+    """
+    rollup = None
+    for user_id, topic, is_correct, time_taken, attempted_at in rows:
+        if rollup is None or (rollup.user_id, rollup.topic) != (user_id, topic):
+            if rollup is not None:
+                yield rollup
+            rollup = TopicPerformance(user_id=user_id, topic=topic)
+        rollup.add_attempt(is_correct, time_taken, attempted_at)
+
+    if rollup is not None:
+        yield rollup
+
+
+def rebuild_topic_performance(user_ids=None, batch_size=1000):
+    """
+    Recompute rollups from PracticeActivity (all users, or only user_ids)
+    Cached data of every affected user is invalidated once this commits.
+    Returns the number of rollup rows written
+    """
+    activities = PracticeActivity.objects.all()
+    rollups = TopicPerformance.objects.all()
+    if user_ids is not None:
+        activities = activities.filter(user_id__in=user_ids)
+        rollups = rollups.filter(user_id__in=user_ids)
+
+    written = 0
+    batch = []
+    with transaction.atomic():
+        affected = set(rollups.values_list('user_id', flat=True).distinct())
+        rollups.delete()
+
+        rows = ordered_rollup_rows(activities).iterator(chunk_size=batch_size)
+        for rollup in iter_rollups(rows):
+            affected.add(rollup.user_id)
+            batch.append(rollup)
+            if len(batch) >= batch_size:
+                TopicPerformance.objects.bulk_create(batch)
+                written += len(batch)
+                batch = []
+
+        if batch:
+            TopicPerformance.objects.bulk_create(batch)
+            written += len(batch)
+
+        # bulk_create and queryset deletes send no signals
+        transaction.on_commit(lambda: _bump_data_versions(affected))
+
+    return written
+
+
+def _bump_data_versions(user_ids):
+    for user_id in user_ids:
+        bump_data_version(user_id)
+
+
+def _progress_decay():
+    return getattr(settings, 'PROGRESS_DECAY', 1.0)
+
+
+def record_quiz_session(user, total_questions, correct_answers, accuracy, total_time):
+    """
+    Save a completed quiz and fold it into the user's ProgressTrend
+    Returns the created QuizSession
+    """
+    with transaction.atomic():
+        session = QuizSession.objects.create(
+            user=user,
+            total_questions=total_questions,
+            correct_answers=correct_answers,
+            accuracy=accuracy,
+            total_time=total_time
+        )
+
+        trend = ProgressTrend.objects.select_for_update().filter(user=user).first()
+        if trend is None or trend.decay != _progress_decay():
+            # No sums yet, or sums built with another decay: start from the history,
+            # which already includes this session
+            rebuild_progress_trend(user)
+        else:
+            trend.add_session(accuracy)
+            trend.save()
+        transaction.on_commit(QUIZ_SESSIONS_COMPLETED.inc)
+
+    return session
+
+
+def rebuild_progress_trend(user):
+    """
+    Recompute a user's ProgressTrend from their QuizSession history
+    Returns the saved ProgressTrend
+    """
+    trend = ProgressTrend(user=user, decay=_progress_decay())
+    accuracies = QuizSession.objects.filter(user=user).order_by('completed_at', 'id').values_list('accuracy', flat=True)
+    for accuracy in accuracies.iterator():
+        trend.add_session(accuracy)
+
+    defaults = {
+        field: getattr(trend, field)
+        for field in ('session_count', 'decay', 'n', 'sum_x', 'sum_y', 'sum_xy', 'sum_xx', 'sum_yy')
+    }
+    trend, _ = ProgressTrend.objects.update_or_create(user=user, defaults=defaults)
+    return trend
@@ -0,0 +1,19 @@
+"""
+Signal handlers that keep per-user caches in step with practice data
+"""
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .caching import bump_data_version
+from .models import PracticeActivity, QuizSession
+
+
+@receiver(post_save, sender=PracticeActivity)
+@receiver(post_save, sender=QuizSession)
+@receiver(post_delete, sender=PracticeActivity)
+@receiver(post_delete, sender=QuizSession)
+def invalidate_user_caches(sender, instance, **kwargs):
+    # Bump after commit so no request can cache pre-commit data under the new version
+    user_id = instance.user_id
+    transaction.on_commit(lambda: bump_data_version(user_id))
@@ -1,7 +1,54 @@
-from django.test import TestCase
+import asyncio
+import json
+import tempfile
+import threading
+import time
+from concurrent.futures import Future
+from datetime import timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from io import StringIO
+from types import SimpleNamespace
+from unittest import mock
+
+import numpy as np
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import SimpleTestCase, TestCase, override_settings
 from django.urls import reverse
+from django.utils.dateparse import parse_datetime
 from django.contrib.auth.models import User
 
+from .feature_engineering import (
+	extract_topic_features, get_all_topic_features, get_rollup_topic_features, get_topic_features_for_users,
+)
+from .ai_generator import (
+	QuestionStreamParser, _parse_questions_response, agenerate_questions, generate_questions, stream_questions,
+)
+from .analytics import (
+	calculate_weakness_score, consistency_scores, get_cohort_topic_statistics, get_topic_statistics,
+	get_topic_summaries, score_weakness,
+)
+from .attempt_buffer import SESSION_KEY as PENDING_ATTEMPTS_KEY
+from .caching import get_cached_dashboard_context
+from .groq_client import GroqClientManager
+from .instrumentation import request_timings, track_external
+from .metrics import (
+	AI_GENERATION_SECONDS, AI_PARSE_FAILURES, ATTEMPTS_RECORDED, QUESTION_REQUESTS, QUIZ_SESSIONS_COMPLETED,
+	VIEW_LATENCY_SECONDS, Counter, Histogram, render_metrics, reset_metrics,
+)
+from .ml_models import (
+	OnlineProgressPredictor, PerformanceClusterer, ProgressPredictor, WeakAreaClassifier, feature_matrix,
+)
+from .model_registry import ModelRegistry
+from .training import build_feature_matrix, build_training_set, train_weak_area_classifier, update_performance_clusterer
+from .models import GeneratedQuestion, PracticeActivity, ProgressTrend, QuizSession, TopicPerformance
+from .question_bank import bank_generated_questions, content_hash
+from .question_pool import InlineExecutor, QuestionPrefetcher
+from .questions import QUIZ_QUESTIONS, get_all_questions, get_question_by_id, get_questions_by_topic
+from .rollups import (
+	rebuild_progress_trend, rebuild_topic_performance, record_attempt, record_attempts, record_quiz_session,
+)
+
 
 class AuthenticationFlowTests(TestCase):
 	def setUp(self):
@@ -82,3 +129,1478 @@ class AuthenticationFlowTests(TestCase):
 		self.client.login(username=self.user.username, password=self.password)
 		response = self.client.post(reverse('logout'))
 		self.assertRedirects(response, reverse('login'))
+
+
+class FeatureEngineeringTests(TestCase):
+	def setUp(self):
+		self.user = User.objects.create_user(username='learner', password='StrongPass123!')
+		self.other = User.objects.create_user(username='other', password='StrongPass123!')
+
+	def _attempt(self, user, topic, is_correct, time_taken):
+		return PracticeActivity.objects.create(
+			user=user,
+			question_id=1,
+			topic=topic,
+			selected_option=0,
+			correct_answer=0 if is_correct else 1,
+			is_correct=is_correct,
+			time_taken=time_taken,
+		)
+
+	def test_bulk_features_match_expected_values(self):
+		for is_correct, time_taken in [(True, 40), (False, 60), (True, 20), (True, 10)]:
+			self._attempt(self.user, 'Logical Reasoning', is_correct, time_taken)
+		self._attempt(self.user, 'Data Interpretation', False, 30)
+
+		features = {f['topic']: f for f in get_all_topic_features(self.user)}
+
+		logical = features['Logical Reasoning']
+		self.assertEqual(logical['total_attempts'], 4)
+		self.assertEqual(logical['accuracy'], 75.0)
+		self.assertEqual(logical['avg_time'], 32.5)
+		self.assertEqual(logical['trend'], 0)
+		self.assertEqual(logical['time_improvement'], 35.0)
+		self.assertAlmostEqual(logical['consistency'], 0.4330127, places=6)
+
+		interpretation = features['Data Interpretation']
+		self.assertEqual(interpretation['total_attempts'], 1)
+		self.assertEqual(interpretation['consistency'], 0)
+		self.assertEqual(extract_topic_features(self.user, 'Data Interpretation'), interpretation)
+
+	def test_features_for_many_users_use_single_query(self):
+		for index in range(6):
+			self._attempt(self.user, f'Topic {index}', True, 30)
+			self._attempt(self.other, f'Topic {index}', False, 50)
+
+		with self.assertNumQueries(1):
+			features = get_topic_features_for_users([self.user, self.other])
+
+		self.assertEqual(len(features[self.user.pk]), 6)
+		self.assertTrue(all(f['accuracy'] == 0 for f in features[self.other.pk]))
+
+	def test_rollup_features_match_history_features(self):
+		outcomes = [True, False, True, True, False, False, True, True]
+		for index, is_correct in enumerate(outcomes):
+			record_attempt(
+				user=self.user, question_id=index, topic='Logical Reasoning', difficulty='Easy',
+				selected_option=0, correct_answer=0, is_correct=is_correct, time_taken=20 + index * 5,
+			)
+
+		with self.assertNumQueries(1):
+			from_rollups = get_rollup_topic_features(self.user)
+		from_history = get_all_topic_features(self.user)
+
+		for name in WeakAreaClassifier.FEATURE_SCHEMA:
+			self.assertAlmostEqual(from_rollups[0][name], from_history[0][name], msg=name)
+
+
+class TopicPerformanceRollupTests(TestCase):
+	def setUp(self):
+		self.user = User.objects.create_user(username='learner', password='StrongPass123!')
+
+	def _record(self, topic, is_correct, time_taken):
+		return record_attempt(
+			user=self.user,
+			question_id=1,
+			topic=topic,
+			difficulty='Easy',
+			selected_option=0,
+			correct_answer=0 if is_correct else 1,
+			is_correct=is_correct,
+			time_taken=time_taken,
+		)
+
+	def test_record_attempt_updates_rollup(self):
+		outcomes = [(True, 10), (False, 20), (True, 30), (True, 40), (False, 50), (True, 60)]
+		for is_correct, time_taken in outcomes:
+			self._record('Logical Reasoning', is_correct, time_taken)
+
+		rollup = TopicPerformance.objects.get(user=self.user, topic='Logical Reasoning')
+		self.assertEqual(rollup.attempt_count, 6)
+		self.assertEqual(rollup.correct_count, 4)
+		self.assertEqual(rollup.time_sum, 210)
+		self.assertEqual(rollup.time_sq_sum, sum(t * t for _, t in outcomes))
+		self.assertEqual(rollup.recent_results, '01101')
+		self.assertLessEqual(rollup.first_attempt_at, rollup.last_attempt_at)
+
+	def test_first_recorded_attempt_seeds_rollup_from_history(self):
+		PracticeActivity.objects.create(
+			user=self.user, question_id=1, topic='Logical Reasoning',
+			selected_option=1, correct_answer=0, is_correct=False, time_taken=15,
+		)
+		self._record('Logical Reasoning', True, 25)
+
+		rollup = TopicPerformance.objects.get(user=self.user, topic='Logical Reasoning')
+		self.assertEqual(rollup.attempt_count, 2)
+		self.assertEqual(rollup.correct_count, 1)
+		self.assertEqual(rollup.recent_results, '01')
+
+	def test_first_recorded_attempt_seeds_every_topic(self):
+		for topic in ('A', 'B', 'C'):
+			for index in range(3):
+				PracticeActivity.objects.create(
+					user=self.user, question_id=1, topic=topic,
+					selected_option=0, correct_answer=0, is_correct=index > 0, time_taken=15,
+				)
+		before = sorted((s['topic'], s['total']) for s in get_topic_summaries(self.user))
+		self.assertEqual(before, [('A', 3), ('B', 3), ('C', 3)])
+
+		self._record('A', True, 25)
+
+		after = sorted((s['topic'], s['total']) for s in get_topic_summaries(self.user))
+		self.assertEqual(after, [('A', 4), ('B', 3), ('C', 3)])
+		self.assertEqual(TopicPerformance.objects.filter(user=self.user).count(), 3)
+
+		# Later new topics are seeded one at a time
+		self._record('D', False, 10)
+		self.assertEqual(TopicPerformance.objects.get(user=self.user, topic='D').attempt_count, 1)
+
+	def test_backfill_command_matches_incremental_rollups(self):
+		for index in range(8):
+			self._record(f'Topic {index % 3}', index % 2 == 0, 10 + index)
+		expected = {
+			(r.topic, r.attempt_count, r.correct_count, r.time_sum, r.time_sq_sum, r.recent_results)
+			for r in TopicPerformance.objects.filter(user=self.user)
+		}
+		statistics_before = sorted(get_topic_statistics(self.user), key=lambda t: t['topic'])
+
+		TopicPerformance.objects.all().delete()
+		self.assertEqual(sorted(get_topic_statistics(self.user), key=lambda t: t['topic']), statistics_before)
+
+		call_command('backfill_topic_performance', stdout=StringIO())
+
+		rebuilt = {
+			(r.topic, r.attempt_count, r.correct_count, r.time_sum, r.time_sq_sum, r.recent_results)
+			for r in TopicPerformance.objects.filter(user=self.user)
+		}
+		self.assertEqual(rebuilt, expected)
+		self.assertEqual(sorted(get_topic_statistics(self.user), key=lambda t: t['topic']), statistics_before)
+
+	def test_quiz_answer_is_recorded_in_rollup(self):
+		self.client.login(username='learner', password='StrongPass123!')
+		question = self.client.get(reverse('quiz')).context['question']
+
+		self.client.post(reverse('quiz'), {
+			'selected_option': question['correct_answer'],
+			'time_taken': 12,
+			'question_id': question['id'],
+		})
+
+		rollup = TopicPerformance.objects.get(user=self.user, topic=question['topic'])
+		self.assertEqual((rollup.attempt_count, rollup.correct_count, rollup.time_sum), (1, 1, 12))
+
+
+class TopicStatisticsQueryTests(TestCase):
+	def setUp(self):
+		self.user = User.objects.create_user(username='learner', password='StrongPass123!')
+
+	def _seed_history(self, topic_count):
+		PracticeActivity.objects.bulk_create([
+			PracticeActivity(
+				user=self.user,
+				question_id=index,
+				topic=f'Topic {index % topic_count}',
+				selected_option=0,
+				correct_answer=0,
+				is_correct=index % 3 != 0,
+				time_taken=20 + index,
+			)
+			for index in range(topic_count * 7)
+		])
+
+	def test_history_path_query_count_is_constant(self):
+		self._seed_history(2)
+		with self.assertNumQueries(3):
+			self.assertEqual(len(get_topic_statistics(self.user)), 2)
+
+		PracticeActivity.objects.all().delete()
+		self._seed_history(12)
+		with self.assertNumQueries(3):
+			self.assertEqual(len(get_topic_statistics(self.user)), 12)
+
+	def test_history_path_uses_last_five_attempts(self):
+		for index, is_correct in enumerate([False, False, True, True, True, True, True]):
+			PracticeActivity.objects.create(
+				user=self.user, question_id=index, topic='Logical Reasoning',
+				selected_option=0, correct_answer=0, is_correct=is_correct, time_taken=30,
+			)
+
+		summary = get_topic_summaries(self.user)[0]
+		self.assertEqual(summary['recent'], [1, 1, 1, 1, 1])
+		self.assertEqual(get_topic_statistics(self.user)[0]['consistency'], 100)
+
+	def test_rollup_path_uses_single_query(self):
+		self._seed_history(12)
+		rebuild_topic_performance()
+		with self.assertNumQueries(1):
+			self.assertEqual(len(get_topic_statistics(self.user)), 12)
+
+
+class WeaknessScoringTests(TestCase):
+	def test_vectorized_scores_match_scalar_and_bands(self):
+		accuracy = [95, 60, 20, 100, 0]
+		avg_time = [20, 50, 110, 0, 240]
+		consistency = [100, 70, 40, 50, 0]
+		scores, statuses, priorities = score_weakness(accuracy, avg_time, consistency)
+
+		self.assertEqual(
+			scores.tolist(),
+			[calculate_weakness_score(*values) for values in zip(accuracy, avg_time, consistency)],
+		)
+		self.assertEqual(statuses.tolist(), ['Strong', 'Moderate', 'Weak', 'Strong', 'Weak'])
+		self.assertEqual(priorities.tolist(), ['Low', 'Medium', 'High', 'Low', 'High'])
+
+	def test_ties_round_like_python(self):
+		# Raw score 0.065 rounds up with round() but down with np.round
+		self.assertEqual(calculate_weakness_score(95, 16, 100), 0.07)
+
+	def test_rounding_keeps_scores_in_their_band(self):
+		scores, statuses, priorities = score_weakness([70], [58], [100])
+		self.assertEqual(scores.tolist(), [0.29])
+		self.assertEqual((statuses.tolist(), priorities.tolist()), (['Strong'], ['Low']))
+
+	def test_consistency_scores_pad_uneven_histories(self):
+		scores = consistency_scores([[1, 0, 1, 0, 1], [1], [], [1, 1], [0, 1, 1]])
+
+		self.assertAlmostEqual(scores[0], 100 - np.std([1, 0, 1, 0, 1], ddof=1) * 100)
+		self.assertEqual(scores[1:4].tolist(), [50.0, 50.0, 100.0])
+		self.assertAlmostEqual(scores[4], 100 - np.std([0, 1, 1], ddof=1) * 100)
+		self.assertEqual(consistency_scores([]).tolist(), [])
+
+	def test_cohort_statistics_match_per_user(self):
+		users = [User.objects.create_user(username=f'learner{index}', password='x') for index in range(3)]
+		for offset, user in enumerate(users):
+			for index in range(12):
+				record_attempt(
+					user=user, question_id=index, topic=f'Topic {index % (offset + 2)}', difficulty='Easy',
+					selected_option=0, correct_answer=0, is_correct=(index + offset) % 3 != 0,
+					time_taken=15 + index * (offset + 1),
+				)
+
+		with self.assertNumQueries(1):
+			cohort = get_cohort_topic_statistics()
+
+		self.assertEqual(set(cohort), {user.pk for user in users})
+		for user in users:
+			self.assertEqual(cohort[user.pk], get_topic_statistics(user))
+		self.assertEqual(list(get_cohort_topic_statistics([users[0].pk])), [users[0].pk])
+
+
+class CohortExportTests(TestCase):
+	def test_export_matches_topic_statistics(self):
+		users = [User.objects.create_user(username=f'learner{index}', password='x') for index in range(3)]
+		for offset, user in enumerate(users):
+			for index in range(9):
+				record_attempt(
+					user=user, question_id=index, topic=f'Topic {index % (offset + 1)}', difficulty='Easy',
+					selected_option=0, correct_answer=0, is_correct=(index + offset) % 2 == 0,
+					time_taken=10 + index,
+				)
+
+		with tempfile.TemporaryDirectory() as directory:
+			path = f'{directory}/cohort.npz'
+			out = StringIO()
+			# Tiny chunks and batches so several of each are streamed
+			call_command('export_cohort_statistics', path, chunk_size=4, batch_size=2, stdout=out)
+			with np.load(path) as exported:
+				columns = {name: exported[name].tolist() for name in exported.files}
+
+		self.assertIn('Wrote 6 topic statistics rows', out.getvalue())
+		expected = sorted(
+			(user.pk, user.username, stats['topic'], stats['total_attempts'], stats['accuracy'],
+			 stats['consistency'], stats['weakness_score'], stats['status'])
+			for user in users for stats in get_topic_statistics(user)
+		)
+		exported_rows = sorted(zip(
+			columns['user_id'], columns['username'], columns['topic'], columns['total_attempts'],
+			columns['accuracy'], columns['consistency'], columns['weakness_score'], columns['status'],
+		))
+		self.assertEqual(exported_rows, expected)
+
+
+class DashboardCacheTests(TestCase):
+	def setUp(self):
+		cache.clear()
+		self.user = User.objects.create_user(username='learner', password='StrongPass123!')
+		self.client.login(username='learner', password='StrongPass123!')
+
+	def _record(self, is_correct):
+		with self.captureOnCommitCallbacks(execute=True):
+			record_attempt(
+				user=self.user, question_id=1, topic='Logical Reasoning', difficulty='Easy',
+				selected_option=0, correct_answer=0 if is_correct else 1,
+				is_correct=is_correct, time_taken=30,
+			)
+
+	def test_dashboard_context_is_served_from_cache(self):
+		self._record(True)
+		first = self.client.get(reverse('dashboard'))
+		self.assertEqual(first.context['total_attempted'], 1)
+
+		with self.assertNumQueries(0):
+			get_cached_dashboard_context(self.user, lambda user: self.fail('context was rebuilt'))
+
+	def test_new_attempt_invalidates_cached_dashboard(self):
+		self._record(True)
+		self.client.get(reverse('dashboard'))
+
+		self._record(False)
+		response = self.client.get(reverse('dashboard'))
+		self.assertEqual(response.context['total_attempted'], 2)
+		self.assertEqual(response.context['accuracy'], 50.0)
+
+	def test_rollup_rebuild_invalidates_cached_dashboard(self):
+		self._record(True)
+		self.client.get(reverse('dashboard'))
+
+		with self.captureOnCommitCallbacks(execute=True):
+			rebuild_topic_performance()
+
+		self.assertEqual(get_cached_dashboard_context(self.user, lambda user: 'rebuilt'), 'rebuilt')
+
+	def test_new_quiz_session_invalidates_cached_dashboard(self):
+		self._record(True)
+		self.client.get(reverse('dashboard'))
+
+		with self.captureOnCommitCallbacks(execute=True):
+			QuizSession.objects.create(
+				user=self.user, total_questions=10, correct_answers=7, accuracy=70.0, total_time=300,
+			)
+		response = self.client.get(reverse('dashboard'))
+		self.assertEqual(json.loads(response.context['session_accuracies']), [70.0])
+
+
+class FakeGroqClient:
+	"""Stand-in for groq.Groq returning canned chat completions"""
+
+	def __init__(self, topic_questions=5):
+		self.calls = []
+		self.topic_questions = topic_questions
+		self.chat = SimpleNamespace(completions=SimpleNamespace(create=self._create))
+
+	def _create(self, **kwargs):
+		self.calls.append(kwargs)
+		payload = [
+			{
+				'question': f'Generated question {len(self.calls)}.{index}',
+				'options': ['A', 'B', 'C', 'D'],
+				'correct_answer': index % 4,
+				'explanation': 'Because.',
+			}
+			for index in range(self.topic_questions)
+		]
+		message = SimpleNamespace(content=json.dumps(payload))
+		return SimpleNamespace(choices=[SimpleNamespace(message=message)])
+
+
+class QuestionPrefetcherTests(TestCase):
+	def setUp(self):
+		self.fake_client = FakeGroqClient()
+		patcher = mock.patch('users.ai_generator._get_groq_client', return_value=self.fake_client)
+		patcher.start()
+		self.addCleanup(patcher.stop)
+		self.prefetcher = QuestionPrefetcher(depth=1, executor=InlineExecutor())
+
+	def test_take_serves_prefetched_set_without_new_call(self):
+		self.prefetcher.warm('Probability', 'Easy', 5)
+		self.assertEqual(len(self.fake_client.calls), 1)
+		self.assertEqual(self.prefetcher.ready_count('Probability', 'Easy', 5), 1)
+
+		questions = self.prefetcher.take('Probability', 'Easy', 5)
+
+		self.assertEqual(len(questions), 5)
+		self.assertEqual(questions[0]['topic'], 'Probability')
+		# The refill ran after the ready set was handed out
+		self.assertEqual(len(self.fake_client.calls), 2)
+		self.assertEqual(self.prefetcher.ready_count('Probability', 'Easy', 5), 1)
+
+	def test_take_generates_synchronously_when_pool_is_empty(self):
+		prefetcher = QuestionPrefetcher(depth=0, executor=InlineExecutor())
+		questions = prefetcher.take('Probability', 'Hard', 3)
+		self.assertEqual(len(questions), 3)
+		self.assertEqual(questions[0]['difficulty'], 'Hard')
+		self.assertEqual(len(self.fake_client.calls), 1)
+
+	def test_background_failures_do_not_fill_pool(self):
+		failing = QuestionPrefetcher(
+			generator=mock.Mock(side_effect=RuntimeError('boom')),
+			depth=2,
+			executor=InlineExecutor(),
+		)
+		failing.warm('Probability')
+		self.assertEqual(failing.ready_count('Probability'), 0)
+		with self.assertRaises(RuntimeError):
+			failing.take('Probability')
+
+	def test_concurrent_warm_never_exceeds_depth(self):
+		submitted = []
+		prefetcher = None
+
+		class PendingExecutor:
+			"""Runs nothing; another warm() arrives while the first is still submitting"""
+
+			def submit(self, fn, *args):
+				submitted.append(args)
+				if len(submitted) == 1:
+					prefetcher.warm('Probability')
+				return Future()
+
+		prefetcher = QuestionPrefetcher(depth=2, executor=PendingExecutor())
+		prefetcher.warm('Probability')
+		self.assertEqual(len(submitted), 2)
+
+	def test_adaptive_quiz_pops_ready_set(self):
+		User.objects.create_user(username='learner', password='StrongPass123!')
+		self.client.login(username='learner', password='StrongPass123!')
+		self.prefetcher.warm('Probability', 'Easy', 5)
+
+		with mock.patch('users.views.get_prefetcher', return_value=self.prefetcher):
+			response = self.client.get(reverse('adaptive_quiz'), {'topic': 'Probability'})
+
+		self.assertEqual(response.status_code, 200)
+		self.assertEqual(response.context['question']['topic'], 'Probability')
+		self.assertEqual(response.context['total_questions'], 5)
+
+
+@override_settings(QUESTION_BANK_REFRESH_RATE=0)
+class QuestionBankTests(TestCase):
+	def setUp(self):
+		self.fake_client = FakeGroqClient()
+		patcher = mock.patch('users.ai_generator._get_groq_client', return_value=self.fake_client)
+		patcher.start()
+		self.addCleanup(patcher.stop)
+
+	def test_near_identical_questions_share_a_hash(self):
+		first = content_hash('Probability', 'Easy', 'What is P(heads)?', ['1/2', '1/3', '1/4', '1'])
+		second = content_hash('probability', 'easy', '  what is p heads ', ['1', '1/4', '1/3', '1/2'])
+		self.assertEqual(first, second)
+		self.assertNotEqual(first, content_hash('Probability', 'Easy', 'What is P(tails)?', ['1/2', '1/3', '1/4', '1']))
+		self.assertNotEqual(first, content_hash('Probability', 'Hard', 'What is P(heads)?', ['1/2', '1/3', '1/4', '1']))
+
+	def test_generated_questions_are_banked_once(self):
+		questions = generate_questions('Probability', 'Easy', 5, allow_fallback=False)
+		self.assertTrue(all('bank_id' in q for q in questions))
+		self.assertEqual(GeneratedQuestion.objects.count(), 5)
+
+		bank_generated_questions(questions, 'llama-3.3-70b-versatile')
+		self.assertEqual(GeneratedQuestion.objects.count(), 5)
+
+	@override_settings(QUESTION_BANK_MIN_SIZE=10)
+	def test_generate_questions_serves_from_bank_once_stocked(self):
+		generate_questions('Probability', 'Easy', 5, allow_fallback=False)
+		generate_questions('Probability', 'Easy', 5, allow_fallback=False)
+		self.assertEqual(len(self.fake_client.calls), 2)
+
+		with self.assertNumQueries(2):
+			questions = generate_questions('Probability', 'Easy', 5, allow_fallback=False)
+
+		self.assertEqual(len(self.fake_client.calls), 2)
+		self.assertEqual(len({q['bank_id'] for q in questions}), 5)
+		self.assertTrue(questions[0]['source'].startswith('Question Bank'))
+
+	@override_settings(QUESTION_BANK_MIN_SIZE=1)
+	def test_bank_is_keyed_by_topic_and_difficulty(self):
+		generate_questions('Probability', 'Easy', 5, allow_fallback=False)
+		generate_questions('Probability', 'Hard', 5, allow_fallback=False)
+		self.assertEqual(len(self.fake_client.calls), 2)
+
+		question = {'topic': 'Logic', 'question': 'Same text?', 'options': ['A', 'B', 'C', 'D'], 'correct_answer': 0}
+		bank_generated_questions([{**question, 'difficulty': 'Easy'}, {**question, 'difficulty': 'Hard'}])
+		self.assertEqual(GeneratedQuestion.objects.filter(topic='Logic').count(), 2)
+
+	@override_settings(QUESTION_BANK_MIN_SIZE=5, QUESTION_BANK_REFRESH_RATE=1)
+	def test_refresh_rate_keeps_topping_up_a_stocked_bank(self):
+		generate_questions('Probability', 'Easy', 5, allow_fallback=False)
+		generate_questions('Probability', 'Easy', 5, allow_fallback=False)
+		self.assertEqual(len(self.fake_client.calls), 2)
+
+
+class HedgedGenerationTests(TestCase):
+	def _client(self, responses):
+		"""Client whose create() answers per model: (delay_seconds, content)"""
+		calls = []
+
+		def create(**kwargs):
+			calls.append(kwargs)
+			delay, content = responses[kwargs['model']]
+			time.sleep(delay)
+			message = SimpleNamespace(content=content)
+			return SimpleNamespace(choices=[SimpleNamespace(message=message)])
+
+		client = SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=create)))
+		return client, calls
+
+	def _payload(self, label):
+		return json.dumps([
+			{'question': f'{label} question', 'options': ['A', 'B', 'C', 'D'], 'correct_answer': 1, 'explanation': 'x'},
+		])
+
+	def test_fastest_valid_model_wins(self):
+		client, calls = self._client({
+			'llama-3.3-70b-versatile': (0.5, self._payload('slow')),
+			'llama-3.1-8b-instant': (0.0, self._payload('fast')),
+		})
+		with mock.patch('users.ai_generator._get_groq_client', return_value=client):
+			questions = generate_questions('Probability', 'Easy', 1, allow_fallback=False, use_bank=False, hedged=True)
+
+		self.assertEqual(questions[0]['question'], 'fast question')
+		self.assertEqual(questions[0]['source'], 'Groq AI (llama-3.1-8b-instant)')
+		self.assertEqual({call['model'] for call in calls}, {'llama-3.3-70b-versatile', 'llama-3.1-8b-instant'})
+
+	def test_invalid_fast_answer_does_not_win(self):
+		client, calls = self._client({
+			'llama-3.3-70b-versatile': (0.1, self._payload('valid')),
+			'llama-3.1-8b-instant': (0.0, 'not json at all'),
+		})
+		with mock.patch('users.ai_generator._get_groq_client', return_value=client):
+			questions = generate_questions('Probability', 'Easy', 1, allow_fallback=False, use_bank=False, hedged=True)
+
+		self.assertEqual(questions[0]['question'], 'valid question')
+
+	@override_settings(GROQ_MODEL_TIMEOUTS={'llama-3.3-70b-versatile': 0.2, 'llama-3.1-8b-instant': 0.2})
+	def test_models_over_budget_fall_back(self):
+		client, calls = self._client({
+			'llama-3.3-70b-versatile': (0.6, self._payload('late')),
+			'llama-3.1-8b-instant': (0.6, self._payload('late')),
+		})
+		with mock.patch('users.ai_generator._get_groq_client', return_value=client):
+			questions = generate_questions('Probability', 'Easy', 1, use_bank=False, hedged=True)
+
+		self.assertEqual(questions[0]['source'], 'Static Fallback')
+		self.assertTrue(all(call['timeout'] == 0.2 for call in calls))
+
+
+class AsyncGenerationTests(TestCase):
+	def _client(self, responses):
+		"""AsyncGroq stand-in whose create() answers per model: (delay_seconds, content)"""
+		calls = []
+		cancelled = []
+
+		async def create(**kwargs):
+			calls.append(kwargs)
+			delay, content = responses[kwargs['model']]
+			try:
+				await asyncio.sleep(delay)
+			except asyncio.CancelledError:
+				cancelled.append(kwargs['model'])
+				raise
+			message = SimpleNamespace(content=content)
+			return SimpleNamespace(choices=[SimpleNamespace(message=message)])
+
+		client = SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=create)))
+		return client, calls, cancelled
+
+	def _payload(self, label, count=1):
+		return json.dumps([
+			{'question': f'{label} question {index}', 'options': ['A', 'B', 'C', 'D'], 'correct_answer': 1, 'explanation': 'x'}
+			for index in range(count)
+		])
+
+	async def test_generations_run_concurrently(self):
+		client, calls, _ = self._client({'llama-3.3-70b-versatile': (0.3, self._payload('async', 3))})
+		with mock.patch('users.ai_generator._get_async_groq_client', return_value=client):
+			started = time.monotonic()
+			batches = await asyncio.gather(*(
+				agenerate_questions('Probability', 'Easy', 3, allow_fallback=False, use_bank=False)
+				for _ in range(5)
+			))
+			elapsed = time.monotonic() - started
+
+		self.assertEqual([len(batch) for batch in batches], [3] * 5)
+		self.assertEqual(batches[0][0]['source'], 'Groq AI (llama-3.3-70b-versatile)')
+		self.assertEqual(len(calls), 5)
+		# Five 0.3s calls overlapped rather than queued
+		self.assertLess(elapsed, 1.0)
+
+	async def test_hedged_losers_are_cancelled(self):
+		client, calls, cancelled = self._client({
+			'llama-3.3-70b-versatile': (5, self._payload('slow')),
+			'llama-3.1-8b-instant': (0.0, self._payload('fast')),
+		})
+		with mock.patch('users.ai_generator._get_async_groq_client', return_value=client):
+			questions = await agenerate_questions('Probability', 'Easy', 1, allow_fallback=False, use_bank=False, hedged=True)
+			# Cancellation lands on the client manager's loop
+			await asyncio.sleep(0.1)
+
+		self.assertEqual(questions[0]['question'], 'fast question 0')
+		self.assertEqual(cancelled, ['llama-3.3-70b-versatile'])
+
+	async def test_no_client_falls_back_to_static_questions(self):
+		with mock.patch('users.ai_generator._get_async_groq_client', return_value=None):
+			questions = await agenerate_questions('Probability', 'Easy', 2, use_bank=False)
+			with self.assertRaises(RuntimeError):
+				await agenerate_questions('Probability', 'Easy', 2, allow_fallback=False, use_bank=False)
+
+		self.assertEqual([q['source'] for q in questions], ['Static Fallback'] * 2)
+
+	async def test_atake_waits_for_inflight_set(self):
+		release = threading.Event()
+
+		def generator(topic, difficulty, num_questions, allow_fallback=True):
+			release.wait(5)
+			return [{'id': f'q{index}', 'topic': topic} for index in range(num_questions)]
+
+		prefetcher = QuestionPrefetcher(generator=generator, depth=1, max_workers=1)
+		self.addCleanup(prefetcher._get_executor().shutdown)
+		prefetcher.warm('Probability', 'Easy', 2)
+
+		take = asyncio.ensure_future(prefetcher.atake('Probability', 'Easy', 2, timeout=5))
+		await asyncio.sleep(0.05)
+		# Still waiting, and without blocking the event loop
+		self.assertFalse(take.done())
+		release.set()
+		questions = await take
+
+		self.assertEqual([q['id'] for q in questions], ['q0', 'q1'])
+
+
+class StandInGroqServer:
+	"""
+	Local HTTP/1.1 server answering Groq chat completion calls
+	Counts TCP connections so tests can check keep-alive reuse.
+	"""
+
+	def __init__(self, content='[]'):
+		self.connections = 0
+		self.requests = 0
+		server = self
+
+		class Handler(BaseHTTPRequestHandler):
+			protocol_version = 'HTTP/1.1'
+
+			def setup(self):
+				super().setup()
+				server.connections += 1
+
+			def do_POST(self):
+				self.rfile.read(int(self.headers.get('Content-Length', 0)))
+				server.requests += 1
+				body = json.dumps({
+					'id': f'chatcmpl-{server.requests}',
+					'object': 'chat.completion',
+					'created': 0,
+					'model': 'stand-in',
+					'choices': [{
+						'index': 0,
+						'finish_reason': 'stop',
+						'message': {'role': 'assistant', 'content': server.content},
+					}],
+				}).encode()
+				self.send_response(200)
+				self.send_header('Content-Type', 'application/json')
+				self.send_header('Content-Length', str(len(body)))
+				self.end_headers()
+				self.wfile.write(body)
+
+			def log_message(self, *args):
+				pass
+
+		self.content = content
+		self.httpd = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+		self.url = f'http://127.0.0.1:{self.httpd.server_port}'
+		self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+
+	def __enter__(self):
+		self.thread.start()
+		return self
+
+	def __exit__(self, *exc_info):
+		self.httpd.shutdown()
+		self.httpd.server_close()
+
+
+class GroqClientManagerTests(TestCase):
+	def setUp(self):
+		self.manager = GroqClientManager()
+		self.addCleanup(self.manager.reset)
+		patcher = mock.patch('users.ai_generator.get_client_manager', return_value=self.manager)
+		patcher.start()
+		self.addCleanup(patcher.stop)
+		self.payload = json.dumps([
+			{'question': 'Q', 'options': ['A', 'B', 'C', 'D'], 'correct_answer': 0, 'explanation': 'x'},
+		])
+
+	def test_generations_reuse_one_connection(self):
+		with StandInGroqServer(self.payload) as server:
+			with override_settings(GROQ_API_KEY='test-key', GROQ_BASE_URL=server.url):
+				for _ in range(3):
+					questions = generate_questions('Probability', 'Easy', 1, allow_fallback=False, use_bank=False)
+					self.assertEqual(questions[0]['question'], 'Q')
+				stats = self.manager.stats()
+
+		self.assertEqual(server.requests, 3)
+		self.assertEqual(server.connections, 1)
+		self.assertEqual(stats['clients_built'], 1)
+		self.assertEqual(stats['requests'], 3)
+		self.assertEqual(stats['open_connections'], 1)
+
+	async def test_async_generations_share_one_client(self):
+		with StandInGroqServer(self.payload) as server:
+			with override_settings(GROQ_API_KEY='test-key', GROQ_BASE_URL=server.url):
+				batches = await asyncio.gather(*(
+					agenerate_questions('Probability', 'Easy', 1, allow_fallback=False, use_bank=False)
+					for _ in range(3)
+				))
+				stats = self.manager.stats()
+
+		self.assertEqual([batch[0]['question'] for batch in batches], ['Q'] * 3)
+		self.assertEqual(server.requests, 3)
+		self.assertEqual(stats['async_clients_built'], 1)
+		self.assertEqual(stats['requests'], 3)
+
+	def test_key_rotation_rebuilds_client(self):
+		with override_settings(GROQ_API_KEY='first-key'):
+			first = self.manager.get_client()
+			self.assertIs(self.manager.get_client(), first)
+		with override_settings(GROQ_API_KEY='second-key'):
+			second = self.manager.get_client()
+
+		self.assertIsNot(first, second)
+		self.assertEqual(second.api_key, 'second-key')
+		self.assertEqual(self.manager.stats()['clients_built'], 2)
+
+	def test_missing_key_gives_no_client(self):
+		with override_settings(GROQ_API_KEY=''):
+			self.assertIsNone(self.manager.get_client())
+
+
+class StreamingGenerationTests(TestCase):
+	def _stream_client(self, text, chunk_size=7):
+		"""Client whose streamed completion delivers text in small chunks"""
+		consumed = []
+
+		def create(**kwargs):
+			self.assertTrue(kwargs['stream'])
+			for start in range(0, len(text), chunk_size):
+				consumed.append(start)
+				delta = SimpleNamespace(content=text[start:start + chunk_size])
+				yield SimpleNamespace(choices=[SimpleNamespace(delta=delta)])
+
+		client = SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=create)))
+		return client, consumed
+
+	def _question(self, label, correct_answer=0):
+		return {'question': label, 'options': ['A', 'B', 'C', 'D'], 'correct_answer': correct_answer, 'explanation': 'x'}
+
+	def test_parser_emits_objects_as_they_close(self):
+		parser = QuestionStreamParser()
+		self.assertEqual(parser.feed('```json\n[{"question": "a } in {text}",'), [])
+		self.assertEqual(parser.feed(' “n”: 1,}, {"question"'), [{'question': 'a } in {text}', 'n': 1}])
+		self.assertEqual(parser.feed(': "b"}]```'), [{'question': 'b'}])
+		self.assertTrue(parser.finished)
+
+	def test_first_question_is_yielded_before_stream_ends(self):
+		text = json.dumps([self._question(f'Q{index}') for index in range(5)])
+		client, consumed = self._stream_client(text)
+		with mock.patch('users.ai_generator._get_groq_client', return_value=client):
+			questions = stream_questions('Probability', 'Easy', 5, allow_fallback=False, use_bank=False)
+			first = next(questions)
+			self.assertEqual(first['question'], 'Q0')
+			self.assertLess(len(consumed) * 7, len(text) / 2)
+			rest = list(questions)
+
+		self.assertEqual([q['question'] for q in rest], ['Q1', 'Q2', 'Q3', 'Q4'])
+
+	def test_invalid_objects_are_skipped_on_the_fly(self):
+		text = json.dumps([self._question('bad', correct_answer=9), self._question('good')])
+		client, _ = self._stream_client(text)
+		with mock.patch('users.ai_generator._get_groq_client', return_value=client):
+			questions = list(stream_questions('Probability', 'Easy', 5, allow_fallback=False))
+
+		self.assertEqual([q['question'] for q in questions], ['good'])
+		self.assertEqual(questions[0]['id'], 'ai_Probability_2')
+		self.assertEqual(GeneratedQuestion.objects.get(pk=questions[0]['bank_id']).question, 'good')
+
+	def test_unusable_stream_falls_back_to_static(self):
+		client, _ = self._stream_client('Sorry, I cannot help with that.')
+		with mock.patch('users.ai_generator._get_groq_client', return_value=client):
+			questions = list(stream_questions('Probability', 'Easy', 3, use_bank=False))
+
+		self.assertEqual(len(questions), 3)
+		self.assertEqual(questions[0]['source'], 'Static Fallback')
+
+
+class QuestionIndexTests(SimpleTestCase):
+	def test_lookups_match_the_source_list(self):
+		for source in QUIZ_QUESTIONS:
+			question = get_question_by_id(source['id'])
+			self.assertEqual(question['question'], source['question'])
+			self.assertEqual(list(question['options']), source['options'])
+		self.assertIsNone(get_question_by_id(-1))
+
+		topic = QUIZ_QUESTIONS[0]['topic']
+		expected = [q['id'] for q in QUIZ_QUESTIONS if q['topic'] == topic]
+		self.assertEqual([q['id'] for q in get_questions_by_topic(topic.upper())], expected)
+		self.assertEqual(
+			[q['id'] for q in get_questions_by_topic(topic, 'easy')],
+			[q['id'] for q in QUIZ_QUESTIONS if q['topic'] == topic and q['difficulty'] == 'Easy'],
+		)
+		self.assertEqual(get_questions_by_topic('No Such Topic'), ())
+
+	def test_questions_are_read_only(self):
+		question = get_all_questions()[0]
+		with self.assertRaises(TypeError):
+			question['correct_answer'] = 3
+		with self.assertRaises(TypeError):
+			question['options'][0] = 'changed'
+		self.assertIs(get_question_by_id(question['id']), question)
+
+	def test_static_fallback_uses_topic_index(self):
+		topic = QUIZ_QUESTIONS[-1]['topic']
+		with mock.patch('users.ai_generator._get_groq_client', return_value=None):
+			questions = generate_questions(topic.lower(), num_questions=50, use_bank=False)
+		self.assertEqual({q['topic'] for q in questions}, {topic})
+		self.assertIsInstance(questions[0]['options'], list)
+
+
+class QuizSessionStateTests(TestCase):
+	def setUp(self):
+		self.user = User.objects.create_user(username='learner', password='StrongPass123!')
+		self.client.login(username='learner', password='StrongPass123!')
+
+	def test_static_quiz_keeps_only_a_seed_in_session(self):
+		first = self.client.get(reverse('quiz'), {'new': 1}).context['question']
+		session = self.client.session
+		self.assertNotIn('session_questions', session)
+		self.assertIn('quiz_seed', session)
+
+		seen = [first['id']]
+		for _ in range(len(get_all_questions())):
+			response = self.client.post(reverse('quiz'), {
+				'selected_option': 0, 'time_taken': 3, 'question_id': seen[-1],
+			})
+			response = self.client.get(reverse('quiz'))
+			if response.status_code == 302:
+				break
+			seen.append(response.context['question']['id'])
+
+		self.assertEqual(sorted(seen), sorted(q['id'] for q in get_all_questions()))
+		summary = self.client.get(reverse('quiz_summary'))
+		self.assertEqual(summary.context['total_time'], 3 * len(seen))
+		self.assertEqual(QuizSession.objects.get(user=self.user).total_questions, len(seen))
+
+	def test_adaptive_quiz_stores_bank_references(self):
+		questions = bank_generated_questions([
+			{
+				'id': f'ai_Probability_{index}', 'topic': 'Probability', 'difficulty': 'Easy',
+				'question': f'Banked question {index}', 'options': ['A', 'B', 'C', 'D'],
+				'correct_answer': 2, 'explanation': 'x', 'source': 'Groq AI (test)',
+			}
+			for index in range(3)
+		], 'test')
+		prefetcher = mock.Mock()
+		prefetcher.astream = mock.AsyncMock(return_value=(questions, None))
+
+		with mock.patch('users.views.get_prefetcher', return_value=prefetcher):
+			response = self.client.get(reverse('adaptive_quiz'), {'topic': 'Probability'})
+
+		self.assertEqual(self.client.session['adaptive_question_refs'], [q['bank_id'] for q in questions])
+		self.assertEqual(response.context['question']['question'], 'Banked question 0')
+
+		self.client.post(reverse('adaptive_quiz'), {'selected_option': 2, 'time_taken': 4})
+		response = self.client.get(reverse('adaptive_quiz'))
+		self.assertEqual(response.context['question']['question'], 'Banked question 1')
+		self.assertEqual(response.context['total_questions'], 3)
+		self.assertEqual(self.client.session['adaptive_correct'], 1)
+
+	def _streamer(self, label, release=None):
+		"""Streamer yielding labelled questions; waits on release before the second one"""
+		def streamer(topic, difficulty, num_questions, allow_fallback=True):
+			for index in range(num_questions):
+				if index == 1 and release is not None:
+					release.wait(5)
+				yield {
+					'id': f'ai_{topic}_{index}', 'topic': topic, 'difficulty': difficulty,
+					'question': f'{label} question {index}', 'options': ['A', 'B', 'C', 'D'],
+					'correct_answer': 0, 'explanation': 'x', 'source': 'Groq AI (test)',
+				}
+		return streamer
+
+	def _stream_prefetcher(self, streamer):
+		prefetcher = QuestionPrefetcher(depth=0, streamer=streamer, stream_workers=1)
+		self.addCleanup(prefetcher._get_stream_executor().shutdown)
+		return prefetcher
+
+	def test_adaptive_quiz_starts_before_the_stream_ends(self):
+		release = threading.Event()
+		prefetcher = self._stream_prefetcher(self._streamer('Streamed', release))
+		self.addCleanup(release.set)
+
+		with mock.patch('users.views.get_prefetcher', return_value=prefetcher):
+			response = self.client.get(reverse('adaptive_quiz'), {'topic': 'Probability'})
+			self.assertEqual(response.context['question']['question'], 'Streamed question 0')
+			self.assertEqual(response.context['total_questions'], 5)
+			self.assertEqual(len(self.client.session['adaptive_question_refs']), 1)
+			self.assertIn('groq', response['Server-Timing'])
+
+			self.client.post(reverse('adaptive_quiz'), {'selected_option': 0, 'time_taken': 4})
+			release.set()
+			response = self.client.get(reverse('adaptive_quiz'))
+			self.assertEqual(response.context['question']['question'], 'Streamed question 1')
+
+			for _ in range(4):
+				self.client.post(reverse('adaptive_quiz'), {'selected_option': 0, 'time_taken': 4})
+			response = self.client.get(reverse('adaptive_quiz'))
+
+		self.assertRedirects(response, reverse('adaptive_quiz_summary'), fetch_redirect_response=False)
+		self.assertEqual(self.client.session['adaptive_correct'], 5)
+		self.assertIsNone(self.client.session['adaptive_stream'])
+
+	def test_stream_from_another_worker_is_continued_here(self):
+		release = threading.Event()
+		first_worker = self._stream_prefetcher(self._streamer('First', release))
+		other_worker = self._stream_prefetcher(self._streamer('Other'))
+		# Cleanups run last first: unblock the stream before its executor shuts down
+		self.addCleanup(release.set)
+
+		with mock.patch('users.views.get_prefetcher', return_value=first_worker):
+			self.client.get(reverse('adaptive_quiz'), {'topic': 'Probability'})
+			self.client.post(reverse('adaptive_quiz'), {'selected_option': 0, 'time_taken': 4})
+
+		with mock.patch('users.views.get_prefetcher', return_value=other_worker):
+			response = self.client.get(reverse('adaptive_quiz'))
+			self.assertEqual(response.context['question']['question'], 'Other question 0')
+			self.assertEqual(response.context['total_questions'], 5)
+			for _ in range(4):
+				self.client.post(reverse('adaptive_quiz'), {'selected_option': 0, 'time_taken': 4})
+			response = self.client.get(reverse('adaptive_quiz'))
+
+		self.assertRedirects(response, reverse('adaptive_quiz_summary'), fetch_redirect_response=False)
+		self.assertEqual(len(self.client.session['adaptive_question_refs']), 5)
+
+
+@override_settings(PRACTICE_WRITE_BUFFER_SIZE=3, PRACTICE_WRITE_BUFFER_SECONDS=3600)
+class AttemptBufferTests(TestCase):
+	def setUp(self):
+		self.user = User.objects.create_user(username='learner', password='StrongPass123!')
+		self.client.login(username='learner', password='StrongPass123!')
+		self.client.get(reverse('quiz'), {'new': 1})
+
+	def _answer(self):
+		question = self.client.get(reverse('quiz')).context['question']
+		self.client.post(reverse('quiz'), {
+			'selected_option': question['correct_answer'],
+			'time_taken': 5,
+			'question_id': question['id'],
+		})
+		return question
+
+	def test_attempts_are_bulk_written_when_buffer_fills(self):
+		self._answer()
+		self._answer()
+		self.assertEqual(PracticeActivity.objects.count(), 0)
+		self.assertEqual(len(self.client.session[PENDING_ATTEMPTS_KEY]), 2)
+
+		self._answer()
+
+		self.assertEqual(PracticeActivity.objects.filter(user=self.user).count(), 3)
+		self.assertNotIn(PENDING_ATTEMPTS_KEY, self.client.session)
+		self.assertEqual(sum(r.attempt_count for r in TopicPerformance.objects.filter(user=self.user)), 3)
+
+	def test_summary_flushes_partial_buffer_with_answer_times(self):
+		self._answer()
+		buffered_at = self.client.session[PENDING_ATTEMPTS_KEY][0]['attempted_at']
+
+		self.client.get(reverse('quiz_summary'))
+
+		activity = PracticeActivity.objects.get(user=self.user)
+		self.assertEqual(activity.attempted_at.isoformat(), buffered_at)
+		self.assertEqual(QuizSession.objects.get(user=self.user).total_time, 5)
+
+	def test_buffer_survives_in_session_and_flushes_on_next_visit(self):
+		self._answer()
+		# A fresh client on the same session, as after a worker restart
+		session_cookie = self.client.cookies['sessionid'].value
+		self.client = self.client_class()
+		self.client.cookies['sessionid'] = session_cookie
+
+		self.client.get(reverse('dashboard'))
+
+		self.assertEqual(PracticeActivity.objects.filter(user=self.user).count(), 1)
+
+	def test_logout_flushes_buffer(self):
+		self._answer()
+		self.client.post(reverse('logout'))
+		self.assertEqual(PracticeActivity.objects.filter(user=self.user).count(), 1)
+
+	def test_replayed_batch_is_written_once(self):
+		self._answer()
+		self._answer()
+		pending = self.client.session[PENDING_ATTEMPTS_KEY]
+		# The batch committed but the emptied buffer was never saved
+		record_attempts(self.user, [
+			{**attempt, 'attempted_at': parse_datetime(attempt['attempted_at'])} for attempt in pending
+		])
+
+		self.client.get(reverse('dashboard'))
+
+		self.assertEqual(PracticeActivity.objects.filter(user=self.user).count(), 2)
+		self.assertEqual(sum(r.attempt_count for r in TopicPerformance.objects.filter(user=self.user)), 2)
+		self.assertNotIn(PENDING_ATTEMPTS_KEY, self.client.session)
+
+
+class BatchPredictionTests(SimpleTestCase):
+	def setUp(self):
+		self.features = [
+			{'topic': f'Topic {index}', 'accuracy': accuracy, 'avg_time': 20 + index * 7,
+			 'trend': index - 3, 'consistency': 30 + index * 5, 'total_attempts': 5 + index,
+			 'weak': int(accuracy < 60)}
+			for index, accuracy in enumerate([20, 35, 45, 55, 65, 75, 85, 95])
+		]
+
+	def test_feature_matrix_accepts_rows_columns_and_arrays(self):
+		schema = WeakAreaClassifier.FEATURE_SCHEMA
+		expected = [[row[name] for name in schema] for row in self.features]
+
+		self.assertEqual(feature_matrix(self.features, schema).tolist(), expected)
+		columns = {name: [row[name] for row in self.features] for name in schema}
+		self.assertEqual(feature_matrix(columns, schema).tolist(), expected)
+		self.assertEqual(feature_matrix(expected, schema).tolist(), expected)
+		self.assertEqual(feature_matrix([], schema).shape, (0, len(schema)))
+
+	def test_batched_predictions_match_single_predictions(self):
+		classifier = WeakAreaClassifier()
+		classifier.train(self.features)
+		clusterer = PerformanceClusterer()
+		clusterer.fit_predict(self.features)
+		predictor = ProgressPredictor()
+		predictor.train([{'session_number': n, 'accuracy': 40 + n * 8} for n in range(1, 6)])
+
+		probabilities = classifier.predict_many(self.features)
+		clusters = clusterer.predict_many(self.features)
+		for row, probability, cluster in zip(self.features, probabilities, clusters):
+			self.assertAlmostEqual(probability, classifier.predict(row))
+			self.assertEqual(cluster, clusterer.predict(row)['cluster'])
+
+		forecast = predictor.predict_many([6, 7, 20])
+		self.assertEqual(forecast.tolist(), [predictor.predict(6), predictor.predict(7), 100])
+		self.assertEqual(len(classifier.predict_many([])), 0)
+
+
+class ModelRegistryTests(TestCase):
+	def setUp(self):
+		directory = tempfile.TemporaryDirectory()
+		self.addCleanup(directory.cleanup)
+		self.registry = ModelRegistry(directory.name)
+		self.features = [
+			{'topic': f'Topic {index}', 'accuracy': accuracy, 'avg_time': 20 + index * 7,
+			 'trend': index - 3, 'consistency': 0.3, 'total_attempts': 10 + index,
+			 'weak': int(accuracy < 60)}
+			for index, accuracy in enumerate([20, 35, 50, 55, 70, 80, 90])
+		]
+
+	def _trained_classifier(self):
+		classifier = WeakAreaClassifier()
+		metrics = classifier.train(self.features)
+		return classifier, metrics
+
+	def test_saved_model_predicts_without_refitting(self):
+		classifier, metrics = self._trained_classifier()
+		metadata = self.registry.save(WeakAreaClassifier.REGISTRY_NAME, classifier, metrics)
+		self.assertEqual(metadata['version'], 1)
+		self.assertEqual(metadata['feature_schema'], list(WeakAreaClassifier.FEATURE_SCHEMA))
+
+		with mock.patch.object(WeakAreaClassifier, 'train', side_effect=AssertionError('refit')):
+			loaded = self.registry.get(WeakAreaClassifier.REGISTRY_NAME)
+			self.assertIs(self.registry.get(WeakAreaClassifier.REGISTRY_NAME), loaded)
+			self.assertAlmostEqual(loaded.predict(self.features[0]), classifier.predict(self.features[0]))
+
+		self.assertEqual(self.registry.metadata(WeakAreaClassifier.REGISTRY_NAME)['metrics'], metrics)
+
+	def test_new_version_replaces_loaded_model(self):
+		first, _ = self._trained_classifier()
+		self.registry.save('weak_area_classifier', first)
+		self.registry.get('weak_area_classifier')
+		second, _ = self._trained_classifier()
+		self.registry.save('weak_area_classifier', second)
+
+		self.assertEqual(self.registry.versions('weak_area_classifier'), [1, 2])
+		self.assertEqual(self.registry.metadata('weak_area_classifier')['version'], 2)
+		self.assertIsNotNone(self.registry.get('weak_area_classifier'))
+
+	def test_feature_schema_change_ignores_old_model(self):
+		clusterer = PerformanceClusterer()
+		clusterer.fit_predict(self.features)
+		self.registry.save('clusterer', clusterer)
+		self.assertEqual(self.registry.get('clusterer').predict(self.features[-1])['label'], 'Strong')
+
+		self.registry.clear()
+		with mock.patch.object(PerformanceClusterer, 'FEATURE_SCHEMA', ('accuracy', 'avg_time')):
+			self.assertIsNone(self.registry.get('clusterer'))
+
+	def test_misses_are_cached_until_save(self):
+		with mock.patch.object(self.registry, 'load', wraps=self.registry.load) as load:
+			self.assertIsNone(self.registry.get(WeakAreaClassifier.REGISTRY_NAME))
+			self.assertIsNone(self.registry.get(WeakAreaClassifier.REGISTRY_NAME))
+			self.assertEqual(load.call_count, 1)
+
+			classifier, _ = self._trained_classifier()
+			self.registry.save(WeakAreaClassifier.REGISTRY_NAME, classifier)
+			self.assertIsNotNone(self.registry.get(WeakAreaClassifier.REGISTRY_NAME))
+			self.assertEqual(load.call_count, 2)
+
+	def test_version_saved_by_another_process_is_picked_up(self):
+		first, _ = self._trained_classifier()
+		self.registry.save(WeakAreaClassifier.REGISTRY_NAME, first)
+		loaded = self.registry.get(WeakAreaClassifier.REGISTRY_NAME)
+
+		other_process = ModelRegistry(self.registry.root)
+		second, _ = self._trained_classifier()
+		other_process.save(WeakAreaClassifier.REGISTRY_NAME, second)
+		self.assertIs(self.registry.get(WeakAreaClassifier.REGISTRY_NAME), loaded)
+
+		later = time.monotonic() + ModelRegistry.MISS_TTL + 1
+		with mock.patch('users.model_registry.time.monotonic', return_value=later):
+			reloaded = self.registry.get(WeakAreaClassifier.REGISTRY_NAME)
+		self.assertIsNot(reloaded, loaded)
+		self.assertIs(self.registry.get(WeakAreaClassifier.REGISTRY_NAME), reloaded)
+
+	def test_weak_areas_shows_registered_classifier_prediction(self):
+		classifier, _ = self._trained_classifier()
+		self.registry.save(WeakAreaClassifier.REGISTRY_NAME, classifier)
+		user = User.objects.create_user(username='learner', password='StrongPass123!')
+		for index in range(4):
+			record_attempt(
+				user=user, question_id=index, topic='Probability', difficulty='Easy',
+				selected_option=0, correct_answer=0, is_correct=index == 0, time_taken=40,
+			)
+		self.client.login(username='learner', password='StrongPass123!')
+
+		with mock.patch('users.views.get_registry', return_value=self.registry):
+			response = self.client.get(reverse('weak_areas'))
+
+		topic = response.context['topic_analysis'][0]
+		self.assertTrue(topic['ml_method'].startswith('Logistic Regression'))
+		self.assertIn('trend', topic)
+
+
+class GlobalClassifierTrainingTests(TestCase):
+	def setUp(self):
+		directory = tempfile.TemporaryDirectory()
+		self.addCleanup(directory.cleanup)
+		self.registry = ModelRegistry(directory.name)
+		patcher = mock.patch('users.training.get_registry', return_value=self.registry)
+		patcher.start()
+		self.addCleanup(patcher.stop)
+
+		self.users = [User.objects.create_user(username=f'learner{index}', password='x') for index in range(10)]
+		activities = []
+		for offset, user in enumerate(self.users):
+			for index in range(24):
+				topic_number = index % 3
+				activities.append(PracticeActivity(
+					user=user, question_id=index, topic=f'Topic {topic_number}', selected_option=0,
+					correct_answer=0, is_correct=(index + offset + topic_number) % (topic_number + 2) == 0,
+					time_taken=20 + topic_number * 15 + offset,
+				))
+		PracticeActivity.objects.bulk_create(activities)
+
+	def test_feature_matrix_covers_every_user_topic(self):
+		X, owners, topics = build_feature_matrix()
+		self.assertEqual(X.shape, (30, len(WeakAreaClassifier.FEATURE_SCHEMA)))
+		self.assertEqual(set(owners.tolist()), {user.pk for user in self.users})
+
+		expected = get_all_topic_features(self.users[0])
+		first_rows = [row for row, owner in zip(X.tolist(), owners) if owner == self.users[0].pk]
+		self.assertEqual(first_rows, [[f[name] for name in WeakAreaClassifier.FEATURE_SCHEMA] for f in expected])
+
+	def test_labels_come_from_attempts_after_the_features(self):
+		late_bloomer = User.objects.create_user(username='late', password='x')
+		PracticeActivity.objects.bulk_create([
+			PracticeActivity(
+				user=late_bloomer, question_id=index, topic='Probability', selected_option=0,
+				correct_answer=0, is_correct=index >= 3, time_taken=30,
+			)
+			for index in range(3 + WeakAreaClassifier.LABEL_WINDOW)
+		])
+
+		X, y, owners = build_training_set(user_ids=[late_bloomer.pk])
+
+		# Wrong on every featured attempt, right on every labelled one
+		accuracy = WeakAreaClassifier.FEATURE_SCHEMA.index('accuracy')
+		self.assertEqual(X[:, accuracy].tolist(), [0.0])
+		self.assertEqual(y.tolist(), [0])
+		self.assertEqual(owners.tolist(), [late_bloomer.pk])
+
+	def test_training_registers_model_with_held_out_metrics(self):
+		result = train_weak_area_classifier(test_size=0.3)
+
+		metrics = result['metadata']['metrics']
+		self.assertIn('last 5 attempts', metrics['label'])
+		self.assertEqual(metrics['train_rows'], 30)
+		self.assertEqual(metrics['users'], 10)
+		self.assertIn('held_out', metrics)
+		self.assertLess(metrics['held_out']['rows'], 30)
+
+		classifier = self.registry.get(WeakAreaClassifier.REGISTRY_NAME)
+		X, _, _ = build_feature_matrix()
+		probabilities = classifier.predict_proba(X)
+		self.assertEqual(probabilities.shape, (30,))
+		self.assertAlmostEqual(probabilities[4], classifier.predict(
+			dict(zip(WeakAreaClassifier.FEATURE_SCHEMA, X[4]))
+		))
+
+	def test_command_dry_run_does_not_save(self):
+		out = StringIO()
+		call_command('train_weak_area_classifier', dry_run=True, stdout=out)
+		self.assertIn('Dry run', out.getvalue())
+		self.assertEqual(self.registry.versions(WeakAreaClassifier.REGISTRY_NAME), [])
+
+
+class IncrementalClusteringTests(TestCase):
+	def setUp(self):
+		directory = tempfile.TemporaryDirectory()
+		self.addCleanup(directory.cleanup)
+		self.registry = ModelRegistry(directory.name)
+		patcher = mock.patch('users.training.get_registry', return_value=self.registry)
+		patcher.start()
+		self.addCleanup(patcher.stop)
+
+	def add_learner(self, username, accuracies):
+		user = User.objects.create_user(username=username, password='x')
+		activities = []
+		for number, accuracy in enumerate(accuracies):
+			for index in range(10):
+				activities.append(PracticeActivity(
+					user=user, question_id=index, topic=f'Topic {number}', selected_option=0,
+					correct_answer=0, is_correct=index < accuracy // 10, time_taken=90 - accuracy // 2,
+				))
+		PracticeActivity.objects.bulk_create(activities)
+		return user
+
+	def test_partial_fit_labels_follow_centroid_accuracy(self):
+		clusterer = PerformanceClusterer(incremental=True)
+		self.assertIsNone(clusterer.partial_fit([[20, 60, 10]]))
+
+		rows = [[20, 80, 10], [30, 75, 10], [60, 50, 10], [65, 45, 10], [90, 30, 10], [95, 25, 10]]
+		labels = clusterer.partial_fit(rows)
+		self.assertEqual(sorted(labels.values()), ['Moderate', 'Strong', 'Weak'])
+		before = clusterer.predict_many(rows).tolist()
+
+		clusterer.partial_fit([[25, 78, 10], [92, 28, 10]])
+		self.assertEqual(clusterer.predict_many(rows).tolist(), before)
+		self.assertEqual(clusterer.predict({'accuracy': 15, 'avg_time': 85, 'total_attempts': 10})['label'], 'Weak')
+
+		with self.assertRaises(ValueError):
+			PerformanceClusterer().partial_fit(rows)
+
+	def test_updates_only_feed_new_practice(self):
+		self.add_learner('first', [20, 60, 90])
+		self.add_learner('second', [30, 70, 100])
+		result = update_performance_clusterer()
+		self.assertEqual(result['topics'], 6)
+		self.assertEqual(result['metadata']['version'], 1)
+
+		self.assertEqual(update_performance_clusterer()['topics'], 0)
+		self.assertEqual(self.registry.versions(PerformanceClusterer.REGISTRY_NAME), [1])
+
+		self.add_learner('third', [10, 50])
+		result = update_performance_clusterer()
+		self.assertEqual(result['topics'], 2)
+		clusterer = self.registry.get(PerformanceClusterer.REGISTRY_NAME)
+		self.assertEqual(clusterer.samples_seen, 8)
+		self.assertEqual(clusterer.recorded_until, PracticeActivity.objects.latest('recorded_at').recorded_at)
+
+		out = StringIO()
+		call_command('update_performance_clusters', stdout=out)
+		self.assertIn('No new practice', out.getvalue())
+
+	def test_rows_committed_behind_the_watermark_are_still_fed(self):
+		self.add_learner('first', [20, 60, 90])
+		update_performance_clusterer()
+		registered = self.registry.get(PerformanceClusterer.REGISTRY_NAME)
+
+		# A transaction that started earlier commits after the update ran
+		late = User.objects.create_user(username='late', password='x')
+		PracticeActivity.objects.create(
+			user=late, question_id=1, topic='Topic 0', selected_option=0, correct_answer=0,
+			is_correct=True, time_taken=30, recorded_at=registered.recorded_until - timedelta(seconds=5),
+		)
+
+		result = update_performance_clusterer()
+
+		self.assertEqual(result['topics'], 1)
+		self.assertEqual(result['clusterer'].samples_seen, 4)
+		# Trained on a copy; the model requests are using was left alone
+		self.assertEqual(registered.samples_seen, 3)
+		self.assertEqual(update_performance_clusterer()['topics'], 0)
+
+
+class OnlineProgressTests(TestCase):
+	accuracies = [40, 55, 50, 70, 65, 80, 90]
+
+	def test_running_sums_match_refitted_regression(self):
+		sessions = [{'session_number': n, 'accuracy': a} for n, a in enumerate(self.accuracies, start=1)]
+		expected = ProgressPredictor().train(sessions)
+
+		online = OnlineProgressPredictor()
+		self.assertIsNone(online.stats())
+		for session in sessions:
+			online.update(session['session_number'], session['accuracy'])
+		stats = online.stats()
+		for key in ('slope', 'intercept', 'mse', 'rmse', 'r2_score'):
+			self.assertAlmostEqual(stats[key], expected[key], places=6)
+
+	def test_decay_matches_weighted_fit(self):
+		from sklearn.linear_model import LinearRegression
+
+		online = OnlineProgressPredictor(decay=0.8)
+		for number, accuracy in enumerate(self.accuracies, start=1):
+			online.update(number, accuracy)
+
+		X = np.arange(1, len(self.accuracies) + 1).reshape(-1, 1)
+		weights = 0.8 ** np.arange(len(self.accuracies) - 1, -1, -1)
+		model = LinearRegression().fit(X, self.accuracies, sample_weight=weights)
+		self.assertAlmostEqual(online.stats()['slope'], model.coef_[0], places=6)
+		self.assertAlmostEqual(online.stats()['intercept'], model.intercept_, places=6)
+		with self.assertRaises(ValueError):
+			OnlineProgressPredictor(decay=0)
+
+	def test_quiz_summary_updates_trend(self):
+		cache.clear()
+		user = User.objects.create_user(username='trend', password='x')
+		for accuracy in self.accuracies[:-1]:
+			record_quiz_session(user, total_questions=10, correct_answers=int(accuracy) // 10, accuracy=accuracy, total_time=60)
+
+		self.client.force_login(user)
+		session = self.client.session
+		session.update({'quiz_answered': 10, 'correct_answers': 9, 'quiz_total_time': 50})
+		session.save()
+		self.client.get(reverse('quiz_summary'))
+
+		trend = ProgressTrend.objects.get(user=user)
+		self.assertEqual(trend.session_count, 7)
+		recorded = list(QuizSession.objects.filter(user=user).order_by('completed_at', 'id').values_list('accuracy', flat=True))
+		online = OnlineProgressPredictor()
+		for number, accuracy in enumerate(recorded, start=1):
+			online.update(number, accuracy)
+		self.assertAlmostEqual(trend.predictor().stats()['slope'], online.stats()['slope'])
+
+		with override_settings(PROGRESS_DECAY=0.5):
+			rebuilt = rebuild_progress_trend(user)
+		self.assertEqual((rebuilt.session_count, rebuilt.decay), (7, 0.5))
+
+		record_attempt(
+			user=user, question_id=1, topic='Logical Reasoning', difficulty='Easy',
+			selected_option=0, correct_answer=0, is_correct=True, time_taken=30,
+		)
+		response = self.client.get(reverse('dashboard'))
+		self.assertContains(response, 'Next quiz forecast')
+
+
+class RequestTimingTests(TestCase):
+	def setUp(self):
+		cache.clear()
+		self.user = User.objects.create_user(username='timed', password='x')
+		record_attempt(
+			user=self.user, question_id=1, topic='Probability', difficulty='Easy',
+			selected_option=0, correct_answer=0, is_correct=True, time_taken=12,
+		)
+		self.client.force_login(self.user)
+
+	def test_response_reports_queries_and_time(self):
+		response = self.client.get(reverse('dashboard'))
+
+		timings = response.wsgi_request.timings
+		self.assertGreater(timings.queries, 0)
+		self.assertGreaterEqual(timings.total_seconds, timings.db_seconds)
+		header = response['Server-Timing']
+		self.assertIn(f'desc="{timings.queries} queries"', header)
+		self.assertIn('total;dur=', header)
+
+	def test_query_heavy_requests_log_a_warning(self):
+		with override_settings(REQUEST_TIMING_QUERY_WARNING=1), self.assertLogs('users.instrumentation', 'WARNING') as logs:
+			self.client.get(reverse('weak_areas'))
+		self.assertEqual(logs.records[0].timing['view'], 'weak_areas')
+
+		with override_settings(REQUEST_TIMING_HEADER=False):
+			self.assertNotIn('Server-Timing', self.client.get(reverse('weak_areas')))
+
+	def test_external_calls_and_queries_outside_requests(self):
+		@track_external('groq')
+		def call_model():
+			time.sleep(0.01)
+			return User.objects.count()
+
+		call_model()  # No open scope: nothing is recorded
+		with request_timings() as timings:
+			call_model()
+		self.assertEqual(timings.queries, 1)
+		self.assertGreaterEqual(timings.external_seconds['groq'], 0.01)
+		self.assertIn('groq;dur=', timings.server_timing())
+
+
+class MetricsTests(TestCase):
+	def setUp(self):
+		cache.clear()
+		reset_metrics()
+		self.user = User.objects.create_user(username='metered', password='x')
+
+	def test_exposition_format(self):
+		counter = Counter('demo_total', "Demo counter", ['kind'])
+		counter.inc(kind='a "quoted"\nvalue')
+		histogram = Histogram('demo_seconds', "Demo histogram", buckets=(0.1, 1))
+		for value in (0.05, 0.5, 3):
+			histogram.observe(value)
+
+		self.assertEqual(counter.render(), [
+			'# HELP demo_total Demo counter',
+			'# TYPE demo_total counter',
+			'demo_total{kind="a \\"quoted\\"\\nvalue"} 1',
+		])
+		self.assertEqual(histogram.render()[2:], [
+			'demo_seconds_bucket{le="0.1"} 1',
+			'demo_seconds_bucket{le="1"} 2',
+			'demo_seconds_bucket{le="+Inf"} 3',
+			'demo_seconds_sum 3.55',
+			'demo_seconds_count 3',
+		])
+		with self.assertRaises(ValueError):
+			counter.inc()
+
+	def test_app_events_are_counted(self):
+		with self.captureOnCommitCallbacks(execute=True):
+			record_attempt(
+				user=self.user, question_id=1, topic='Probability', difficulty='Easy',
+				selected_option=0, correct_answer=0, is_correct=True, time_taken=12,
+			)
+			record_quiz_session(self.user, total_questions=10, correct_answers=7, accuracy=70.0, total_time=90)
+		self.assertEqual(ATTEMPTS_RECORDED.value(), 1)
+		self.assertEqual(QUIZ_SESSIONS_COMPLETED.value(), 1)
+
+		client = SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(
+			create=mock.Mock(return_value=SimpleNamespace(
+				choices=[SimpleNamespace(message=SimpleNamespace(content='not json'))]
+			))
+		)))
+		with mock.patch('users.ai_generator._get_groq_client', return_value=client):
+			questions = generate_questions('Probability', use_bank=False, hedged=False)
+		self.assertEqual(questions[0]['source'], 'Static Fallback')
+		self.assertEqual(QUESTION_REQUESTS.value(source='fallback'), 1)
+		self.assertEqual(AI_PARSE_FAILURES.value(mode='batch'), 4)
+		self.assertEqual(AI_GENERATION_SECONDS.count(model='llama-3.1-8b-instant', outcome='parse_error'), 2)
+
+	def test_malformed_replies_are_counted(self):
+		with self.assertRaises(json.JSONDecodeError):
+			_parse_questions_response('Here you go: [{"question": "a", "options": [}]')
+		self.assertEqual(AI_PARSE_FAILURES.value(mode='batch'), 1)
+
+		parser = QuestionStreamParser()
+		self.assertEqual(parser.feed('[{"question": "a" "b"}, {"question": "c"}]'), [{'question': 'c'}])
+		self.assertEqual(AI_PARSE_FAILURES.value(mode='stream'), 1)
+
+	def test_endpoint_serves_view_latency(self):
+		self.client.force_login(self.user)
+		self.client.get(reverse('dashboard'))
+		self.assertEqual(VIEW_LATENCY_SECONDS.count(view='dashboard'), 1)
+
+		response = self.client.get('/metrics')
+		self.assertEqual(response['Content-Type'], 'text/plain; version=0.0.4; charset=utf-8')
+		body = response.content.decode()
+		self.assertIn('learning_view_latency_seconds_count{view="dashboard"} 1', body)
+		self.assertIn('# TYPE learning_attempts_recorded_total counter', body)
+		self.assertTrue(render_metrics().startswith('# HELP learning_attempts_recorded_total'))
+
+		with override_settings(METRICS_TOKEN='secret'):
+			self.assertEqual(self.client.get('/metrics').status_code, 401)
+			self.assertEqual(self.client.get('/metrics', HTTP_AUTHORIZATION='Bearer secret').status_code, 200)
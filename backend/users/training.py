@@ -0,0 +1,230 @@
+"""
+Offline training of the global ml_models
+One WeakAreaClassifier is fitted on every user's topic features instead of
+on a single user's handful of topics, evaluated on held-out users and saved
+to the model registry for the views to use. Its labels come from attempts
+made after the ones the features describe. The PerformanceClusterer is
+kept up to date incrementally from new PracticeActivity rows.
+"""
+import copy
+import logging
+from collections import deque
+from datetime import timedelta
+
+import numpy as np
+from django.db.models import Max
+from sklearn.metrics import accuracy_score, confusion_matrix, log_loss, roc_auc_score
+from sklearn.model_selection import GroupShuffleSplit
+
+from .feature_engineering import compute_topic_features, iter_topic_attempts, iter_topic_features, ordered_feature_rows
+from .ml_models import PerformanceClusterer, WeakAreaClassifier, feature_matrix
+from .model_registry import get_registry
+from .models import PracticeActivity
+
+logger = logging.getLogger(__name__)
+
+# How far before its watermark the clusterer rereads practice; longer than any
+# transaction writing attempts (and any clock skew between app servers)
+WATERMARK_OVERLAP = timedelta(minutes=10)
+
+
+def build_feature_matrix(user_ids=None, min_attempts=1, chunk_size=2000, schema=WeakAreaClassifier.FEATURE_SCHEMA):
+    """
+    Topic features of every (user, topic) pair as arrays
+    Streams PracticeActivity once; topics with fewer than min_attempts
+    attempts are left out.
+
+    Returns (X, user_ids, topics) with X columns in schema order
+    """
+    activities = PracticeActivity.objects.all()
+    if user_ids is not None:
+        activities = activities.filter(user_id__in=user_ids)
+    rows = ordered_feature_rows(activities).iterator(chunk_size=chunk_size)
+
+    features_list = []
+    owners = []
+    for user_id, features in iter_topic_features(rows):
+        if features['total_attempts'] < min_attempts:
+            continue
+        features_list.append(features)
+        owners.append(user_id)
+
+    X = feature_matrix(features_list, schema)
+    topics = [features['topic'] for features in features_list]
+    return X, np.array(owners, dtype=np.int64), topics
+
+
+def build_training_set(user_ids=None, min_attempts=3, chunk_size=2000):
+    """
+    Labelled WeakAreaClassifier rows, one per (user, topic)
+    Features describe all but the last LABEL_WINDOW attempts and the label
+    comes from those last ones, so the model predicts how a topic goes next
+    instead of restating the accuracy it is given. Topics need min_attempts
+    attempts before the window to be used.
+
+    Returns (X, y, user_ids) with X columns in FEATURE_SCHEMA order
+    """
+    window = WeakAreaClassifier.LABEL_WINDOW
+    activities = PracticeActivity.objects.all()
+    if user_ids is not None:
+        activities = activities.filter(user_id__in=user_ids)
+    rows = ordered_feature_rows(activities).iterator(chunk_size=chunk_size)
+
+    features_list = []
+    owners = []
+    for user_id, topic, results, times in iter_topic_attempts(rows):
+        if len(results) < min_attempts + window:
+            continue
+        features = compute_topic_features(topic, results[:-window], times[:-window])
+        features['weak'] = WeakAreaClassifier.label(results[-window:])
+        features_list.append(features)
+        owners.append(user_id)
+
+    X, y = WeakAreaClassifier().prepare_data(features_list)
+    return X, y, np.array(owners, dtype=np.int64)
+
+
+def _evaluate(classifier, X, y):
+    proba = classifier.predict_proba(X)
+    predicted = (proba >= 0.5).astype(int)
+    metrics = {
+        'rows': int(len(y)),
+        'accuracy': accuracy_score(y, predicted),
+        'confusion_matrix': confusion_matrix(y, predicted, labels=[0, 1]).tolist(),
+    }
+    # Both need both classes present in the held-out rows
+    if len(set(y.tolist())) == 2:
+        metrics['roc_auc'] = roc_auc_score(y, proba)
+        metrics['log_loss'] = log_loss(y, proba, labels=[0, 1])
+    return metrics
+
+
+def train_weak_area_classifier(test_size=0.2, min_attempts=3, random_state=42, save=True):
+    """
+    Fit the global classifier and (by default) register it
+
+    Rows come from build_training_set and are split by user so held-out
+    metrics measure learners the model has never seen; the saved model is
+    then refitted on every row.
+    Returns {'metrics', 'metadata' (None when not saved), 'classifier'}
+    """
+    X, y, owners = build_training_set(min_attempts=min_attempts)
+    if len(set(y.tolist())) < 2:
+        raise ValueError(f"Need weak and strong topics to train; got {len(y)} rows of one class")
+
+    window = WeakAreaClassifier.LABEL_WINDOW
+    metrics = {
+        'train_rows': int(len(y)),
+        'users': int(len(set(owners.tolist()))),
+        'label': (
+            f"weak = accuracy below {WeakAreaClassifier.WEAK_BELOW}% over a topic's last {window} "
+            f"attempts; features from the attempts before them"
+        ),
+    }
+
+    if test_size and len(set(owners.tolist())) >= 2:
+        splitter = GroupShuffleSplit(n_splits=1, test_size=test_size, random_state=random_state)
+        train_index, test_index = next(splitter.split(X, y, groups=owners))
+        if len(set(y[train_index].tolist())) == 2:
+            held_out = WeakAreaClassifier()
+            held_out.train_matrix(X[train_index], y[train_index])
+            metrics['held_out'] = _evaluate(held_out, X[test_index], y[test_index])
+        else:
+            logger.warning("Training split has a single class; skipping held-out evaluation")
+
+    classifier = WeakAreaClassifier()
+    metrics['train'] = classifier.train_matrix(X, y)
+
+    metadata = None
+    if save:
+        metadata = get_registry().save(WeakAreaClassifier.REGISTRY_NAME, classifier, metrics)
+    return {'metrics': metrics, 'metadata': metadata, 'classifier': classifier}
+
+
+def _watermark(clusterer):
+    """
+    (recorded_until, overlap_ids) of a clusterer; models saved before the
+    time watermark only know the last PracticeActivity id they fed
+    """
+    if hasattr(clusterer, 'recorded_until'):
+        return clusterer.recorded_until, clusterer.overlap_ids
+    last_id = getattr(clusterer, 'last_activity_id', 0)
+    fed = PracticeActivity.objects.filter(pk__lte=last_id)
+    recorded_until = fed.aggregate(last=Max('recorded_at'))['last']
+    if recorded_until is None:
+        return None, set()
+    overlap = fed.filter(recorded_at__gt=recorded_until - WATERMARK_OVERLAP)
+    return recorded_until, set(overlap.values_list('pk', flat=True))
+
+
+def update_performance_clusterer(reset=False, batch_size=1024, save=True):
+    """
+    Feed topics with new practice since the last update to the registered
+    incremental PerformanceClusterer (a new one when reset or none exists)
+
+    Progress is tracked by recorded_at (when a row was written, so attempts
+    written late by the session buffer are not skipped). Ids are allocated
+    before commit, so a row can become visible after higher ones: every
+    update rereads the last WATERMARK_OVERLAP before the watermark and skips
+    only the rows it has already fed.
+
+    The registered model is shared with every request of this process, so
+    a copy is trained and saved as a new version.
+    Returns {'topics', 'metadata' (None when nothing was saved), 'clusterer'}
+    """
+    registered = None if reset else get_registry().get(PerformanceClusterer.REGISTRY_NAME)
+    if registered is None or not getattr(registered, 'incremental', False):
+        clusterer = PerformanceClusterer(incremental=True)
+    else:
+        clusterer = copy.deepcopy(registered)
+
+    recorded_until, fed_ids = _watermark(clusterer)
+    activity = PracticeActivity.objects.all()
+    if recorded_until is not None:
+        activity = activity.filter(recorded_at__gt=recorded_until - WATERMARK_OVERLAP)
+    rows = activity.order_by('recorded_at', 'pk').values_list('pk', 'user_id', 'topic', 'recorded_at')
+
+    touched = set()
+    # Rows within WATERMARK_OVERLAP of the newest one, oldest first
+    window = deque()
+    for pk, user_id, topic, recorded_at in rows.iterator(chunk_size=2000):
+        if recorded_until is None or recorded_at > recorded_until:
+            recorded_until = recorded_at
+        window.append((pk, recorded_at))
+        while window[0][1] <= recorded_until - WATERMARK_OVERLAP:
+            window.popleft()
+        if pk not in fed_ids:
+            touched.add((user_id, topic))
+    if not touched:
+        return {'topics': 0, 'metadata': None, 'clusterer': clusterer}
+
+    X, owners, topics = build_feature_matrix(
+        user_ids={user_id for user_id, _ in touched},
+        schema=PerformanceClusterer.FEATURE_SCHEMA,
+    )
+    # Only the topics that changed, each once with its up-to-date features
+    mask = np.fromiter(
+        ((owner, topic) in touched for owner, topic in zip(owners.tolist(), topics)),
+        dtype=bool,
+        count=len(topics),
+    )
+    X = X[mask]
+
+    for start in range(0, len(X), batch_size):
+        clusterer.partial_fit(X[start:start + batch_size])
+    if clusterer.samples_seen == 0:
+        # Too few topics to place the first centroids; retry with more data
+        return {'topics': 0, 'metadata': None, 'clusterer': clusterer}
+    clusterer.recorded_until = recorded_until
+    clusterer.overlap_ids = {pk for pk, _ in window}
+
+    metadata = None
+    if save:
+        metadata = get_registry().save(PerformanceClusterer.REGISTRY_NAME, clusterer, {
+            'topics': int(len(X)),
+            'samples_seen': clusterer.samples_seen,
+            'recorded_until': recorded_until.isoformat(),
+            'centers': clusterer.centers(),
+            'cluster_labels': clusterer.cluster_labels,
+        })
+    return {'topics': int(len(X)), 'metadata': metadata, 'clusterer': clusterer}
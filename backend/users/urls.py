@@ -14,4 +14,6 @@ urlpatterns = [
     path('recommendations/', views.recommendations_page, name='recommendations'),
     path('adaptive-quiz/', views.adaptive_quiz, name='adaptive_quiz'),
     path('adaptive-quiz/summary/', views.adaptive_quiz_summary, name='adaptive_quiz_summary'),
+    # No trailing slash: the path scrapers request by default
+    path('metrics', views.metrics, name='metrics'),
 ]
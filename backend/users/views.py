@@ -1,18 +1,34 @@
+from asgiref.sync import sync_to_async
 from django.shortcuts import render, redirect
+from django.urls import reverse
 from django.contrib.auth import authenticate, login, logout
 from django.contrib.auth.models import User
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth.password_validation import validate_password
+from django.conf import settings
 from django.contrib import messages
 from django.core.exceptions import ValidationError
-from django.db import models
+from django.http import HttpResponse
 from django.utils.http import url_has_allowed_host_and_scheme
 from django.views.decorators.http import require_http_methods, require_POST
-import random
 import json
 from .questions import get_all_questions
-from .models import PracticeActivity, QuizSession
-from .analytics import get_topic_statistics, generate_recommendations
+from .models import PracticeActivity, ProgressTrend, QuizSession
+from .analytics import get_topic_statistics, get_topic_summaries, generate_recommendations
+from .ai_generator import choose_adaptive_target
+from .caching import get_cached_dashboard_context
+from .feature_engineering import get_rollup_topic_features
+from .ml_models import WeakAreaClassifier
+from .model_registry import get_registry
+from .question_pool import get_prefetcher
+from .quiz_state import new_shuffle_seed, question_refs, resolve_question_ref, static_question_at
+from .attempt_buffer import flush_attempts, save_attempt
+from .rollups import record_quiz_session
+from .metrics import CONTENT_TYPE as METRICS_CONTENT_TYPE, render_metrics
+from .instrumentation import track_external
+
+# Adaptive quiz topics pre-generated when recommendations are shown
+PREFETCH_RECOMMENDED_TOPICS = 3
 
 def home(request):
     """Redirect root route to login flow"""
@@ -128,23 +144,27 @@ def register_page(request):
 def dashboard(request):
     """Display user dashboard with real statistics and charts"""
     
-    # Get user's practice data
-    practice_data = PracticeActivity.objects.filter(user=request.user)
+    flush_attempts(request)
+    
+    # Recomputed only after the user records new attempts or sessions
+    context = get_cached_dashboard_context(request.user, _build_dashboard_context)
+    
+    return render(request, 'dashboard.html', context)
+
+
+def _build_dashboard_context(user):
+    """Compute dashboard statistics and chart data for a user"""
+    
+    # Get user's per-topic totals (one row per topic)
+    topic_summaries = get_topic_summaries(user, include_recent=False)
     
     # Calculate statistics
-    total_attempted = practice_data.count()
+    total_attempted = sum(topic['total'] for topic in topic_summaries)
     
     if total_attempted > 0:
-        correct_count = practice_data.filter(is_correct=True).count()
+        correct_count = sum(topic['correct'] for topic in topic_summaries)
         accuracy = (correct_count / total_attempted) * 100
-        avg_time = practice_data.aggregate(models.Avg('time_taken'))['time_taken__avg']
-        
-        # Topic-wise statistics
-        from django.db.models import Count, Q
-        topic_stats_raw = practice_data.values('topic').annotate(
-            total=Count('id'),
-            correct=Count('id', filter=Q(is_correct=True))
-        )
+        avg_time = sum(topic['time_sum'] for topic in topic_summaries) / total_attempted
         
         # Process topic stats
         topic_stats = []
@@ -152,7 +172,7 @@ def dashboard(request):
         topic_accuracies = []
         weak_topics = []
         
-        for topic in topic_stats_raw:
+        for topic in topic_summaries:
             topic_accuracy = (topic['correct'] / topic['total']) * 100 if topic['total'] > 0 else 0
             
             topic_stats.append({
@@ -171,7 +191,7 @@ def dashboard(request):
         weak_area_count = len(weak_topics)
         
         # Get quiz sessions for accuracy trend
-        quiz_sessions = QuizSession.objects.filter(user=request.user).order_by('completed_at')[:10]
+        quiz_sessions = QuizSession.objects.filter(user=user).order_by('completed_at')[:10]
         
         session_dates = []
         session_accuracies = []
@@ -182,7 +202,11 @@ def dashboard(request):
             session_accuracies.append(round(session.accuracy, 1))
         
         # Get recent sessions for table
-        recent_sessions = QuizSession.objects.filter(user=request.user).order_by('-completed_at')[:5]
+        recent_sessions = list(QuizSession.objects.filter(user=user).order_by('-completed_at')[:5])
+        
+        # Next quiz forecast from the running trend sums (no refit)
+        trend = ProgressTrend.objects.filter(user=user).first()
+        predicted_accuracy = trend.predictor().predict(trend.session_count + 1) if trend else None
         
     else:
         accuracy = 0
@@ -194,6 +218,7 @@ def dashboard(request):
         session_dates = []
         session_accuracies = []
         recent_sessions = []
+        predicted_accuracy = None
     
     context = {
         'total_attempted': total_attempted,
@@ -206,14 +231,16 @@ def dashboard(request):
         'session_dates': json.dumps(session_dates),
         'session_accuracies': json.dumps(session_accuracies),
         'recent_sessions': recent_sessions,
+        'predicted_accuracy': round(predicted_accuracy, 1) if predicted_accuracy is not None else None,
     }
     
-    return render(request, 'dashboard.html', context)
+    return context
 
 
 @login_required(login_url='login')
 def practice_entry(request):
     """Route practice clicks: first-time users get static quiz, returning users get recommendations."""
+    flush_attempts(request)
     has_attempted = PracticeActivity.objects.filter(user=request.user).exists()
 
     if has_attempted:
@@ -225,6 +252,8 @@ def practice_entry(request):
 @require_POST
 def logout_user(request):
     """Handle user logout"""
+    # The session (and any buffered attempts in it) is discarded on logout
+    flush_attempts(request)
     logout(request)
     return redirect('login')
 
@@ -237,35 +266,25 @@ def quiz(request):
         request.session['quiz_started'] = True
         request.session['current_question'] = 1
         request.session['correct_answers'] = 0
-        request.session['answers'] = []
-        
-        # SHUFFLE questions for this session
-        all_questions = get_all_questions()
-        shuffled = all_questions.copy()
-        random.shuffle(shuffled)
+        request.session['quiz_answered'] = 0
+        request.session['quiz_total_time'] = 0
         
-        # Store shuffled questions in session
-        request.session['session_questions'] = shuffled
+        # SHUFFLE questions for this session: only the seed is stored,
+        # the order is rebuilt from it on every request
+        request.session['quiz_seed'] = new_shuffle_seed()
         request.session.modified = True
     
     # Get current question number
     current_q_num = request.session.get('current_question', 1)
     
-    # Get questions from session (shuffled)
-    all_questions = request.session.get('session_questions')
-    if not all_questions:
-        # Fallback if session lost
-        all_questions = get_all_questions()
-    
-    total_questions = len(all_questions)
+    # Without a seed (session lost) questions come in their original order
+    question = static_question_at(request.session.get('quiz_seed'), current_q_num - 1)
+    total_questions = len(get_all_questions())
     
     # Check if quiz is complete
-    if current_q_num > total_questions:
+    if question is None:
         return redirect('quiz_summary')
     
-    # Get current question
-    question = all_questions[current_q_num - 1]
-    
     # Handle form submission
     submitted = False
     is_correct = False
@@ -279,8 +298,8 @@ def quiz(request):
         is_correct = int(selected_option) == question['correct_answer']
         
         # Save to database
-        PracticeActivity.objects.create(
-            user=request.user,
+        save_attempt(
+            request,
             question_id=int(question_id),
             topic=question['topic'],
             difficulty=question['difficulty'],
@@ -290,22 +309,9 @@ def quiz(request):
             time_taken=int(time_taken)
         )
         
-        # Store answer data in session
-        answer_data = {
-            'question_id': int(question_id),
-            'topic': question['topic'],
-            'selected_option': int(selected_option),
-            'correct_answer': question['correct_answer'],
-            'is_correct': is_correct,
-            'time_taken': int(time_taken)
-        }
-        
-        if 'answers' not in request.session:
-            request.session['answers'] = []
-        
-        answers = request.session['answers']
-        answers.append(answer_data)
-        request.session['answers'] = answers
+        # Keep running totals in the session (attempts themselves are in the database)
+        request.session['quiz_answered'] = request.session.get('quiz_answered', 0) + 1
+        request.session['quiz_total_time'] = request.session.get('quiz_total_time', 0) + int(time_taken)
         
         # Update correct answers count
         if is_correct:
@@ -331,19 +337,21 @@ def quiz(request):
 def quiz_summary(request):
     """Display quiz results summary"""
     
+    flush_attempts(request)
+    
     # Get quiz data from session
-    answers = request.session.get('answers', [])
+    answered = request.session.get('quiz_answered', 0)
     correct_answers = request.session.get('correct_answers', 0)
     total_questions = len(get_all_questions())
     
     # Calculate statistics
-    total_time = sum(answer['time_taken'] for answer in answers)
+    total_time = request.session.get('quiz_total_time', 0)
     avg_time = total_time / total_questions if total_questions > 0 else 0
     accuracy = (correct_answers / total_questions * 100) if total_questions > 0 else 0
     
     # Save quiz session to database
-    if answers:  # Only save if there were actual answers
-        QuizSession.objects.create(
+    if answered:  # Only save if there were actual answers
+        record_quiz_session(
             user=request.user,
             total_questions=total_questions,
             correct_answers=correct_answers,
@@ -355,7 +363,9 @@ def quiz_summary(request):
     request.session['quiz_started'] = False
     request.session['current_question'] = 1
     request.session['correct_answers'] = 0
-    request.session['answers'] = []
+    request.session['quiz_answered'] = 0
+    request.session['quiz_total_time'] = 0
+    request.session.pop('quiz_seed', None)
     request.session.modified = True
     
     context = {
@@ -369,12 +379,33 @@ def quiz_summary(request):
     return render(request, 'quiz_summary.html', context)
 
 
+def _add_classifier_insights(user, topic_analysis):
+    """Annotate topics with the registered WeakAreaClassifier's prediction, if one is trained"""
+    classifier = get_registry().get(WeakAreaClassifier.REGISTRY_NAME)
+    if classifier is None or not topic_analysis:
+        return
+    
+    # Rollups hold every classifier feature; no scan of the attempt history
+    features_by_topic = {features['topic']: features for features in get_rollup_topic_features(user)}
+    scored = [topic for topic in topic_analysis if topic['topic'] in features_by_topic]
+    if not scored:
+        return
+    
+    # Every topic in one sklearn call
+    probabilities = classifier.predict_many([features_by_topic[topic['topic']] for topic in scored])
+    for topic, prob_weak in zip(scored, probabilities):
+        topic['ml_method'] = f"Logistic Regression: {prob_weak:.0%} weak"
+        topic['trend'] = round(features_by_topic[topic['topic']]['trend'], 1)
+
+
 @login_required(login_url='login')
 def weak_areas(request):
     """Display weak area analysis with ML-based insights"""
     
+    flush_attempts(request)
     topic_analysis = get_topic_statistics(request.user)
     recommendations = generate_recommendations(topic_analysis)
+    _add_classifier_insights(request.user, topic_analysis)
     
     context = {
         'topic_analysis': topic_analysis,
@@ -387,19 +418,77 @@ def weak_areas(request):
 def recommendations_page(request):
     """Display personalized recommendations"""
     
+    flush_attempts(request)
     topic_analysis = get_topic_statistics(request.user)
     recommendations = generate_recommendations(topic_analysis)
     
+    # Start generating the adaptive quizzes this page links to
+    prefetcher = get_prefetcher()
+    linked = recommendations['high_priority'] + recommendations['medium_priority']
+    for recommendation in linked[:PREFETCH_RECOMMENDED_TOPICS]:
+        prefetcher.warm(recommendation['topic'], 'Easy', 5)
+    
     context = {
         'recommendations': recommendations,
     }
     
     return render(request, 'recommendations.html', context)
+def _stream_state(stream, offset):
+    """Session record of a streamed set; offset = refs that came before this stream"""
+    return {
+        'id': stream.id,
+        'topic': stream.topic,
+        'difficulty': stream.difficulty,
+        'total': offset + stream.num_questions,
+        'offset': offset,
+    }
+
+
+async def _update_streamed_refs(session, refs, current_index):
+    """
+    Add the questions a streamed set produced since the last request
+    Waits when the cursor has reached the end of the known questions.
+    Streams live in the worker that opened them; when this request landed
+    on another worker (or the stream expired) the rest of the set is
+    streamed here instead. Returns (refs, total_questions).
+    """
+    state = await session.aget('adaptive_stream')
+    if not state:
+        return refs, len(refs)
+
+    prefetcher = get_prefetcher()
+    stream = prefetcher.get_stream(state['id'])
+    if stream is None:
+        remaining = state['total'] - len(refs)
+        if remaining <= 0:
+            await session.aset('adaptive_stream', None)
+            return refs, len(refs)
+        stream = await prefetcher.aopen_stream(state['topic'], state['difficulty'], remaining)
+        state = _stream_state(stream, offset=len(refs))
+
+    if current_index >= len(refs):
+        with track_external('groq'):
+            questions, done = await stream.wait_for(current_index - state['offset'])
+    else:
+        questions, done = stream.snapshot()
+
+    earlier = refs[:state['offset']]
+    refs = earlier + [ref for ref in question_refs(questions) if ref not in earlier]
+    await session.aupdate({
+        'adaptive_question_refs': refs,
+        'adaptive_stream': None if done else state,
+    })
+    return refs, len(refs) if done else max(len(refs), state['total'])
+
+
 @login_required(login_url='login')
-def adaptive_quiz(request):
+async def adaptive_quiz(request):
     """
     Adaptive quiz - ONLY uses AI-generated questions
     Forces fresh generation every time
+
+    Async so that under ASGI waiting on Groq holds no worker thread; the
+    remaining ORM work goes through sync_to_async.
     """
     
     # Get topic from URL parameter
@@ -408,44 +497,56 @@ def adaptive_quiz(request):
     # ALWAYS start fresh for adaptive quiz OR if 'new' parameter exists
     force_new = request.GET.get('new') or request.GET.get('topic')
     
-    if 'adaptive_quiz_started' not in request.session or force_new:
+    session = request.session
+    if not await session.ahas_key('adaptive_quiz_started') or force_new:
         # Clear ALL adaptive quiz session data
-        request.session.pop('adaptive_quiz_started', None)
-        request.session.pop('adaptive_current_question', None)
-        request.session.pop('adaptive_questions', None)
-        request.session.pop('adaptive_correct', None)
-        request.session.pop('adaptive_answers', None)
+        await session.apop('adaptive_quiz_started', None)
+        await session.apop('adaptive_current_question', None)
+        await session.apop('adaptive_question_refs', None)
+        await session.apop('adaptive_stream', None)
+        await session.apop('adaptive_correct', None)
+        await session.apop('adaptive_answers', None)
         
         # Initialize fresh session
-        request.session['adaptive_quiz_started'] = True
-        request.session['adaptive_current_question'] = 0
-        request.session['adaptive_correct'] = 0
-        request.session['adaptive_answers'] = []
-        request.session.modified = True
+        await session.aupdate({
+            'adaptive_quiz_started': True,
+            'adaptive_current_question': 0,
+            'adaptive_correct': 0,
+            'adaptive_answers': [],
+        })
     
     # ALWAYS generate fresh questions if we don't have any OR if topic changed
-    current_questions = request.session.get('adaptive_questions')
-    if not current_questions or force_new:
+    current_refs = await session.aget('adaptive_question_refs')
+    if not current_refs or force_new:
         questions = None
         error_message = None
         
         try:
             if topic_param:
                 # Generate for specific topic
-                from .ai_generator import generate_questions
-                questions = generate_questions(topic_param, 'Easy', 5, allow_fallback=False)
+                topic, difficulty = topic_param, 'Easy'
             else:
-                # Generate based on weak areas
-                from .ai_generator import generate_adaptive_questions
-                questions = generate_adaptive_questions(request.user, 5, allow_fallback=False)
+                # Generate based on weak areas, including buffered answers
+                await sync_to_async(flush_attempts)(request)
+                topic, difficulty = await sync_to_async(choose_adaptive_target)(await request.auser())
+            
+            # Pops a pre-generated set when one is ready, otherwise streams
+            # one and returns as soon as its first question exists
+            with track_external('groq'):
+                questions, stream = await get_prefetcher().astream(topic, difficulty, 5)
             
             # Validate questions
             if questions and len(questions) > 0:
-                # Store in session
-                request.session['adaptive_questions'] = questions
-                request.session['adaptive_current_question'] = 0  # Reset to first question
-                request.session.modified = True
+                # Store bank references in session, not the question text;
+                # the rest of a streamed set is picked up as it arrives
+                await session.aupdate({
+                    'adaptive_question_refs': question_refs(questions),
+                    'adaptive_stream': _stream_state(stream, offset=0) if stream is not None else None,
+                    'adaptive_current_question': 0,  # Reset to first question
+                })
                 
+            elif stream is not None and stream.error is not None:
+                error_message = str(stream.error)
             else:
                 error_message = "AI returned empty question list"
         
@@ -454,22 +555,26 @@ def adaptive_quiz(request):
         
         # If AI failed, show error page
         if not questions or len(questions) == 0:
-            return render(request, 'quiz_error.html', {
+            return await sync_to_async(render)(request, 'quiz_error.html', {
                 'error': (
                     f'Failed to generate AI questions. Error: {error_message or "Unknown error"}. '
                     'Please configure a valid GROQ_API_KEY and retry.'
                 )
             })
     
-    # Get questions from session
-    questions = request.session.get('adaptive_questions')
-    current_index = request.session.get('adaptive_current_question', 0)
+    # Resolve only the current question from its session reference
+    refs = await session.aget('adaptive_question_refs')
+    current_index = await session.aget('adaptive_current_question', 0)
+    refs, total_questions = await _update_streamed_refs(session, refs, current_index)
     
     # Check if quiz is complete
-    if current_index >= len(questions):
+    if current_index >= len(refs):
         return redirect('adaptive_quiz_summary')
     
-    current_question = questions[current_index]
+    current_question = await sync_to_async(resolve_question_ref)(refs[current_index])
+    if current_question is None:
+        # Banked question was removed mid-quiz; start a fresh set
+        return redirect(f"{reverse('adaptive_quiz')}?new=1")
     
     # Handle answer submission
     submitted = False
@@ -482,8 +587,8 @@ def adaptive_quiz(request):
         is_correct = selected_option == current_question['correct_answer']
         
         # Save to database
-        PracticeActivity.objects.create(
-            user=request.user,
+        await sync_to_async(save_attempt)(
+            request,
             question_id=abs(hash(str(current_question.get('id', f'ai_{current_index}')))),
             topic=current_question['topic'],
             difficulty=current_question.get('difficulty', 'Easy'),
@@ -495,42 +600,47 @@ def adaptive_quiz(request):
         
         # Update session
         if is_correct:
-            request.session['adaptive_correct'] = request.session.get('adaptive_correct', 0) + 1
+            await session.aset('adaptive_correct', await session.aget('adaptive_correct', 0) + 1)
         
-        request.session['adaptive_current_question'] = current_index + 1
-        request.session.modified = True
+        await session.aset('adaptive_current_question', current_index + 1)
         
         submitted = True
     
     context = {
         'question': current_question,
         'current_question_num': current_index + 1,
-        'total_questions': len(questions),
+        'total_questions': total_questions,
         'submitted': submitted,
         'is_correct': is_correct,
         'is_adaptive': True,
     }
     
-    return render(request, 'quiz.html', context)
+    # Templates read request.user lazily, which may query
+    return await sync_to_async(render)(request, 'quiz.html', context)
 
 
 
 @login_required(login_url='login')
-def adaptive_quiz_summary(request):
+async def adaptive_quiz_summary(request):
     """Show summary for adaptive quiz"""
     
-    questions = request.session.get('adaptive_questions', [])
-    correct = request.session.get('adaptive_correct', 0)
-    total = len(questions)
+    await sync_to_async(flush_attempts)(request)
+    
+    session = request.session
+    refs = await session.aget('adaptive_question_refs') or []
+    correct = await session.aget('adaptive_correct', 0)
+    total = len(refs)
     
     accuracy = (correct / total * 100) if total > 0 else 0
     
     # Clear session
-    request.session['adaptive_quiz_started'] = False
-    request.session['adaptive_questions'] = None
-    request.session['adaptive_current_question'] = 0
-    request.session['adaptive_correct'] = 0
-    request.session.modified = True
+    await session.aupdate({
+        'adaptive_quiz_started': False,
+        'adaptive_question_refs': None,
+        'adaptive_stream': None,
+        'adaptive_current_question': 0,
+        'adaptive_correct': 0,
+    })
     
     context = {
         'correct_answers': correct,
@@ -541,4 +651,14 @@ def adaptive_quiz_summary(request):
         'is_adaptive': True,
     }
     
-    return render(request, 'quiz_summary.html', context)
\ No newline at end of file
+    return await sync_to_async(render)(request, 'quiz_summary.html', context)
+
+
+@require_http_methods(['GET'])
+def metrics(request):
+    """Prometheus text exposition of this process's counters and histograms"""
+    token = getattr(settings, 'METRICS_TOKEN', '')
+    if token and request.headers.get('Authorization') != f'Bearer {token}':
+        return HttpResponse(status=401)
+    
+    return HttpResponse(render_metrics(), content_type=METRICS_CONTENT_TYPE)